@@ -2,83 +2,47 @@
 # Licensed under the MIT License.
 
 import asyncio
-import sys
-from datetime import datetime
-
-from flask import Flask, request, Response
-from botbuilder.core import (
-    BotFrameworkAdapter,
-    BotFrameworkAdapterSettings,
-    ConversationState,
-    MemoryStorage,
-    TurnContext,
-    UserState,
-)
-from botbuilder.schema import Activity, ActivityTypes
-
-from dialogs import TradeDialog
-from bots import TradeBot
+import logging
+import threading
 
-# Create the loop and Flask app
-LOOP = asyncio.get_event_loop()
-APP = Flask(__name__, instance_relative_config=True)
-APP.config.from_object("config.DefaultConfig")
-
-# Create adapter.
-# See https://aka.ms/about-bot-adapter to learn more about how bots work.
-SETTINGS = BotFrameworkAdapterSettings(APP.config["APP_ID"], APP.config["APP_PASSWORD"])
-ADAPTER = BotFrameworkAdapter(SETTINGS)
-
-
-# Catch-all for errors.
-async def on_error(context: TurnContext, error: Exception):
-    # This check writes out errors to console log
-    # NOTE: In production environment, you should consider logging this to Azure
-    #       application insights.
-    print(f"\n [on_turn_error]: { error }", file=sys.stderr)
-
-    # Send a message to the user
-    await context.send_activity("The bot encountered an error or bug.")
-    await context.send_activity(
-        "To continue to run this bot, please fix the bot source code."
-    )
-    # Send a trace activity if we're talking to the Bot Framework Emulator
-    if context.activity.channel_id == "emulator":
-        # Create a trace activity that contains the error object
-        trace_activity = Activity(
-            label="TurnError",
-            name="on_turn_error Trace",
-            timestamp=datetime.utcnow(),
-            type=ActivityTypes.trace,
-            value=f"{error}",
-            value_type="https://www.botframework.com/schemas/error",
-        )
+from flask import Flask, jsonify, request, Response
+from botbuilder.schema import Activity
 
-        # Send a trace activity, which will be displayed in Bot Framework Emulator
-        await context.send_activity(trace_activity)
+from bot_runtime import ADAPTER, BOT, start
+from helpers.activity_dedup import ACTIVITY_DEDUP
+from helpers.asset_store import ASSET_STORE
 
-    # Clear out state
-    await CONVERSATION_STATE.delete(context)
+LOGGER = logging.getLogger(__name__)
 
+# Create the loop and Flask app
+# The loop runs forever on its own thread, started by init(): background work started by a turn, like the
+# order queue workers, keeps running between requests.
+LOOP = asyncio.new_event_loop()
+LOOP_THREAD = threading.Thread(target=LOOP.run_forever, name="bot-loop", daemon=True)
+APP = Flask(__name__, instance_relative_config=True)
+APP.config.from_object("config.DefaultConfig")
 
-# Set the error handler on the Adapter.
-# In this case, we want an unbound method, so MethodType is not needed.
-ADAPTER.on_turn_error = on_error
+INIT_LOCK = threading.Lock()
 
-# Create MemoryStorage, UserState and ConversationState
-MEMORY = MemoryStorage()
-CONVERSATION_STATE = ConversationState(MEMORY)
-USER_STATE = UserState(MEMORY)
 
-# create main dialog and bot
-DIALOG = TradeDialog(USER_STATE)
-BOT = TradeBot(CONVERSATION_STATE, USER_STATE, DIALOG)
+def init():
+    """
+    Starts what serving takes, which importing app doesn't: the background work of bot_runtime.start() and the
+    loop thread. `python app.py` calls it before serving, the first request does otherwise (e.g. with
+    `flask run`). Calling it again does nothing.
+    """
+    with INIT_LOCK:
+        if LOOP_THREAD.is_alive():
+            return
+        start()
+        LOOP_THREAD.start()
 
 
 # Listen for incoming requests on /api/messages.
 @APP.route("/api/messages", methods=["POST"])
 def messages():
     # Main bot message handler.s
+    init()
     if "application/json" in request.headers["Content-Type"]:
         body = request.json
     else:
@@ -89,17 +53,43 @@ def messages():
         request.headers["Authorization"] if "Authorization" in request.headers else ""
     )
 
+    # A retry of an activity already processed: the channel only needs to hear it went through.
+    if ACTIVITY_DEDUP.is_duplicate(activity):
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(ACTIVITY_DEDUP.report(activity))
+        return Response(status=200)
+
     try:
-        task = LOOP.create_task(
-            ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
+        future = asyncio.run_coroutine_threadsafe(
+            ADAPTER.process_activity(activity, auth_header, BOT.on_turn), LOOP
         )
-        LOOP.run_until_complete(task)
+        future.result()
         return Response(status=201)
     except Exception as exception:
+        ACTIVITY_DEDUP.forget(activity)
         raise exception
 
 
+# Images linked from the attachments: architecture-resize.png and the rendered plots.
+@APP.route("/api/assets/<name>", methods=["GET"])
+def assets(name: str):
+    asset = ASSET_STORE.get(name)
+    if asset is None:
+        return Response(status=404)
+
+    if asset.is_not_modified(request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")):
+        return Response(status=304, headers=asset.headers())
+    return Response(asset.data, status=200, mimetype=asset.content_type, headers=asset.headers())
+
+
+# Counters of the retries dropped so far, see ActivityDedup.stats.
+@APP.route("/api/metrics", methods=["GET"])
+def metrics():
+    return jsonify({"activity_dedup": ACTIVITY_DEDUP.stats()})
+
+
 if __name__ == "__main__":
+    init()
     try:
         # APP.run(debug=False, port=APP.config["PORT"])  # nosec debug
         APP.run(debug=True, port=APP.config["PORT"])  # nosec debug
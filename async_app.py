@@ -0,0 +1,87 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+asyncio-native run mode: same adapter, bot and dialogs as app.py (both take them from bot_runtime), but every
+activity is awaited on the aiohttp event loop instead of blocking a Flask worker, so turns from different
+conversations interleave. Run it with `python async_app.py`.
+"""
+
+import asyncio
+import logging
+
+from aiohttp import web
+from aiohttp.web import Request, Response, json_response
+from botbuilder.schema import Activity
+
+from bot_runtime import ADAPTER, BOT, start
+from config import DefaultConfig
+from helpers.activity_dedup import ACTIVITY_DEDUP
+from helpers.asset_store import ASSET_STORE
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Listen for incoming requests on /api/messages.
+async def messages(req: Request) -> Response:
+    # Main bot message handler.
+    if "application/json" in req.headers["Content-Type"]:
+        body = await req.json()
+    else:
+        return Response(status=415)
+
+    activity = Activity().deserialize(body)
+    auth_header = req.headers["Authorization"] if "Authorization" in req.headers else ""
+
+    # A retry of an activity already processed: the channel only needs to hear it went through.
+    if ACTIVITY_DEDUP.is_duplicate(activity):
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug(ACTIVITY_DEDUP.report(activity))
+        return Response(status=200)
+
+    try:
+        response = await ADAPTER.process_activity(activity, auth_header, BOT.on_turn)
+    except Exception:
+        ACTIVITY_DEDUP.forget(activity)
+        raise
+    if response:
+        return json_response(data=response.body, status=response.status)
+    return Response(status=201)
+
+
+# Images linked from the attachments, same as /api/assets in app.py.
+async def assets(req: Request) -> Response:
+    name = req.match_info["name"]
+    asset = ASSET_STORE.cached(name)
+    if asset is None:
+        # read from disk or generated again, off the event loop.
+        asset = await asyncio.get_running_loop().run_in_executor(None, ASSET_STORE.get, name)
+    if asset is None:
+        return Response(status=404)
+
+    if asset.is_not_modified(req.headers.get("If-None-Match"), req.headers.get("If-Modified-Since")):
+        return Response(status=304, headers=asset.headers())
+    return Response(body=asset.data, content_type=asset.content_type, headers=asset.headers())
+
+
+# Counters of the retries dropped so far, same as /api/metrics in app.py.
+async def metrics(req: Request) -> Response:
+    return json_response({"activity_dedup": ACTIVITY_DEDUP.stats()})
+
+
+async def on_startup(app: web.Application):
+    # the chart workers, the warm-up and the storage flush at exit; app.py's loop thread isn't needed here.
+    start()
+
+
+APP = web.Application()
+APP.router.add_post("/api/messages", messages)
+APP.router.add_get("/api/assets/{name}", assets)
+APP.router.add_get("/api/metrics", metrics)
+APP.on_startup.append(on_startup)
+
+if __name__ == "__main__":
+    try:
+        web.run_app(APP, host="localhost", port=DefaultConfig.PORT)
+    except Exception as exception:
+        raise exception
@@ -0,0 +1,68 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Aggregation throughput, in ticks per second, of the simulated tick stream into 1m/5m/1h bars, for 10 to 10k
+tickers: one tick at a time, and in batches. The buffers are allocated up front, so their size is the same
+after a short and a long stream.
+
+    python -m benchmarks.bar_aggregation
+"""
+
+import time
+
+from data_models.market_stream import BarAggregator, TickSimulator
+
+TICKER_COUNTS = [10, 100, 1000, 10000]
+TICKS = 1000000
+SINGLE_TICKS = 100000
+BATCH_SIZE = 50000
+TICKS_PER_SECOND = 500
+# bars kept per ticker and timeframe: the last hour of 1m bars.
+CAPACITY = 60
+
+
+def new_stream(tickers: int):
+    names = ["T{0:05d}".format(index) for index in range(tickers)]
+    simulator = TickSimulator(names, seed=42, ticks_per_second=TICKS_PER_SECOND)
+    aggregator = BarAggregator(max_tickers=tickers, capacity=CAPACITY)
+    for name in names:
+        aggregator.ticker_id(name)
+    return simulator, aggregator
+
+
+def single_ticks_per_second(tickers: int) -> float:
+    simulator, aggregator = new_stream(tickers)
+    ticks = list(simulator.ticks(SINGLE_TICKS))
+    start = time.perf_counter()
+    for ticker, price, volume, timestamp in ticks:
+        aggregator.on_tick(ticker, price, volume, timestamp)
+    return SINGLE_TICKS / (time.perf_counter() - start)
+
+
+def batch_ticks_per_second(tickers: int) -> tuple:
+    """ ticks per second, and the size of the buffers after the first and the last batch """
+    simulator, aggregator = new_stream(tickers)
+    batches = [simulator.next_batch(BATCH_SIZE) for _ in range(TICKS // BATCH_SIZE)]
+    sizes = []
+    start = time.perf_counter()
+    for batch in batches:
+        aggregator.on_ticks(*batch)
+        sizes.append(aggregator.nbytes)
+    return TICKS / (time.perf_counter() - start), sizes[0], sizes[-1]
+
+
+def main():
+    print("{0:>8} {1:>16} {2:>16} {3:>14} {4:>14}".format(
+        "tickers", "single (ticks/s)", "batch (ticks/s)", "first (MiB)", "last (MiB)"
+    ))
+    for tickers in TICKER_COUNTS:
+        batch_rate, first_size, last_size = batch_ticks_per_second(tickers)
+        print("{0:>8} {1:>16,.0f} {2:>16,.0f} {3:>14.1f} {4:>14.1f}".format(
+            tickers, single_ticks_per_second(tickers), batch_rate,
+            first_size / (1024 * 1024), last_size / (1024 * 1024)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Orders per second and latency percentiles of BrokerClient against mock_broker.py, one order per request
+against batches, with 50 ms of broker latency. The mock broker runs in the same process.
+
+The second table sends the same orders through an OrderQueue with 4 workers, like the bot does, taking one
+order per worker at a time against batch_size orders.
+
+    python -m benchmarks.broker_throughput
+"""
+
+import asyncio
+import socket
+import time
+from typing import List
+
+from aiohttp import web
+
+import mock_broker
+from data_models.broker_client import BrokerClient
+from data_models.order_queue import OrderQueue
+from data_models.trade_assistant import BuyOperation, OperationStatus
+
+ORDERS = 2000
+CONCURRENCY = 200
+BATCH_SIZES = [1, 10, 50, 200]
+QUEUE_WORKERS = 4
+LATENCY = 0.05
+JITTER = 0.02
+
+HEADER = "{0:>6} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10} {6:>9}".format(
+    "batch", "orders/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "requests", "failures"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def new_operation(index: int) -> BuyOperation:
+    operation = BuyOperation()
+    operation.type = "buy"
+    operation.stock.ticker = "MSFT"
+    operation.quantity = index % 100 + 1
+    operation.price = 150
+    return operation
+
+
+async def run(base_url: str, batch_size: int) -> tuple:
+    client = BrokerClient(base_url, max_connections=16, batch_size=batch_size)
+    latencies: List[float] = []
+    failures = 0
+    pending = iter(range(ORDERS))
+
+    async def trader():
+        nonlocal failures
+        for index in pending:
+            start = time.perf_counter()
+            result = await client.submit(new_operation(index))
+            latencies.append(time.perf_counter() - start)
+            if result.status != OperationStatus.Success:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[trader() for _ in range(CONCURRENCY)])
+    elapsed = time.perf_counter() - start
+    batches = client.batches
+    await client.close()
+    return ORDERS / elapsed, latencies, batches, failures
+
+
+async def run_queued(base_url: str, batch_size: int) -> tuple:
+    client = BrokerClient(base_url, max_connections=16, batch_size=batch_size)
+    queue = OrderQueue(max_size=ORDERS, workers=QUEUE_WORKERS, handler=client.submit, batch_size=batch_size)
+    latencies: List[float] = []
+
+    def done(order):
+        return lambda _: latencies.append(time.monotonic() - order.enqueued_at)
+
+    start = time.perf_counter()
+    orders = []
+    for index in range(ORDERS):
+        order = await queue.submit(new_operation(index))
+        order.result.add_done_callback(done(order))
+        orders.append(order)
+    results = await asyncio.gather(*[order.result for order in orders])
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    batches = client.batches
+    await client.close()
+    failures = sum(1 for result in results if result.status != OperationStatus.Success)
+    return ORDERS / elapsed, latencies, batches, failures
+
+
+async def main():
+    port = free_port()
+    runner = web.AppRunner(mock_broker.create_app(LATENCY, JITTER))
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+
+    try:
+        for title, measure in [(f"{CONCURRENCY} concurrent submits", run),
+                               (f"OrderQueue, {QUEUE_WORKERS} workers", run_queued)]:
+            print(title)
+            print(HEADER)
+            for batch_size in BATCH_SIZES:
+                rate, latencies, batches, failures = await measure(f"http://localhost:{port}", batch_size)
+                print("{0:>6} {1:>10.0f} {2:>10.1f} {3:>10.1f} {4:>10.1f} {5:>10} {6:>9}".format(
+                    batch_size, rate,
+                    percentile(latencies, 0.50) * 1000, percentile(latencies, 0.95) * 1000,
+                    percentile(latencies, 0.99) * 1000, batches, failures,
+                ))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
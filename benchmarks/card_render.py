@@ -0,0 +1,48 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Time to build the portfolio card, from 10 to 10k holdings: the first render of a portfolio, and showing it
+again unchanged, which is served from the cache of the template.
+
+    python -m benchmarks.card_render
+"""
+
+import contextlib
+import io
+import json
+import time
+
+from benchmarks.holding_lookup import GeneratedStore
+from data_models.trade_assistant import Portfolio
+from dialogs.trade_dialog import TradeDialog
+
+PORTFOLIO_SIZES = [10, 100, 1000, 10000]
+VIEWS = 20
+
+
+def measure(portfolio: Portfolio) -> float:
+    """ average milliseconds per card """
+    start = time.perf_counter()
+    for _ in range(VIEWS):
+        TradeDialog.create_table_style_card(None, portfolio)
+    return (time.perf_counter() - start) / VIEWS * 1000
+
+
+def main():
+    print("{0:>10} {1:>14} {2:>14} {3:>12}".format("holdings", "first (ms)", "unchanged (ms)", "json (KiB)"))
+    for size in PORTFOLIO_SIZES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            portfolio = Portfolio(GeneratedStore(size))
+
+        start = time.perf_counter()
+        card = TradeDialog.create_table_style_card(None, portfolio)
+        first = (time.perf_counter() - start) * 1000
+
+        print("{0:>10} {1:>14.2f} {2:>14.2f} {3:>12.1f}".format(
+            size, first, measure(portfolio), len(json.dumps(card.content)) / 1024
+        ))
+
+
+if __name__ == "__main__":
+    main()
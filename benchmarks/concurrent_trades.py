@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Stress test for the shared TradeDialog: many conversations trade at the same time, with their turns
+interleaved, and every one of them has to get a receipt for its own order.
+
+    python -m benchmarks.concurrent_trades --conversations 100
+
+It runs against a copy of data/data.txt in a temporary folder, so the real portfolio is left untouched.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from botbuilder.core import CardFactory, ConversationState, MemoryStorage, UserState
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+
+from bots import TradeBot
+from config import DefaultConfig
+from dialogs import TradeDialog
+
+PRICE = 500
+
+
+def receipt_quantity(adapter: TestAdapter) -> str:
+    """ quantity of the order in the receipt card the bot replied with, if any """
+    for activity in adapter.activity_buffer:
+        for attachment in activity.attachments or []:
+            if attachment.content_type == CardFactory.content_types.receipt_card:
+                return attachment.content["items"][0]["quantity"]
+    return None
+
+
+async def trade(bot: TradeBot, index: int) -> bool:
+    quantity = index + 1
+    # a template activity: from a ConversationReference, TestAdapter only takes the channel id, and every
+    # conversation would be "Convo1".
+    adapter = TestAdapter(
+        bot.on_turn,
+        Activity(
+            channel_id="test",
+            service_url="https://test.com",
+            from_property=ChannelAccount(id=f"user-{index}", name=f"user-{index}"),
+            recipient=ChannelAccount(id="bot", name="TradeBot"),
+            conversation=ConversationAccount(id=f"conversation-{index}"),
+        ),
+    )
+
+    for text in ["hi", "Trade", f"buy {quantity} MSFT for $ {PRICE}", "yes"]:
+        await adapter.receive_activity(text)
+        # let every other conversation take its turn before this one continues.
+        await asyncio.sleep(0)
+
+    return receipt_quantity(adapter) == str(quantity)
+
+
+async def main(conversations: int) -> int:
+    storage = MemoryStorage()
+    user_state = UserState(storage)
+    bot = TradeBot(ConversationState(storage), user_state, TradeDialog(user_state))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[trade(bot, index) for index in range(conversations)])
+    elapsed = time.perf_counter() - start
+
+    mismatches = results.count(False)
+    print(f"{conversations} concurrent trades in {elapsed:.2f} s, {mismatches} got somebody else's operation")
+    if DefaultConfig.OUTBOUND_BATCHING:
+        print(bot.outbound_metrics.to_string())
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # quantities go from 1 to N and must not collide with the price.
+    PARSER.add_argument("--conversations", type=int, default=100, choices=range(1, PRICE))
+    ARGS = PARSER.parse_args()
+
+    WORKING_DIRECTORY = tempfile.mkdtemp()
+    os.makedirs(os.path.join(WORKING_DIRECTORY, "data"))
+    shutil.copy(os.path.join("data", "data.txt"), os.path.join(WORKING_DIRECTORY, "data", "data.txt"))
+    os.chdir(WORKING_DIRECTORY)
+    try:
+        EXIT_CODE = asyncio.run(main(ARGS.conversations))
+    finally:
+        shutil.rmtree(WORKING_DIRECTORY, ignore_errors=True)
+    sys.exit(EXIT_CODE)
@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Per-turn cost of getting to the TradeDialog: building a DialogSet and adding the dialog tree to it on every
+message, as DialogHelper.run_dialog used to, against reusing the set DialogHelper builds once.
+
+    python -m benchmarks.dialog_dispatch --turns 5000
+
+Both create the DialogContext of the turn, so the state read is measured too; the dialog itself doesn't run.
+"""
+
+import argparse
+import asyncio
+import time
+
+from botbuilder.core import ConversationState, MemoryStorage, StatePropertyAccessor, TurnContext, UserState
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.dialogs import DialogSet
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ConversationAccount
+
+from dialogs import TradeDialog
+from helpers.dialog_helper import DialogHelper
+
+
+def new_turn(adapter: TestAdapter, index: int) -> TurnContext:
+    return TurnContext(
+        adapter,
+        Activity(
+            type=ActivityTypes.message,
+            text="hi",
+            channel_id="test",
+            from_property=ChannelAccount(id=f"user-{index}"),
+            recipient=ChannelAccount(id="bot"),
+            conversation=ConversationAccount(id=f"conversation-{index}"),
+        ),
+    )
+
+
+async def per_turn(dialog: TradeDialog, conversation_state: ConversationState, accessor: StatePropertyAccessor,
+                   turn_context: TurnContext):
+    """ what every turn did before: a new accessor, a new set """
+    dialog_set = DialogSet(conversation_state.create_property("DialogState"))
+    dialog_set.add(dialog)
+    return await dialog_set.create_context(turn_context)
+
+
+async def cached(dialog: TradeDialog, conversation_state: ConversationState, accessor: StatePropertyAccessor,
+                 turn_context: TurnContext):
+    """ what TradeBot does now: the accessor it created once, the set DialogHelper built once """
+    return await DialogHelper.get_dialog_set(dialog, accessor).create_context(turn_context)
+
+
+async def measure(dispatch, turns: int) -> float:
+    storage = MemoryStorage()
+    user_state = UserState(storage)
+    conversation_state = ConversationState(storage)
+    dialog = TradeDialog(user_state)
+    accessor = conversation_state.create_property("DialogState")
+    adapter = TestAdapter()
+
+    start = time.perf_counter()
+    for index in range(turns):
+        await dispatch(dialog, conversation_state, accessor, new_turn(adapter, index % 100))
+    return (time.perf_counter() - start) / turns
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5000)
+    args = parser.parse_args()
+
+    # warm up imports and caches before timing.
+    await measure(cached, 100)
+
+    print("{0:>10} {1:>16}".format("dispatch", "per turn (us)"))
+    results = {}
+    for name, dispatch in [("per turn", per_turn), ("cached", cached)]:
+        results[name] = await measure(dispatch, args.turns)
+        print("{0:>10} {1:>16.1f}".format(name, results[name] * 1e6))
+    print("{0:>10} {1:>16.1f}x".format("speedup", results["per turn"] / results["cached"]))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
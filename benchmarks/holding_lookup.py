@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Time to handle a trade on an existing position, from 10 to 100k holdings: the ticker index of Portfolio
+against the linear scans next_step used to do.
+
+    python -m benchmarks.holding_lookup
+"""
+
+import contextlib
+import io
+import random
+import time
+from typing import List
+
+from data_models.portfolio_store import PortfolioStore
+from data_models.trade_assistant import Portfolio
+
+PORTFOLIO_SIZES = [10, 100, 1000, 10000, 100000]
+TRADES = 1000
+
+
+class GeneratedStore(PortfolioStore):
+    """ a portfolio of `size` made up holdings, kept in memory """
+
+    def __init__(self, size: int):
+        self.holdings = [
+            {
+                "ticker": "T{0:06d}".format(index),
+                "market": "NASDAQ" if index % 2 else "NYSE",
+                "company": "Company {0}".format(index),
+                "last_price": 150,
+                "avg_price": 140,
+                "quantity": "10",
+                "quantity_compromised": "0",
+            }
+            for index in range(size)
+        ]
+
+    def load(self) -> List[dict]:
+        return self.holdings
+
+    def save_holding(self, holding: dict):
+        pass
+
+
+def trade_with_scans(portfolio: Portfolio, ticker: str):
+    if any(elem.stock.ticker == ticker for elem in portfolio.stocks_owned):
+        holding = next((i for i in portfolio.stocks_owned if i.stock.ticker == ticker), None)
+        holding.quantity = str(int(holding.quantity) + 1)
+
+
+def trade_with_index(portfolio: Portfolio, ticker: str):
+    holding = portfolio.find_holding(ticker)
+    if holding is not None:
+        holding.quantity = str(int(holding.quantity) + 1)
+
+
+def measure(trade, portfolio: Portfolio, tickers: List[str]) -> float:
+    """ average microseconds per trade """
+    start = time.perf_counter()
+    for ticker in tickers:
+        trade(portfolio, ticker)
+    return (time.perf_counter() - start) / len(tickers) * 1000000
+
+
+def main():
+    print("{0:>10} {1:>14} {2:>14}".format("holdings", "scans (us)", "index (us)"))
+    for size in PORTFOLIO_SIZES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            portfolio = Portfolio(GeneratedStore(size))
+        tickers = ["T{0:06d}".format(random.randrange(size)) for _ in range(TRADES)]
+        print("{0:>10} {1:>14.2f} {2:>14.2f}".format(
+            size, measure(trade_with_scans, portfolio, tickers), measure(trade_with_index, portfolio, tickers)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Matching engine throughput at one million orders: a random mix of limit orders around the price, market
+orders and cancels, and the memory each resting order takes.
+
+    python -m benchmarks.order_book
+"""
+
+import random
+import time
+import tracemalloc
+
+from data_models.order_book import BUY, SELL, MatchingEngine, OrderBook
+
+ORDERS = 1000000
+TICKER = "MSFT"
+MID_PRICE = 150.0
+# share of market orders and of cancels among the orders
+MARKET_SHARE = 0.05
+CANCEL_SHARE = 0.2
+
+
+def run_mix(seed: int = 42):
+    rng = random.Random(seed)
+    engine = MatchingEngine()
+    book = engine.book(TICKER)
+    resting = []
+    fills = 0
+
+    start = time.perf_counter()
+    for _ in range(ORDERS):
+        draw = rng.random()
+        if draw < CANCEL_SHARE and resting:
+            engine.cancel(TICKER, resting.pop(rng.randrange(len(resting))))
+            continue
+        side = BUY if rng.random() < 0.5 else SELL
+        quantity = rng.randint(1, 100)
+        if draw < CANCEL_SHARE + MARKET_SHARE:
+            order, order_fills = engine.submit(TICKER, side, quantity)
+        else:
+            # limit orders a little on both sides of the price, so some cross and some rest.
+            offset = rng.gauss(0.0, 0.5)
+            price = round(MID_PRICE + (offset if side == SELL else -offset), 2)
+            order, order_fills = engine.submit(TICKER, side, quantity, price)
+            if order.remaining:
+                resting.append(order.order_id)
+        fills += len(order_fills)
+    elapsed = time.perf_counter() - start
+    return book, elapsed, fills
+
+
+def bytes_per_resting_order(count: int = ORDERS) -> float:
+    """ a book with `count` resting orders that never cross, bids below the price and asks above it """
+    engine = MatchingEngine()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    book: OrderBook = engine.book(TICKER)
+    for index in range(count):
+        level = index % 1000 + 1
+        if index % 2:
+            engine.submit(TICKER, BUY, 10, MID_PRICE - level * 0.01)
+        else:
+            engine.submit(TICKER, SELL, 10, MID_PRICE + level * 0.01)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(book)
+
+
+def main():
+    book, elapsed, fills = run_mix()
+    print("orders:            {0:,}".format(ORDERS))
+    print("orders/s:          {0:,.0f}".format(ORDERS / elapsed))
+    print("orders matched:    {0:,} ({1:,.0f}/s)".format(book.matched_orders, book.matched_orders / elapsed))
+    print("fills:             {0:,}".format(fills))
+    print("resting orders:    {0:,}".format(len(book)))
+    print("bytes/resting order: {0:.0f}".format(bytes_per_resting_order()))
+
+
+if __name__ == "__main__":
+    main()
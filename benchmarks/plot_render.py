@@ -0,0 +1,36 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Cold (rendered) against warm (cached) latency of the portfolio plot.
+
+    python -m benchmarks.plot_render
+"""
+
+import time
+
+from helpers.plot_cache import PlotCache
+
+VIEWS = 50
+PLOT_VALUES = [2, 4, 3, 5]
+
+
+def measure_ms(action, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    cache = PlotCache()
+    # a new figure every time: what every portfolio view used to cost.
+    cold = measure_ms(lambda: PlotCache().get_line_plot(PLOT_VALUES), VIEWS)
+    cache.get_line_plot(PLOT_VALUES)
+    warm = measure_ms(lambda: cache.get_line_plot(PLOT_VALUES), VIEWS * 100)
+    print("cold: {0:.2f} ms, warm: {1:.4f} ms per portfolio view ({2:.0f}x)".format(cold, warm, cold / warm))
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
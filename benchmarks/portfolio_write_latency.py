@@ -0,0 +1,57 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Latency of persisting one trade, against the size of the portfolio, for each portfolio store.
+
+    python -m benchmarks.portfolio_write_latency
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from data_models.portfolio_store import JournalStore, JsonFileStore
+
+PORTFOLIO_SIZES = [10, 100, 1000, 10000]
+TRADES = 200
+
+
+def create_holding(index: int, quantity: int = 10) -> dict:
+    return {
+        "ticker": "T{0:05d}".format(index),
+        "market": "NASDAQ",
+        "company": "Company {0}".format(index),
+        "last_price": 150,
+        "avg_price": 140,
+        "quantity": quantity,
+        "quantity_compromised": 0,
+    }
+
+
+def measure(store, size: int) -> float:
+    """ average seconds per trade """
+    store.save([create_holding(index) for index in range(size)])
+    start = time.perf_counter()
+    for trade in range(TRADES):
+        store.save_holding(create_holding(trade % size, quantity=trade))
+    return (time.perf_counter() - start) / TRADES
+
+
+def main():
+    folder = tempfile.mkdtemp()
+    try:
+        print("{0:>10} {1:>14} {2:>14}".format("holdings", "json (ms)", "journal (ms)"))
+        for size in PORTFOLIO_SIZES:
+            json_store = JsonFileStore(os.path.join(folder, "json.txt"))
+            journal_store = JournalStore(os.path.join(folder, "journal.txt"), compact_every=TRADES * 10)
+            print("{0:>10} {1:>14.3f} {2:>14.3f}".format(
+                size, measure(json_store, size) * 1000, measure(journal_store, size) * 1000
+            ))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Time and memory it takes to get the Recognizers-Text models of a culture ready, to choose which cultures to
+list in PreloadCultures. Every culture is measured in a process of its own, with tracemalloc on, which the bot
+itself never turns on: it slows down every thread of the process while it traces.
+
+    python -m benchmarks.recognizer_warm_up en-us es-es fr-fr
+"""
+
+import argparse
+import subprocess
+import sys
+
+from helpers.recognizer_registry import RecognizerModelRegistry
+
+PROBE = (
+    "import sys; from benchmarks.recognizer_warm_up import measure; print(measure(sys.argv[1]))"
+)
+
+
+def measure(culture: str) -> str:
+    return RecognizerModelRegistry().warm_up(culture, trace_memory=True).to_string()
+
+
+def main(cultures) -> int:
+    for culture in cultures:
+        # a fresh process, so every culture pays for the imports and no culture reuses another one's memory.
+        result = subprocess.run([sys.executable, "-c", PROBE, culture], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr, file=sys.stderr)
+            return result.returncode
+        print(result.stdout.strip())
+    return 0
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    PARSER.add_argument("cultures", nargs="*", default=["en-us"])
+    sys.exit(main(PARSER.parse_args().cultures))
@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Turns per second of a running bot at 1, 16 and 128 concurrent conversations.
+
+Start the bot first, either `python app.py` (Flask) or `python async_app.py` (aiohttp), then run:
+
+    python -m benchmarks.server_throughput --bot-url http://localhost:3978/api/messages
+
+The benchmark also starts a stub Bot Connector, so the replies of the bot have somewhere to go.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from aiohttp import ClientSession, web
+
+CONCURRENCY_LEVELS = [1, 16, 128]
+
+# "hi" starts the dialog (options prompt), "Help" answers it and ends the dialog: two cheap turns.
+CONVERSATION_SCRIPT = ["hi", "Help"]
+
+
+async def start_stub_connector(port: int) -> web.AppRunner:
+    """ Accepts every reply the bot sends, like the Bot Connector service would. """
+
+    async def reply(req: web.Request) -> web.Response:
+        await req.read()
+        return web.json_response({"id": str(uuid.uuid4())})
+
+    stub = web.Application()
+    stub.router.add_post("/v3/conversations/{conversation_id}/activities", reply)
+    stub.router.add_post("/v3/conversations/{conversation_id}/activities/{activity_id}", reply)
+
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    return runner
+
+
+def create_activity(text: str, conversation_id: str, service_url: str) -> dict:
+    return {
+        "type": "message",
+        "id": str(uuid.uuid4()),
+        "channelId": "benchmark",
+        "serviceUrl": service_url,
+        "conversation": {"id": conversation_id},
+        "from": {"id": "user-" + conversation_id, "name": "user"},
+        "recipient": {"id": "bot", "name": "TradeBot"},
+        "text": text,
+    }
+
+
+async def run_conversation(session: ClientSession, bot_url: str, service_url: str, turns: int, errors: list):
+    conversation_id = str(uuid.uuid4())
+    for turn in range(turns):
+        text = CONVERSATION_SCRIPT[turn % len(CONVERSATION_SCRIPT)]
+        async with session.post(bot_url, json=create_activity(text, conversation_id, service_url)) as response:
+            if response.status >= 400:
+                errors.append(response.status)
+
+
+async def measure(bot_url: str, service_url: str, concurrency: int, turns: int) -> str:
+    errors = []
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[run_conversation(session, bot_url, service_url, turns, errors) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+
+    total_turns = concurrency * turns
+    return "{0:>4} conversations: {1:>8.1f} turns/s ({2} turns in {3:.2f} s, {4} errors)".format(
+        concurrency, total_turns / elapsed, total_turns, elapsed, len(errors)
+    )
+
+
+async def main(args):
+    service_url = f"http://localhost:{args.connector_port}"
+    runner = await start_stub_connector(args.connector_port)
+    try:
+        for concurrency in CONCURRENCY_LEVELS:
+            print(await measure(args.bot_url, service_url, concurrency, args.turns))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    PARSER.add_argument("--bot-url", default="http://localhost:3978/api/messages")
+    PARSER.add_argument("--connector-port", type=int, default=3979)
+    PARSER.add_argument("--turns", type=int, default=20, help="turns per conversation")
+    asyncio.run(main(PARSER.parse_args()))
@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Startup time of the bot process: how long `import app` and `app.init()` take, which modules the import goes
+to, and whether it fits in DefaultConfig.STARTUP_BUDGET_SECONDS (StartupBudgetSeconds). Exits with 1 when it
+doesn't.
+
+    python -m benchmarks.startup_time
+
+The probe runs in a temporary working directory, with the bot state in it, so the working tree is left alone.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from config import DefaultConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import sys, time; start = time.perf_counter(); import app; imported = time.perf_counter(); "
+    "print('init', file=sys.stderr, flush=True); app.init(); "
+    "print('startup', imported - start, time.perf_counter() - imported)"
+)
+
+
+def parse_import_times(stderr: str):
+    """ (cumulative seconds, module) of app and of every module app imports directly """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # depth 0 is imported by the probe itself (app), depth 1 by app.py
+        if depth <= 1:
+            modules.append((int(cumulative) / 1000000, name.strip()))
+    return modules
+
+
+def main(top: int) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        environment = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join([ROOT] + [path for path in [os.environ.get("PYTHONPATH")] if path]),
+            StateDbUrl=os.path.join(directory, "state.db"),
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            cwd=directory, env=environment, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    # the warm-up thread init() starts prints too.
+    line = next(line for line in result.stdout.splitlines() if line.startswith("startup "))
+    import_seconds, init_seconds = [float(value) for value in line.split()[1:]]
+    print("Slowest imports:")
+    # from there on, the chart workers init() starts report their imports too.
+    imports = result.stderr.split("\ninit\n")[0]
+    for seconds, module in sorted(parse_import_times(imports), reverse=True)[:top]:
+        print("  {0:>8.3f} s  {1}".format(seconds, module))
+
+    startup = import_seconds + init_seconds
+    budget = DefaultConfig.STARTUP_BUDGET_SECONDS
+    print("Startup: {0:.3f} s, import {1:.3f} s + init {2:.3f} s (budget {3:.3f} s)".format(
+        startup, import_seconds, init_seconds, budget
+    ))
+    if startup > budget:
+        print("Startup is over budget.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    PARSER.add_argument("--top", type=int, default=15, help="how many modules to list")
+    sys.exit(main(PARSER.parse_args().top))
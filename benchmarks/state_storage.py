@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Latency of the state reads and writes of a turn, MemoryStorage against DurableStorage, with 1, 16 and 128
+conversations taking turns at the same time. Every turn reads the conversation and user state of its
+conversation and writes both back, like BotState does.
+
+    python -m benchmarks.state_storage
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from botbuilder.core import MemoryStorage, Storage
+
+from helpers.durable_storage import DurableStorage
+
+CONCURRENCY_LEVELS = [1, 16, 128]
+TURNS_PER_CONVERSATION = 50
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+async def conversation(storage: Storage, index: int, reads: List[float], writes: List[float]):
+    keys = [f"benchmark/conversations/{index}", f"benchmark/users/user-{index}"]
+    for turn in range(TURNS_PER_CONVERSATION):
+        start = time.perf_counter()
+        items = await storage.read(keys)
+        reads.append(time.perf_counter() - start)
+
+        changes = {}
+        for key in keys:
+            state = items.get(key) or {"e_tag": "*"}
+            state["DialogState"] = {"dialog_stack": [{"id": "TradeDialog", "state": {"step": turn}}]}
+            state["turn"] = turn
+            changes[key] = state
+
+        start = time.perf_counter()
+        await storage.write(changes)
+        writes.append(time.perf_counter() - start)
+        # the user typing the next message.
+        await asyncio.sleep(0)
+
+
+async def measure(storage: Storage, conversations: int) -> tuple:
+    reads: List[float] = []
+    writes: List[float] = []
+    await asyncio.gather(*[conversation(storage, index, reads, writes) for index in range(conversations)])
+    return reads, writes
+
+
+async def main():
+    print("{0:>14} {1:>14} {2:>14} {3:>14} {4:>14} {5:>14}".format(
+        "storage", "conversations", "read p50 (us)", "read p99 (us)", "write p50 (us)", "write p99 (us)"
+    ))
+    with tempfile.TemporaryDirectory() as directory:
+        for conversations in CONCURRENCY_LEVELS:
+            durable = DurableStorage(os.path.join(directory, f"state-{conversations}.db"))
+            for name, storage in [("memory", MemoryStorage()), ("durable", durable)]:
+                reads, writes = await measure(storage, conversations)
+                print("{0:>14} {1:>14} {2:>14.1f} {3:>14.1f} {4:>14.1f} {5:>14.1f}".format(
+                    name, conversations,
+                    percentile(reads, 0.5) * 1e6, percentile(reads, 0.99) * 1e6,
+                    percentile(writes, 0.5) * 1e6, percentile(writes, 0.99) * 1e6,
+                ))
+            await durable.flush()
+            print("{0:>14} {1}".format("", durable.stats()))
+            durable.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
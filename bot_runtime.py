@@ -0,0 +1,119 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+What both run modes serve with: the adapter, the storage and states, the dialog and the bot. app.py (Flask) and
+async_app.py (aiohttp) import them from here. Importing this module starts nothing: each run mode calls start()
+before it serves.
+"""
+
+import atexit
+import sys
+import threading
+from datetime import datetime
+
+from botbuilder.core import (
+    BotFrameworkAdapter,
+    BotFrameworkAdapterSettings,
+    ConversationState,
+    MemoryStorage,
+    TurnContext,
+    UserState,
+)
+from botbuilder.schema import Activity, ActivityTypes
+
+from config import DefaultConfig
+from dialogs import TradeDialog
+from dialogs.trade_dialog import DEFAULT_CULTURE
+from bots import TradeBot
+from data_models.portfolio_cache import PORTFOLIO_CACHE
+from data_models.trade_assistant import load_numpy
+from helpers.chart_renderer import CHART_RENDERER
+from helpers.durable_storage import DurableStorage
+from helpers.recognizer_registry import MODEL_REGISTRY
+
+# Create adapter.
+# See https://aka.ms/about-bot-adapter to learn more about how bots work.
+SETTINGS = BotFrameworkAdapterSettings(DefaultConfig.APP_ID, DefaultConfig.APP_PASSWORD)
+ADAPTER = BotFrameworkAdapter(SETTINGS)
+
+
+# Catch-all for errors.
+async def on_error(context: TurnContext, error: Exception):
+    # This check writes out errors to console log
+    # NOTE: In production environment, you should consider logging this to Azure
+    #       application insights.
+    print(f"\n [on_turn_error]: { error }", file=sys.stderr)
+
+    # Send a message to the user
+    await context.send_activity("The bot encountered an error or bug.")
+    await context.send_activity(
+        "To continue to run this bot, please fix the bot source code."
+    )
+    # Send a trace activity if we're talking to the Bot Framework Emulator
+    if context.activity.channel_id == "emulator":
+        # Create a trace activity that contains the error object
+        trace_activity = Activity(
+            label="TurnError",
+            name="on_turn_error Trace",
+            timestamp=datetime.utcnow(),
+            type=ActivityTypes.trace,
+            value=f"{error}",
+            value_type="https://www.botframework.com/schemas/error",
+        )
+
+        # Send a trace activity, which will be displayed in Bot Framework Emulator
+        await context.send_activity(trace_activity)
+
+    # Clear out state
+    await CONVERSATION_STATE.delete(context)
+
+
+# Set the error handler on the Adapter.
+# In this case, we want an unbound method, so MethodType is not needed.
+ADAPTER.on_turn_error = on_error
+
+# Create the storage (DurableStorage, or MemoryStorage if STATE_STORAGE says so), UserState and ConversationState
+if DefaultConfig.STATE_STORAGE == "memory":
+    MEMORY = MemoryStorage()
+else:
+    MEMORY = DurableStorage(
+        DefaultConfig.STATE_DB_URL, DefaultConfig.STATE_CACHE_SIZE, DefaultConfig.STATE_FLUSH_INTERVAL
+    )
+CONVERSATION_STATE = ConversationState(MEMORY)
+USER_STATE = UserState(MEMORY)
+
+# create main dialog and bot
+DIALOG = TradeDialog(USER_STATE)
+BOT = TradeBot(CONVERSATION_STATE, USER_STATE, DIALOG)
+
+
+def warm_up():
+    """ Loads what the first turns need in the background, so /api/messages can answer right away. """
+    # Build the Recognizers-Text models now, so the first trade message doesn't pay for it.
+    for culture in [DEFAULT_CULTURE] + DefaultConfig.PRELOAD_CULTURES:
+        if not MODEL_REGISTRY.is_warm(culture):
+            print(MODEL_REGISTRY.warm_up(culture).to_string())
+    load_numpy()
+    PORTFOLIO_CACHE.get()
+
+
+START_LOCK = threading.Lock()
+STARTED = threading.Event()
+
+
+def start():
+    """
+    Starts the background work serving needs: the chart worker processes and the warm-up thread, and flushes
+    the storage at exit. Calling it again does nothing.
+    """
+    with START_LOCK:
+        if STARTED.is_set():
+            return
+        if isinstance(MEMORY, DurableStorage):
+            # writes not flushed yet would be lost otherwise.
+            atexit.register(MEMORY.close)
+        # Charts are rendered in worker processes, with matplotlib already loaded, so they never block the loop.
+        CHART_RENDERER.start(DefaultConfig.CHART_RENDER_WORKERS, DefaultConfig.CHART_RENDER_TIMEOUT)
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+        STARTED.set()
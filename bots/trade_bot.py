@@ -4,12 +4,14 @@
 from botbuilder.core import ActivityHandler, ConversationState, TurnContext, UserState, MessageFactory
 from botbuilder.dialogs import Dialog
 from botbuilder.schema import ChannelAccount
+from config import DefaultConfig
+from helpers.asset_store import ASSET_STORE
 from helpers.dialog_helper import DialogHelper
+from helpers.outbound_buffer import OutboundBuffer, OutboundMetrics
+from helpers.state_saver import TurnStateSaver
 
-import os
 import urllib.parse
 import urllib.request
-import base64
 import json
 
 from botbuilder.core import ActivityHandler, MessageFactory, TurnContext, CardFactory
@@ -54,13 +56,28 @@ class TradeBot(ActivityHandler):
         self.conversation_state = conversation_state
         self.user_state = user_state
         self.dialog = dialog
+        # created once, so DialogHelper builds the dialog set once and reuses it on every turn.
+        self.dialog_state = conversation_state.create_property("DialogState")
+        self.state_saver = TurnStateSaver(conversation_state, user_state)
+        self.outbound_metrics = OutboundMetrics()
 
     async def on_turn(self, turn_context: TurnContext):
-        await super().on_turn(turn_context)
+        # With OutboundBatching, what the turn sends goes out together once it is done; see OutboundBuffer.send_now
+        # for what can't wait.
+        outbound = None
+        if DefaultConfig.OUTBOUND_BATCHING:
+            outbound = OutboundBuffer.start(
+                turn_context, DefaultConfig.MERGE_OUTBOUND_MESSAGES, self.outbound_metrics
+            )
+        try:
+            await super().on_turn(turn_context)
+        finally:
+            if outbound is not None:
+                await outbound.flush()
 
         # Save any state changes that might have ocurred during the turn.
-        await self.conversation_state.save_changes(turn_context)
-        await self.user_state.save_changes(turn_context)
+        # Both are written at the same time, and only if they changed; see self.state_saver.metrics.
+        await self.state_saver.save_changes(turn_context)
 
     async def on_message_activity(self, turn_context: TurnContext):
         if (
@@ -72,7 +89,7 @@ class TradeBot(ActivityHandler):
             await DialogHelper.run_dialog(
                 self.dialog,
                 turn_context,
-                self.conversation_state.create_property("DialogState"),
+                self.dialog_state,
             )
 
     async def on_members_added_activity(
@@ -91,25 +108,18 @@ class TradeBot(ActivityHandler):
     async def _handle_outgoing_attachment(self, turn_context: TurnContext):
         reply = Activity(type=ActivityTypes.message)
         # reply.text = "This is an inline attachment."
-        reply.attachments = [self.get_inline_attachment()]
+        reply.attachments = [self.get_inline_attachment(turn_context.activity.channel_id)]
 
         await turn_context.send_activity(reply)
 
-    def get_inline_attachment(self) -> Attachment:
+    def get_inline_attachment(self, channel_id: str = None) -> Attachment:
         """
-        Creates an inline attachment sent from the bot to the user using a base64 string.
+        Creates an attachment linking to the image served by /api/assets, read from disk only once.
+        Channels listed in INLINE_ATTACHMENT_CHANNELS get it inline as a base64 string instead.
         Using a base64 string to send an attachment will not work on all channels.
         Additionally, some channels will only allow certain file types to be sent this way.
         For example a .png file may work but a .pdf file may not on some channels.
         Please consult the channel documentation for specifics.
         :return: Attachment
         """
-        file_path = os.path.join(os.getcwd(), "assets/architecture-resize.png")
-        with open(file_path, "rb") as in_file:
-            base64_image = base64.b64encode(in_file.read()).decode()
-
-        return Attachment(
-            name="architecture-resize.png",
-            content_type="image/png",
-            content_url=f"data:image/png;base64,{base64_image}",
-        )
+        return ASSET_STORE.attachment("architecture-resize.png", channel_id)
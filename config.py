@@ -13,3 +13,71 @@ class DefaultConfig:
     PORT = 3978
     APP_ID = os.environ.get("MicrosoftAppId", "")
     APP_PASSWORD = os.environ.get("MicrosoftAppPassword", "")
+
+    # Recognizers-Text cultures built at startup besides the default one, e.g. "es-es,fr-fr".
+    PRELOAD_CULTURES = [
+        culture for culture in os.environ.get("PreloadCultures", "").split(",") if culture
+    ]
+
+    # How the portfolio is persisted: "journal" (append-only journal + snapshot), "json" (single file)
+    # or "sqlite" (database shared by every worker process).
+    PORTFOLIO_STORE = os.environ.get("PortfolioStore", "journal")
+    # Journal entries written before they are compacted into the snapshot.
+    PORTFOLIO_JOURNAL_COMPACT_EVERY = int(os.environ.get("PortfolioJournalCompactEvery", "1000"))
+    # Used by the sqlite store. On first run it imports the holdings of data/data.txt.
+    PORTFOLIO_DB_URL = os.environ.get("PortfolioDbUrl", "data/portfolio.db")
+    PORTFOLIO_USER_ID = os.environ.get("PortfolioUserId", "default")
+
+    # Worker processes rendering charts, and seconds a turn waits for a chart before answering without it.
+    CHART_RENDER_WORKERS = int(os.environ.get("ChartRenderWorkers", "2"))
+    CHART_RENDER_TIMEOUT = float(os.environ.get("ChartRenderTimeout", "5"))
+
+    # Seconds a quote is reused before the price source is asked again, how many quotes are kept, and seed of
+    # the simulated prices.
+    QUOTE_TTL_SECONDS = float(os.environ.get("QuoteTtlSeconds", "5"))
+    QUOTE_CACHE_SIZE = int(os.environ.get("QuoteCacheSize", "1024"))
+    QUOTE_SIMULATOR_SEED = int(os.environ.get("QuoteSimulatorSeed", "0"))
+
+    # Confirmed orders waiting for the broker, workers sending them, and seconds a turn waits for room in the
+    # queue before the order is rejected (0: rejected right away when the queue is full).
+    ORDER_QUEUE_SIZE = int(os.environ.get("OrderQueueSize", "1000"))
+    ORDER_QUEUE_WORKERS = int(os.environ.get("OrderQueueWorkers", "4"))
+    ORDER_SUBMIT_TIMEOUT = float(os.environ.get("OrderSubmitTimeout", "2"))
+    # Seconds a turn waits for the broker to execute a confirmed order before telling the user it is still
+    # being executed.
+    ORDER_RESULT_TIMEOUT = float(os.environ.get("OrderResultTimeout", "5"))
+
+    # Broker HTTP API the orders are sent to, e.g. http://localhost:3979 for mock_broker.py. Empty: the
+    # simulated Broker executes them in process. Orders sent together, at most, and connections kept open.
+    BROKER_URL = os.environ.get("BrokerUrl", "")
+    BROKER_BATCH_SIZE = int(os.environ.get("BrokerBatchSize", "50"))
+    BROKER_MAX_CONNECTIONS = int(os.environ.get("BrokerMaxConnections", "16"))
+
+    # Seconds, and number of activities, a delivery is remembered for so channel retries are not run twice.
+    ACTIVITY_DEDUP_WINDOW = float(os.environ.get("ActivityDedupWindow", "300"))
+    ACTIVITY_DEDUP_MAX_SIZE = int(os.environ.get("ActivityDedupMaxSize", "10000"))
+
+    # Where conversation and user state are kept: "sqlite" (STATE_DB_URL, survives restarts) or "memory".
+    STATE_STORAGE = os.environ.get("StateStorage", "sqlite")
+    STATE_DB_URL = os.environ.get("StateDbUrl", "data/state.db")
+    # State entries kept in memory, and seconds writes wait to be flushed together to the file.
+    STATE_CACHE_SIZE = int(os.environ.get("StateCacheSize", "1024"))
+    STATE_FLUSH_INTERVAL = float(os.environ.get("StateFlushInterval", "0.05"))
+
+    # "true": activities go to the channel together at the end of the turn, instead of as soon as they are sent.
+    # Off by default: the connector still takes one request per activity, so only merging (below) saves any, and
+    # until then every reply waits for the slowest step of the turn, e.g. the portfolio chart.
+    OUTBOUND_BATCHING = os.environ.get("OutboundBatching", "false").lower() == "true"
+    # "true", with OutboundBatching: consecutive messages that can be shown as one are sent as one, saving a
+    # request to the channel each. Off by default: the user then sees one message where the dialog sent several.
+    MERGE_OUTBOUND_MESSAGES = os.environ.get("MergeOutboundMessages", "false").lower() == "true"
+
+    # Images are sent as links to /api/assets/<name>; the channel must be able to reach this address.
+    ASSETS_BASE_URL = os.environ.get("AssetsBaseUrl", f"http://localhost:{PORT}")
+    # Channels that get images inline as base64 data URIs instead, e.g. "directline,webchat".
+    INLINE_ATTACHMENT_CHANNELS = [
+        channel for channel in os.environ.get("InlineAttachmentChannels", "").split(",") if channel
+    ]
+
+    # Seconds `import app` may take before benchmarks/startup_time.py fails.
+    STARTUP_BUDGET_SECONDS = float(os.environ.get("StartupBudgetSeconds", "3"))
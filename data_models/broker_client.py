@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from data_models.trade_assistant import Operation, OperationResult, OperationStatus
+from helpers.metrics import ratio
+
+LOGGER = logging.getLogger(__name__)
+
+
+def operation_to_order(client_order_id: int, operation: Operation) -> dict:
+    """ the operation, as the broker API takes it """
+    return {
+        "client_order_id": client_order_id,
+        "type": operation.type,
+        "ticker": operation.stock.ticker,
+        "market": operation.stock.market,
+        "quantity": int(operation.quantity),
+        "price": float(operation.price),
+    }
+
+
+class _PendingOrder:
+    def __init__(self, client_order_id: int, operation: Operation, result: "asyncio.Future"):
+        self.client_order_id = client_order_id
+        self.operation = operation
+        self.result = result
+
+
+class BrokerClient:
+    """
+    Sends operations to the broker HTTP API (see mock_broker.py) over a single pooled aiohttp session.
+
+    Orders submitted while a batch is open are sent together in one POST /orders, once batch_size orders are
+    waiting or batch_delay seconds after the first one. Every operation goes Pending -> InProgress while its batch
+    is in flight -> Success or Failure, as the broker answers for it. status() looks the status up by the
+    order_id submit gives the operation, for the last max_tracked orders.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 16, batch_size: int = 50,
+                 batch_delay: float = 0.005, timeout: float = 10.0, max_tracked: int = 10000):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.timeout = timeout
+        self.max_tracked = max_tracked
+
+        self._session: aiohttp.ClientSession = None
+        self._batch: List[_PendingOrder] = []
+        self._flush_handle: asyncio.TimerHandle = None
+        self._client_order_ids = itertools.count(1)
+        self._in_flight: set = set()
+        self._statuses: "OrderedDict[int, OperationStatus]" = OrderedDict()
+
+        self.orders = 0
+        self.batches = 0
+        self.failures = 0
+
+    async def submit(self, operation: Operation) -> OperationResult:
+        """ sends the operation with the next batch and returns what the broker did with it """
+        loop = asyncio.get_event_loop()
+        order = _PendingOrder(next(self._client_order_ids), operation, loop.create_future())
+        operation.order_id = order.client_order_id
+        self._set_status(order, OperationStatus.Pending)
+        self._batch.append(order)
+        self.orders += 1
+
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+
+        return await order.result
+
+    def status(self, order_id: int) -> Optional[OperationStatus]:
+        """ the status of a submitted order, by its order_id; None once it is no longer tracked """
+        return self._statuses.get(order_id)
+
+    async def close(self):
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[_PendingOrder]):
+        for order in batch:
+            self._set_status(order, OperationStatus.InProgress)
+        self.batches += 1
+
+        try:
+            session = self._get_session()
+            payload = {"orders": [operation_to_order(order.client_order_id, order.operation) for order in batch]}
+            async with session.post(self.base_url + "/orders", json=payload) as response:
+                response.raise_for_status()
+                body = await response.json()
+            answers: Dict[int, dict] = {answer["client_order_id"]: answer for answer in body["results"]}
+        except Exception as error:
+            answers = {}
+            errors = [f"[BrokerClient]: {type(error).__name__}: {error}"]
+            LOGGER.error("[BrokerClient]: sending %s orders failed", len(batch), exc_info=error)
+        else:
+            errors = ["[BrokerClient]: the broker did not answer for the order"]
+
+        for order in batch:
+            result = self._to_result(order, answers.get(order.client_order_id), errors)
+            if not order.result.done():
+                order.result.set_result(result)
+
+    def _to_result(self, order: _PendingOrder, answer: dict, errors: List[str]) -> OperationResult:
+        result = OperationResult()
+        result.request_id = order.client_order_id
+        if answer is not None and answer["status"] == "filled":
+            result.transaction_id = answer["transaction_id"]
+            result.status = OperationStatus.Success
+            result.errors = []
+        else:
+            result.transaction_id = answer.get("transaction_id") if answer else None
+            result.status = OperationStatus.Failure
+            result.errors = answer.get("errors", []) if answer else list(errors)
+            self.failures += 1
+        result.has_errors = bool(result.errors)
+        result.is_ok = result.status == OperationStatus.Success
+        self._set_status(order, result.status)
+        order.operation.is_processed = True
+        return result
+
+    def _set_status(self, order: _PendingOrder, status: OperationStatus):
+        order.operation.status = status
+        self._statuses[order.client_order_id] = status
+        if len(self._statuses) > self.max_tracked:
+            self._statuses.popitem(last=False)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # one session, and so one connection pool, for every batch: connections are kept alive between them.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "orders": self.orders,
+            "batches": self.batches,
+            "failures": self.failures,
+            "avg_batch": ratio(self.orders, self.batches),
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import random
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, List, Set
+
+from config import DefaultConfig
+from helpers.metrics import hit_rate
+
+MIN_VARIATION = -10
+MAX_VARIATION = 10
+MAX_DECIMALS = 2
+
+
+class Quote:
+    """ The price of a stock at some point in time, and how much it moved during the day (in %). """
+    ticker: str
+    price: float
+    daily_variation: float
+    timestamp: float
+
+    def __init__(self, ticker: str, price: float, daily_variation: float, timestamp: float = None):
+        self.ticker = ticker
+        self.price = price
+        self.daily_variation = daily_variation
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def to_string(self):
+        """ returns a nice and handy text representation of the object """
+        return "{0} $ {1} ({2} %)".format(self.ticker, self.price, self.daily_variation)
+
+
+class QuoteProvider:
+    """ Where the prices come from. Every request asks for many tickers at once. """
+
+    async def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        """ returns the quote of every ticker it knows about """
+        raise NotImplementedError()
+
+    def remember_prices(self, prices: Dict[str, float]) -> Set[str]:
+        """
+        The last known price of some tickers, e.g. the ones the holdings were saved with. A real feed has its own
+        prices and ignores them. Returns the tickers whose price it didn't know yet.
+        """
+        return set()
+
+
+class SimulatedQuoteProvider(QuoteProvider):
+    """
+    Local stand-in for a market data feed. Prices move within the daily limits around the last known price of
+    the ticker (see remember_prices), or around a price level of its own for a ticker nobody holds.
+    They are deterministic: the same ticker gets the same quote for the same seed, period and last known price,
+    so runs can be reproduced. latency simulates the round trip of a real request.
+    """
+
+    def __init__(self, seed: int = 0, period_seconds: float = 60, latency: float = 0.0):
+        self.seed = seed
+        self.period_seconds = period_seconds
+        self.latency = latency
+        self.reference_prices: Dict[str, float] = {}
+
+        self.requests = 0
+        self.tickers_requested = 0
+
+    async def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        tickers = list(tickers)
+        self.requests += 1
+        self.tickers_requested += len(tickers)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {ticker: self.quote(ticker) for ticker in tickers}
+
+    def remember_prices(self, prices: Dict[str, float]) -> Set[str]:
+        changed = {ticker for ticker, price in prices.items() if self.reference_prices.get(ticker) != price}
+        for ticker in changed:
+            self.reference_prices[ticker] = prices[ticker]
+        return changed
+
+    def quote(self, ticker: str, now: float = None) -> Quote:
+        now = time.time() if now is None else now
+        period = int(now // self.period_seconds)
+        rng = random.Random(self._seed_of(ticker, date.fromtimestamp(now).toordinal(), period))
+
+        base_price = self.reference_prices.get(ticker)
+        if base_price is None:
+            base_price = 20 + zlib.crc32(ticker.encode("utf-8")) % 480
+        variation = round(rng.uniform(MIN_VARIATION, MAX_VARIATION), MAX_DECIMALS)
+        price = round(base_price * (1 + variation / 100), MAX_DECIMALS)
+        return Quote(ticker, price, variation, now)
+
+    def _seed_of(self, ticker: str, day: int, period: int) -> int:
+        return zlib.crc32("{0}:{1}:{2}:{3}".format(self.seed, ticker, day, period).encode("utf-8"))
+
+
+class CachingQuoteProvider(QuoteProvider):
+    """
+    Keeps every quote for ttl_seconds, and at most max_size of them (the least recently used go first).
+    Tickers missing from the cache are fetched from the wrapped provider in a single batched request, and a
+    ticker that is already being fetched for another turn is awaited instead of being requested again.
+    """
+
+    def __init__(self, provider: QuoteProvider, ttl_seconds: float = 5.0, max_size: int = 1024):
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._quotes: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.evictions = 0
+
+    async def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Quote]:
+        now = time.monotonic()
+        quotes: Dict[str, Quote] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+
+        for ticker in dict.fromkeys(tickers):
+            entry = self._quotes.get(ticker)
+            if entry is not None and entry[0] > now:
+                quotes[ticker] = entry[1]
+                self._quotes.move_to_end(ticker)
+                self.hits += 1
+            elif ticker in self._in_flight:
+                waiting[ticker] = self._in_flight[ticker]
+                self.coalesced += 1
+            else:
+                missing.append(ticker)
+                self.misses += 1
+
+        if missing:
+            quotes.update(await self._fetch(missing))
+
+        for ticker, future in waiting.items():
+            quote = await asyncio.shield(future)
+            if quote is not None:
+                quotes[ticker] = quote
+
+        return quotes
+
+    async def _fetch(self, tickers: List[str]) -> Dict[str, Quote]:
+        loop = asyncio.get_event_loop()
+        futures = {ticker: loop.create_future() for ticker in tickers}
+        self._in_flight.update(futures)
+        self.fetches += 1
+
+        try:
+            fetched = await self.provider.get_quotes(tickers)
+        except Exception as error:
+            for future in futures.values():
+                future.set_exception(error)
+                # turns that coalesced into this fetch get the error; nobody else has to retrieve it.
+                future.exception()
+            raise
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        finally:
+            for ticker in tickers:
+                self._in_flight.pop(ticker, None)
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        for ticker, future in futures.items():
+            quote = fetched.get(ticker)
+            if quote is not None:
+                self._quotes[ticker] = (expires_at, quote)
+                self._quotes.move_to_end(ticker)
+            future.set_result(quote)
+        while len(self._quotes) > self.max_size:
+            self._quotes.popitem(last=False)
+            self.evictions += 1
+        return fetched
+
+    def remember_prices(self, prices: Dict[str, float]) -> Set[str]:
+        changed = self.provider.remember_prices(prices)
+        # quoted around a price the provider no longer goes by.
+        for ticker in changed:
+            self._quotes.pop(ticker, None)
+        return changed
+
+    def clear(self):
+        self._quotes.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._quotes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "evictions": self.evictions,
+            # a coalesced lookup had to wait for a fetch too.
+            "hit_rate": hit_rate(self.hits, self.misses + self.coalesced),
+        }
+
+
+# The prices of the bot, and the ones the simulated market makers quote around (see order_book.MarketMaker).
+SIMULATED_QUOTES = SimulatedQuoteProvider(DefaultConfig.QUOTE_SIMULATOR_SEED)
+
+# Turns within QuoteTtlSeconds of a fetch are all given the same prices.
+QUOTES = CachingQuoteProvider(SIMULATED_QUOTES, DefaultConfig.QUOTE_TTL_SECONDS, DefaultConfig.QUOTE_CACHE_SIZE)
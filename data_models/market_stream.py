@@ -0,0 +1,202 @@
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+# Bar lengths kept by default, in seconds.
+TIMEFRAMES = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class TickSimulator:
+    """
+    Seeded random walk of the price of every ticker, one trade (tick) at a time, ticks_per_second in total.
+    The same seed always produces the same stream.
+    """
+
+    def __init__(self, tickers: Iterable[str], seed: int = 0, start_time: float = 0.0,
+                 ticks_per_second: float = 1000, volatility: float = 0.0005):
+        self.tickers = list(tickers)
+        self.ticks_per_second = ticks_per_second
+        self.volatility = volatility
+        self.clock = start_time
+        self._rng = np.random.default_rng(seed)
+        # every ticker starts at its own price level, like SimulatedQuoteProvider.
+        self._log_prices = np.log(
+            np.array([20 + zlib.crc32(ticker.encode("utf-8")) % 480 for ticker in self.tickers], dtype=np.float64)
+        )
+
+    def next_batch(self, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ the next `size` ticks, as arrays: ticker ids (positions in tickers), prices, volumes and timestamps """
+        ticker_ids = self._rng.integers(0, len(self.tickers), size)
+        returns = self._rng.normal(0.0, self.volatility, size)
+        volumes = self._rng.integers(1, 100, size)
+        timestamps = self.clock + np.arange(1, size + 1) / self.ticks_per_second
+        self.clock = float(timestamps[-1]) if size else self.clock
+
+        # every ticker walks from where its previous batch left it: cumulative returns within each ticker.
+        order = np.argsort(ticker_ids, kind="stable")
+        sorted_ids = ticker_ids[order]
+        walked = np.cumsum(returns[order])
+        group_starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, size])
+        offsets = np.repeat(walked[group_starts] - returns[order][group_starts], group_sizes)
+        log_prices = self._log_prices[sorted_ids] + walked - offsets
+
+        group_ends = np.r_[group_starts[1:], size] - 1
+        self._log_prices[sorted_ids[group_ends]] = log_prices[group_ends]
+
+        prices = np.empty(size, dtype=np.float64)
+        prices[order] = np.round(np.exp(log_prices), 2)
+        return ticker_ids, prices, volumes, timestamps
+
+    def ticks(self, count: int, batch_size: int = 10000) -> Iterator[Tuple[str, float, int, float]]:
+        """ the next `count` ticks one by one, as (ticker, price, volume, timestamp) """
+        while count > 0:
+            ticker_ids, prices, volumes, timestamps = self.next_batch(min(batch_size, count))
+            for ticker_id, price, volume, timestamp in zip(
+                    ticker_ids.tolist(), prices.tolist(), volumes.tolist(), timestamps.tolist()):
+                yield self.tickers[ticker_id], price, volume, timestamp
+            count -= len(ticker_ids)
+
+
+class BarSeries:
+    """
+    The last `capacity` OHLCV bars of one length for every ticker, in ring buffers allocated once:
+    the memory used doesn't depend on how long the stream runs.
+    """
+
+    def __init__(self, seconds: int, max_tickers: int, capacity: int):
+        self.seconds = seconds
+        self.capacity = capacity
+        shape = (max_tickers, capacity)
+        self.start = np.zeros(shape, dtype=np.int64)
+        self.open = np.zeros(shape, dtype=np.float64)
+        self.high = np.zeros(shape, dtype=np.float64)
+        self.low = np.zeros(shape, dtype=np.float64)
+        self.close = np.zeros(shape, dtype=np.float64)
+        self.volume = np.zeros(shape, dtype=np.int64)
+        # per ticker: slot of the bar being built, its bucket (start // seconds) and how many slots are in use.
+        self.head = np.full(max_tickers, -1, dtype=np.int64)
+        self.bucket = np.full(max_tickers, -1, dtype=np.int64)
+        self.count = np.zeros(max_tickers, dtype=np.int64)
+
+        self.late_ticks = 0
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.start, self.open, self.high, self.low, self.close, self.volume, self.head, self.bucket,
+                  self.count)
+        return sum(array.nbytes for array in arrays)
+
+    def merge(self, ticker_id: int, bucket: int, open_: float, high: float, low: float, close: float,
+              volume: int):
+        """ folds the ticks of one ticker and bucket, already aggregated, into its bars """
+        current = self.bucket[ticker_id]
+        if bucket == current:
+            slot = self.head[ticker_id]
+            if high > self.high[ticker_id, slot]:
+                self.high[ticker_id, slot] = high
+            if low < self.low[ticker_id, slot]:
+                self.low[ticker_id, slot] = low
+            self.close[ticker_id, slot] = close
+            self.volume[ticker_id, slot] += volume
+        elif bucket > current:
+            slot = (self.head[ticker_id] + 1) % self.capacity
+            self.head[ticker_id] = slot
+            self.bucket[ticker_id] = bucket
+            if self.count[ticker_id] < self.capacity:
+                self.count[ticker_id] += 1
+            self.start[ticker_id, slot] = bucket * self.seconds
+            self.open[ticker_id, slot] = open_
+            self.high[ticker_id, slot] = high
+            self.low[ticker_id, slot] = low
+            self.close[ticker_id, slot] = close
+            self.volume[ticker_id, slot] = volume
+        else:
+            # the bar it belongs to is already closed.
+            self.late_ticks += 1
+
+    def bars(self, ticker_id: int) -> Dict[str, np.ndarray]:
+        """ the bars of a ticker, oldest first """
+        count = int(self.count[ticker_id])
+        slots = (np.arange(self.head[ticker_id] - count + 1, self.head[ticker_id] + 1)) % self.capacity
+        return {
+            "start": self.start[ticker_id, slots],
+            "open": self.open[ticker_id, slots],
+            "high": self.high[ticker_id, slots],
+            "low": self.low[ticker_id, slots],
+            "close": self.close[ticker_id, slots],
+            "volume": self.volume[ticker_id, slots],
+        }
+
+
+class BarAggregator:
+    """
+    Turns a stream of ticks into OHLCV bars of every timeframe, for up to max_tickers tickers.
+    Ticks of a ticker must arrive in time order; a tick for a bar that was already closed is dropped.
+    """
+
+    def __init__(self, max_tickers: int = 256, capacity: int = 256, timeframes: Dict[str, int] = None):
+        self.max_tickers = max_tickers
+        self.timeframes = dict(timeframes or TIMEFRAMES)
+        self.series = {
+            name: BarSeries(seconds, max_tickers, capacity) for name, seconds in self.timeframes.items()
+        }
+        self._ticker_ids: Dict[str, int] = {}
+        self.tickers: List[str] = []
+        self.ticks = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(series.nbytes for series in self.series.values())
+
+    def ticker_id(self, ticker: str) -> int:
+        """ the row of a ticker in the buffers, taken the first time it is seen """
+        ticker_id = self._ticker_ids.get(ticker)
+        if ticker_id is None:
+            if len(self.tickers) == self.max_tickers:
+                raise ValueError(f"[BarAggregator]: No room for more than {self.max_tickers} tickers")
+            ticker_id = len(self.tickers)
+            self._ticker_ids[ticker] = ticker_id
+            self.tickers.append(ticker)
+        return ticker_id
+
+    def on_tick(self, ticker: str, price: float, volume: int, timestamp: float):
+        ticker_id = self.ticker_id(ticker)
+        for series in self.series.values():
+            series.merge(ticker_id, int(timestamp // series.seconds), price, price, price, price, volume)
+        self.ticks += 1
+
+    def on_ticks(self, ticker_ids: np.ndarray, prices: np.ndarray, volumes: np.ndarray, timestamps: np.ndarray):
+        """
+        A batch of ticks, as arrays. ticker_ids are rows of the buffers (see ticker_id). The ticks are grouped
+        by ticker and bar with vectorized reductions, so the buffers are only touched once per bar.
+        """
+        if len(ticker_ids) == 0:
+            return
+        order = np.lexsort((timestamps, ticker_ids))
+        ticker_ids, prices, volumes, timestamps = \
+            ticker_ids[order], prices[order], volumes[order], timestamps[order]
+
+        for series in self.series.values():
+            buckets = (timestamps // series.seconds).astype(np.int64)
+            boundaries = np.flatnonzero((ticker_ids[1:] != ticker_ids[:-1]) | (buckets[1:] != buckets[:-1])) + 1
+            starts = np.r_[0, boundaries]
+            ends = np.r_[boundaries, len(ticker_ids)] - 1
+
+            groups = zip(
+                ticker_ids[starts].tolist(),
+                buckets[starts].tolist(),
+                prices[starts].tolist(),
+                np.maximum.reduceat(prices, starts).tolist(),
+                np.minimum.reduceat(prices, starts).tolist(),
+                prices[ends].tolist(),
+                np.add.reduceat(volumes, starts).tolist(),
+            )
+            for group in groups:
+                series.merge(*group)
+        self.ticks += len(ticker_ids)
+
+    def bars(self, ticker: str, timeframe: str = "1m") -> Dict[str, np.ndarray]:
+        """ the bars of a ticker, oldest first, e.g. for matplotlib's candlestick charts """
+        return self.series[timeframe].bars(self._ticker_ids[ticker])
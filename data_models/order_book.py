@@ -0,0 +1,260 @@
+import itertools
+from bisect import insort
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from data_models.market_data import SIMULATED_QUOTES, SimulatedQuoteProvider
+
+BUY = "buy"
+SELL = "sell"
+
+# Prices are kept as whole cents, so levels never differ by a rounding error.
+TICKS_PER_UNIT = 100
+
+
+def to_ticks(price: float) -> int:
+    return int(round(float(price) * TICKS_PER_UNIT))
+
+
+def from_ticks(ticks: int) -> float:
+    return ticks / TICKS_PER_UNIT
+
+
+class Order:
+    """ An order in the book. price is None for market orders; remaining is 0 once filled or cancelled. """
+    __slots__ = ("order_id", "side", "price", "quantity", "remaining")
+
+    def __init__(self, order_id: int, side: str, quantity: int, price: Optional[int] = None):
+        self.order_id = order_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity
+
+    @property
+    def is_market(self) -> bool:
+        return self.price is None
+
+
+class Fill:
+    """ quantity traded between an incoming order (taker) and an order resting in the book (maker) """
+    __slots__ = ("taker_id", "maker_id", "price", "quantity")
+
+    def __init__(self, taker_id: int, maker_id: int, price: int, quantity: int):
+        self.taker_id = taker_id
+        self.maker_id = maker_id
+        self.price = price
+        self.quantity = quantity
+
+    def to_string(self):
+        """ returns a nice and handy text representation of the object """
+        return "{0} @ $ {1}".format(self.quantity, from_ticks(self.price))
+
+
+class _BookSide:
+    """
+    The resting orders of one side, FIFO per price level. Level keys are kept sorted so the best price is
+    always the last one: bids by price, asks by negated price.
+    """
+    __slots__ = ("sign", "levels", "keys", "volume")
+
+    def __init__(self, sign: int):
+        self.sign = sign
+        self.levels: Dict[int, Deque[Order]] = {}
+        self.keys: List[int] = []
+        # live quantity per price level; cancelled orders stay in their queue until matching reaches them.
+        self.volume: Dict[int, int] = {}
+
+    def best(self) -> Optional[int]:
+        """ best price with live quantity, dropping the levels that only hold cancelled orders """
+        while self.keys:
+            price = self.keys[-1] * self.sign
+            if self.volume[price] > 0:
+                return price
+            self.remove_level(price)
+        return None
+
+    def add(self, order: Order):
+        queue = self.levels.get(order.price)
+        if queue is None:
+            queue = self.levels[order.price] = deque()
+            self.volume[order.price] = 0
+            insort(self.keys, order.price * self.sign)
+        queue.append(order)
+        self.volume[order.price] += order.remaining
+
+    def remove_level(self, price: int):
+        del self.levels[price]
+        del self.volume[price]
+        # the best level is the last key: the usual case costs O(1).
+        key = price * self.sign
+        if self.keys[-1] == key:
+            self.keys.pop()
+        else:
+            self.keys.remove(key)
+
+    def depth(self, count: int) -> List[Tuple[float, int]]:
+        result = []
+        for key in reversed(self.keys):
+            price = key * self.sign
+            if self.volume[price] > 0:
+                result.append((from_ticks(price), self.volume[price]))
+                if len(result) == count:
+                    break
+        return result
+
+
+class OrderBook:
+    """
+    Limit order book of one ticker with price-time priority: better prices first, and at the same price,
+    the order that arrived first. Incoming orders are matched right away and can be partially filled; what is
+    left of a limit order rests in the book, what is left of a market order is cancelled.
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.bids = _BookSide(1)
+        self.asks = _BookSide(-1)
+        self._orders: Dict[int, Order] = {}
+
+        self.matched_orders = 0
+        self.traded_quantity = 0
+
+    def __len__(self):
+        """ resting orders """
+        return len(self._orders)
+
+    def add(self, order: Order) -> List[Fill]:
+        own, other = (self.bids, self.asks) if order.side == BUY else (self.asks, self.bids)
+        fills = self._match(order, other)
+        if order.remaining > 0 and not order.is_market:
+            own.add(order)
+            self._orders[order.order_id] = order
+        return fills
+
+    def cancel(self, order_id: int) -> bool:
+        """ O(1): the order is only marked, and dropped from its queue when matching gets to it """
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        side = self.bids if order.side == BUY else self.asks
+        side.volume[order.price] -= order.remaining
+        order.remaining = 0
+        return True
+
+    def best_bid(self) -> Optional[float]:
+        price = self.bids.best()
+        return None if price is None else from_ticks(price)
+
+    def best_ask(self) -> Optional[float]:
+        price = self.asks.best()
+        return None if price is None else from_ticks(price)
+
+    def depth(self, levels: int = 5) -> Dict[str, List[Tuple[float, int]]]:
+        """ (price, quantity) of the best levels of each side """
+        return {"bids": self.bids.depth(levels), "asks": self.asks.depth(levels)}
+
+    def _match(self, order: Order, other: _BookSide) -> List[Fill]:
+        fills: List[Fill] = []
+        while order.remaining > 0:
+            price = other.best()
+            if price is None:
+                break
+            if not order.is_market and (price > order.price if order.side == BUY else price < order.price):
+                break
+
+            queue = other.levels[price]
+            while queue and order.remaining > 0:
+                maker = queue[0]
+                if maker.remaining == 0:
+                    # cancelled
+                    queue.popleft()
+                    continue
+                quantity = min(order.remaining, maker.remaining)
+                maker.remaining -= quantity
+                order.remaining -= quantity
+                other.volume[price] -= quantity
+                fills.append(Fill(order.order_id, maker.order_id, price, quantity))
+                if maker.remaining == 0:
+                    queue.popleft()
+                    del self._orders[maker.order_id]
+                    self.matched_orders += 1
+                self.traded_quantity += quantity
+
+            if not queue:
+                other.remove_level(price)
+
+        if fills and order.remaining == 0:
+            self.matched_orders += 1
+        return fills
+
+
+class MatchingEngine:
+    """
+    One OrderBook per ticker, created on its first order. With a liquidity provider (see MarketMaker), the book
+    is given liquidity before every order it takes.
+    """
+
+    def __init__(self, liquidity: Callable[["OrderBook", "MatchingEngine"], None] = None):
+        self.books: Dict[str, OrderBook] = {}
+        self.liquidity = liquidity
+        self._order_ids = itertools.count(1)
+
+    def book(self, ticker: str) -> OrderBook:
+        book = self.books.get(ticker)
+        if book is None:
+            book = self.books[ticker] = OrderBook(ticker)
+        return book
+
+    def new_order(self, side: str, quantity: int, price: float = None) -> Order:
+        return Order(next(self._order_ids), side, int(quantity), None if price is None else to_ticks(price))
+
+    def submit(self, ticker: str, side: str, quantity: int, price: float = None) -> Tuple[Order, List[Fill]]:
+        """ a limit order at price, or a market order when there is no price """
+        book = self.book(ticker)
+        if self.liquidity is not None:
+            self.liquidity(book, self)
+        order = self.new_order(side, quantity, price)
+        return order, book.add(order)
+
+    def cancel(self, ticker: str, order_id: int) -> bool:
+        book = self.books.get(ticker)
+        return book is not None and book.cancel(order_id)
+
+
+class MarketMaker:
+    """
+    Quotes both sides of a book around the simulated price of its ticker: quantity at each of `levels` prices
+    above and below it, growing with the distance. Called before every order, it puts a fresh order at each of
+    those prices its previous one was filled at, so a long-running market doesn't run dry. Its orders at prices
+    the quote has moved away from stay in the book, as any other resting order.
+    """
+
+    def __init__(self, levels: int = 10, quantity: int = 100, step: float = 0.01,
+                 quotes: SimulatedQuoteProvider = None):
+        self.levels = levels
+        self.quantity = quantity
+        self.step = step
+        self.quotes = quotes or SIMULATED_QUOTES
+        # (ticker, side, price in ticks) -> its order there
+        self._orders: Dict[Tuple[str, str, int], Order] = {}
+
+        self.quoted_orders = 0
+
+    def __call__(self, book: OrderBook, engine: MatchingEngine, mid_price: float = None):
+        if mid_price is None:
+            mid_price = self.quotes.quote(book.ticker).price
+        for level in range(1, self.levels + 1):
+            size = self.quantity * level
+            for side, price in ((BUY, mid_price - level * self.step), (SELL, mid_price + level * self.step)):
+                key = (book.ticker, side, to_ticks(price))
+                order = self._orders.get(key)
+                if order is not None and order.remaining > 0:
+                    continue
+                order = self._orders[key] = engine.new_order(side, size, price)
+                book.add(order)
+                self.quoted_orders += 1
+
+
+# The market the simulated Broker trades in.
+SIMULATED_MARKET = MatchingEngine(MarketMaker())
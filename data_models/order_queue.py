@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from config import DefaultConfig
+from data_models.trade_assistant import Broker, Operation, OperationResult, OperationStatus
+from helpers.metrics import ratio
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OrderQueueFull(Exception):
+    """ The queue had no room for the order within the time the caller was willing to wait. """
+
+
+class OrderQueueStopped(Exception):
+    """ The order was dropped from the queue without being executed, see OrderQueue. """
+
+
+class QueuedOrder:
+    """ An operation waiting for the broker, and the result it gets once it is executed. """
+    order_id: int
+    operation: Operation
+    enqueued_at: float
+    result: "asyncio.Future[OperationResult]"
+
+    def __init__(self, order_id: int, operation: Operation, result: "asyncio.Future"):
+        self.order_id = order_id
+        self.operation = operation
+        self.enqueued_at = time.monotonic()
+        self.result = result
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _set_exception(result: "asyncio.Future", error: Exception):
+    if not result.done():
+        result.set_exception(error)
+        # nobody may be waiting for this result: don't warn about it not being retrieved.
+        result.exception()
+
+
+def _fail_order(order: QueuedOrder, error: Exception):
+    """ fails the result of the order, from any thread: it belongs to the loop the order was submitted on """
+    if order.result.done():
+        return
+    loop = order.result.get_loop()
+    if loop.is_running() and loop is not _running_loop():
+        loop.call_soon_threadsafe(_set_exception, order.result, error)
+    else:
+        try:
+            _set_exception(order.result, error)
+        except RuntimeError:
+            # the loop is closed: nothing can be waiting for the order any more.
+            pass
+
+
+async def submit_to_broker(operation: Operation) -> OperationResult:
+    """ default handler: hands the operation to the simulated Broker """
+    broker = Broker()
+    operation.status = OperationStatus.InProgress
+    if operation.type == 'buy':
+        result = broker.buy(broker, operation)
+    else:
+        result = broker.sell(broker, None, operation)
+    operation.status = result.status
+    operation.is_processed = result.status in (OperationStatus.Success, OperationStatus.Failure)
+    return result
+
+
+def create_order_handler() -> Callable[[Operation], Awaitable[OperationResult]]:
+    """ the broker HTTP API when BrokerUrl is set, the simulated Broker otherwise """
+    if not DefaultConfig.BROKER_URL:
+        return submit_to_broker
+    # aiohttp is only needed when there is a broker to talk to.
+    from data_models.broker_client import BrokerClient
+    client = BrokerClient(
+        DefaultConfig.BROKER_URL, DefaultConfig.BROKER_MAX_CONNECTIONS, DefaultConfig.BROKER_BATCH_SIZE
+    )
+    return client.submit
+
+
+class OrderQueue:
+    """
+    Bounded FIFO of confirmed operations between the dialog and the broker, drained by worker tasks.
+
+    Any number of turns can submit and any number of workers execute, in the order the operations were
+    submitted. Every worker takes up to batch_size waiting orders at a time and hands them to the handler
+    together, so with a broker HTTP API up to workers x batch_size orders are in flight, in batches.
+    When the queue is full, submit waits up to its timeout for room and then raises OrderQueueFull:
+    orders are never dropped without the caller knowing.
+
+    The workers are started on the event loop of the first submit, and started again by the next submit
+    after stop. The queue is bound to that loop: if a submit comes from another one, the orders still queued
+    can't be executed any more and their results fail with OrderQueueStopped.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        workers: int = 4,
+        submit_timeout: float = 0.0,
+        handler: Callable[[Operation], Awaitable[OperationResult]] = submit_to_broker,
+        batch_size: int = 1,
+    ):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.submit_timeout = submit_timeout
+        self.handler = handler
+
+        self._queue: asyncio.Queue = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop = None
+        self._order_ids = itertools.count(1)
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, operation: Operation, timeout: float = None) -> QueuedOrder:
+        """ queues the operation, waiting up to timeout seconds (submit_timeout by default) if the queue is full """
+        self._ensure_started()
+        timeout = self.submit_timeout if timeout is None else timeout
+        order = QueuedOrder(next(self._order_ids), operation, self._loop.create_future())
+        operation.status = OperationStatus.Pending
+
+        try:
+            if timeout > 0:
+                await asyncio.wait_for(self._queue.put(order), timeout)
+            else:
+                self._queue.put_nowait(order)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.rejected += 1
+            raise OrderQueueFull(f"[OrderQueue]: {self.max_size} orders are already waiting for the broker")
+
+        self.submitted += 1
+        return order
+
+    async def join(self):
+        """ waits until every queued order has been executed """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """ cancels the workers; orders still queued stay in the queue, for the workers the next submit starts """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _ensure_started(self):
+        loop = asyncio.get_event_loop()
+        if self._queue is None or self._loop is not loop:
+            if self._queue is not None:
+                self._abandon_queue()
+            self._loop = loop
+            self._queue = asyncio.Queue(self.max_size)
+            self._workers = []
+        if not any(not worker.done() for worker in self._workers):
+            self._workers = [loop.create_task(self._work(self._queue)) for _ in range(self.worker_count)]
+
+    def _abandon_queue(self):
+        """ the loop changed: fails what the workers of the previous one left in the queue """
+        while not self._queue.empty():
+            order: QueuedOrder = self._queue.get_nowait()
+            self._queue.task_done()
+            self.failed += 1
+            _fail_order(order, OrderQueueStopped(
+                f"[OrderQueue]: order {order.order_id} was queued on an event loop that no longer runs the queue"
+            ))
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            batch: List[QueuedOrder] = [await queue.get()]
+            # whatever else is already waiting goes along: a batching handler, like BrokerClient.submit, gets
+            # up to batch_size orders at the same time instead of one per worker.
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await asyncio.gather(*[self._execute(order) for order in batch])
+            except asyncio.CancelledError:
+                for order in batch:
+                    if not order.result.done():
+                        self.failed += 1
+                        _fail_order(order, OrderQueueStopped(
+                            f"[OrderQueue]: the queue stopped while order {order.order_id} was being executed"
+                        ))
+                raise
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _execute(self, order: QueuedOrder):
+        self.total_wait += time.monotonic() - order.enqueued_at
+        try:
+            result = await self.handler(order.operation)
+        except Exception as error:
+            self.failed += 1
+            LOGGER.error("[OrderQueue]: order %s failed", order.order_id, exc_info=error)
+            _fail_order(order, error)
+        else:
+            self.completed += 1
+            if not order.result.done():
+                order.result.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self.depth,
+            "workers": len(self._workers),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": ratio(self.total_wait, self.completed) * 1000,
+        }
+
+
+# The orders confirmed in check_is_info_ok, of every conversation, wait here for the broker.
+ORDER_QUEUE = OrderQueue(
+    DefaultConfig.ORDER_QUEUE_SIZE,
+    DefaultConfig.ORDER_QUEUE_WORKERS,
+    DefaultConfig.ORDER_SUBMIT_TIMEOUT,
+    create_order_handler(),
+    DefaultConfig.BROKER_BATCH_SIZE,
+)
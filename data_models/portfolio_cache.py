@@ -0,0 +1,78 @@
+import threading
+import time
+
+from data_models.portfolio_store import PortfolioStore, get_portfolio_store
+from data_models.trade_assistant import Portfolio, data_file_url
+from helpers.metrics import hit_rate
+
+
+class PortfolioCache:
+    """
+    Process-wide Portfolio, loaded once and shared by every turn.
+
+    It is reloaded when the store reports a new version (data file mtime/size, sqlite data_version), which is
+    checked at most every check_interval seconds. Writes made through the cached Portfolio are write-through:
+    they go straight to the store and don't invalidate the cached copy.
+    """
+
+    def __init__(self, store: PortfolioStore = None, check_interval: float = 1.0):
+        self._store = store
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._portfolio: Portfolio = None
+        self._version = None
+        self._checked_at = 0.0
+
+        self.loads = 0
+        self.hits = 0
+
+    @property
+    def store(self) -> PortfolioStore:
+        if self._store is None:
+            self._store = get_portfolio_store(data_file_url)
+        return self._store
+
+    def get(self) -> Portfolio:
+        with self._lock:
+            if self._portfolio is not None and not self._is_stale():
+                self.hits += 1
+                return self._portfolio
+
+            version = self.store.version()
+            portfolio = Portfolio(self.store)
+            portfolio.on_saved = self._on_saved
+            self._portfolio = portfolio
+            self._version = version
+            self._checked_at = time.monotonic()
+            self.loads += 1
+            return portfolio
+
+    def invalidate(self):
+        """ the next get() loads the portfolio again """
+        with self._lock:
+            self._portfolio = None
+
+    def _is_stale(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return self.store.version() != self._version
+
+    def _on_saved(self, portfolio: Portfolio):
+        # our own write: the cached copy already has it.
+        with self._lock:
+            if portfolio is self._portfolio:
+                self._version = self.store.version()
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "hits": self.hits,
+            "hit_rate": hit_rate(self.hits, self.loads),
+        }
+
+
+# What the dialogs read the portfolio from.
+PORTFOLIO_CACHE = PortfolioCache()
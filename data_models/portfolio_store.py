@@ -0,0 +1,395 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, List, Tuple
+
+from config import DefaultConfig
+
+# Stores work with holdings already turned into dicts (see Holding.to_dict), in the same format as data.txt:
+# {'holdings': [{'ticker': ..., 'market': ..., 'company': ..., 'last_price': ..., 'avg_price': ...,
+#                'quantity': ..., 'quantity_compromised': ...}]}
+
+
+def write_json_atomically(file_url: str, data: dict, indent: int = None):
+    """
+    Writes to a temporary file and then swaps it in, so a crash never leaves a half written file. Every write
+    has its own temporary file, in the same directory so the swap stays a rename: concurrent writers never
+    write into each other's file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_url))
+    handle, temp_url = tempfile.mkstemp(prefix=os.path.basename(file_url) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(handle, "w") as outfile:
+            json.dump(data, outfile, indent=indent)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        # mkstemp makes it readable by its owner only.
+        if os.path.exists(file_url):
+            shutil.copymode(file_url, temp_url)
+        else:
+            os.chmod(temp_url, 0o644)
+        os.replace(temp_url, file_url)
+    except BaseException:
+        if os.path.exists(temp_url):
+            os.remove(temp_url)
+        raise
+
+
+def read_json_holdings(file_url: str) -> List[dict]:
+    if not os.path.exists(file_url):
+        return []
+    with open(file_url) as json_file:
+        return json.load(json_file)["holdings"]
+
+
+class PortfolioStore:
+    """ Where the holdings of the Portfolio are kept between turns. """
+
+    def load(self) -> List[dict]:
+        """ returns every holding """
+        raise NotImplementedError()
+
+    def save(self, holdings: List[dict]):
+        """ replaces every holding """
+        raise NotImplementedError()
+
+    def save_holding(self, holding: dict):
+        """ creates or updates a single holding """
+        raise NotImplementedError()
+
+    def save_holdings(self, holdings: List[dict]):
+        """ creates or updates several holdings at once """
+        for holding in holdings:
+            self.save_holding(holding)
+
+    def remove_holding(self, ticker: str):
+        raise NotImplementedError()
+
+    def version(self):
+        """ changes whenever the stored holdings may have changed, so cached portfolios know to reload """
+        raise NotImplementedError()
+
+
+class JsonFileStore(PortfolioStore):
+    """ The whole portfolio in a single JSON document, rewritten on every change. """
+
+    def __init__(self, file_url: str):
+        self.file_url = file_url
+
+    def load(self) -> List[dict]:
+        return read_json_holdings(self.file_url)
+
+    def save(self, holdings: List[dict]):
+        write_json_atomically(self.file_url, {"holdings": holdings}, indent=4)
+
+    def save_holding(self, holding: dict):
+        holdings = [item for item in self.load() if item["ticker"] != holding["ticker"]]
+        holdings.append(holding)
+        self.save(holdings)
+
+    def remove_holding(self, ticker: str):
+        self.save([item for item in self.load() if item["ticker"] != ticker])
+
+    def version(self):
+        if not os.path.exists(self.file_url):
+            return None
+        stat = os.stat(self.file_url)
+        return stat.st_mtime_ns, stat.st_size
+
+
+class JournalStore(PortfolioStore):
+    """
+    Append-only journal of holding changes, compacted into a snapshot in the background.
+
+    Every change appends one line to the journal, so its cost doesn't depend on the size of the portfolio.
+    Once the journal has compact_every entries it is rotated and a background thread folds it into the
+    snapshot, which keeps the data.txt format. On load the snapshot is replayed with the journal tail;
+    entries carry the full holding, so replaying one twice is harmless.
+    """
+
+    def __init__(self, snapshot_url: str, journal_url: str = None, compact_every: int = 1000, fsync: bool = True):
+        self.snapshot_url = snapshot_url
+        self.journal_url = journal_url or os.path.splitext(snapshot_url)[0] + ".journal"
+        self.rotated_journal_url = self.journal_url + ".1"
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._compaction: threading.Thread = None
+        self._holdings: Dict[str, dict] = None
+        self._journal_entries = 0
+        self._version = 0
+        # snapshots are written one at a time, and one taken earlier never replaces a later one.
+        self._snapshot_lock = threading.Lock()
+        self._snapshots_taken = 0
+        self._snapshot_written = 0
+
+        self.appends = 0
+        self.compactions = 0
+
+    def load(self) -> List[dict]:
+        with self._lock:
+            if self._holdings is None:
+                self._holdings = self._replay()
+            return [dict(holding) for holding in self._holdings.values()]
+
+    def save(self, holdings: List[dict]):
+        self.wait_for_compaction()
+        with self._lock:
+            self._holdings = {holding["ticker"]: dict(holding) for holding in holdings}
+            self._version += 1
+            self._snapshots_taken += 1
+            self._store_snapshot(
+                self._snapshots_taken, list(self._holdings.values()), [self.rotated_journal_url, self.journal_url]
+            )
+            self._journal_entries = 0
+
+    def save_holding(self, holding: dict):
+        self._append({"op": "upsert", "holding": holding})
+
+    def remove_holding(self, ticker: str):
+        self._append({"op": "remove", "ticker": ticker})
+
+    def version(self):
+        # the journal has a single writer, this process: only its own changes can make a copy stale.
+        return self._version
+
+    def compact(self):
+        """ Folds the journal into the snapshot right away, without waiting for the background thread. """
+        self.wait_for_compaction()
+        with self._lock:
+            number, snapshot = self._rotate_journal()
+        self._write_snapshot(number, snapshot)
+
+    def wait_for_compaction(self):
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._holdings is None:
+                self._holdings = self._replay()
+
+            with open(self.journal_url, "a") as journal:
+                journal.write(line)
+                journal.flush()
+                if self.fsync:
+                    os.fsync(journal.fileno())
+
+            self._apply(self._holdings, entry)
+            self._version += 1
+            self._journal_entries += 1
+            self.appends += 1
+
+            if self._journal_entries >= self.compact_every and self._compaction is None:
+                number, snapshot = self._rotate_journal()
+                self._compaction = threading.Thread(
+                    target=self._write_snapshot, args=(number, snapshot), name="portfolio-compaction",
+                    daemon=True
+                )
+                self._compaction.start()
+
+    def _rotate_journal(self) -> Tuple[int, List[dict]]:
+        """
+        Must hold the lock. New entries go to a fresh journal while the old one is being compacted.
+        Returns the snapshot to write, and its number.
+        """
+        if os.path.exists(self.journal_url):
+            if os.path.exists(self.rotated_journal_url):
+                # an earlier compaction didn't finish, keep its entries around until this one does.
+                with open(self.journal_url) as journal, open(self.rotated_journal_url, "a") as rotated:
+                    rotated.write(journal.read())
+                os.remove(self.journal_url)
+            else:
+                os.replace(self.journal_url, self.rotated_journal_url)
+        self._journal_entries = 0
+        self._snapshots_taken += 1
+        return self._snapshots_taken, [dict(holding) for holding in self._holdings.values()]
+
+    def _write_snapshot(self, number: int, snapshot: List[dict]):
+        try:
+            # the snapshot has everything the rotated journal had, it is not needed anymore. Unless a save()
+            # since it was taken has written a newer one, and removed the rotated journal itself.
+            if self._store_snapshot(number, snapshot, [self.rotated_journal_url]):
+                self.compactions += 1
+        finally:
+            with self._lock:
+                self._compaction = None
+
+    def _store_snapshot(self, number: int, snapshot: List[dict], journal_urls: List[str]) -> bool:
+        """ writes the snapshot and removes the journals it folds in, unless a later one was written already """
+        with self._snapshot_lock:
+            if number < self._snapshot_written:
+                return False
+            write_json_atomically(self.snapshot_url, {"holdings": snapshot}, indent=4)
+            self._snapshot_written = number
+            for url in journal_urls:
+                if os.path.exists(url):
+                    os.remove(url)
+            return True
+
+    def _replay(self) -> Dict[str, dict]:
+        holdings = {holding["ticker"]: holding for holding in read_json_holdings(self.snapshot_url)}
+        self._journal_entries = 0
+
+        # a rotated journal is only left behind when a compaction didn't finish.
+        for url in (self.rotated_journal_url, self.journal_url):
+            if not os.path.exists(url):
+                continue
+            with open(url, "rb") as journal:
+                data = journal.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                # torn last line from a crash in the middle of an append: cut it off, or the next append
+                # would be written at the end of it and be lost with it.
+                with open(url, "r+b") as journal:
+                    journal.truncate(complete)
+            for line in data[:complete].splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # not an entry at all: nothing to replay.
+                    continue
+                self._apply(holdings, entry)
+                if url == self.journal_url:
+                    self._journal_entries += 1
+
+        return holdings
+
+    @staticmethod
+    def _apply(holdings: Dict[str, dict], entry: dict):
+        if entry["op"] == "upsert":
+            holdings[entry["holding"]["ticker"]] = dict(entry["holding"])
+        elif entry["op"] == "remove":
+            holdings.pop(entry["ticker"], None)
+
+
+class SqliteStore(PortfolioStore):
+    """
+    Holdings in a SQLite database in WAL mode, one row per user and ticker.
+    Several worker processes can share the same database file; readers don't block the writer.
+    """
+
+    COLUMNS = ["ticker", "market", "company", "last_price", "avg_price", "quantity", "quantity_compromised"]
+
+    def __init__(self, db_url: str, user_id: str = "default", json_url: str = None):
+        self.db_url = db_url
+        self.user_id = user_id
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_url, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+        # first run with an existing data.txt: bring those holdings in.
+        if json_url is not None and os.path.exists(json_url) and not self.load():
+            self.import_json(json_url)
+
+    def _create_schema(self):
+        # no declared types: values come back exactly as they were written, "745" stays a string.
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS holdings (
+                user_id, ticker, market, company, last_price, avg_price, quantity, quantity_compromised,
+                PRIMARY KEY (user_id, ticker)
+            );
+            CREATE INDEX IF NOT EXISTS ix_holdings_ticker ON holdings (ticker);
+        """)
+
+    def load(self) -> List[dict]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT " + ", ".join(self.COLUMNS) + " FROM holdings WHERE user_id = ? ORDER BY rowid",
+                (self.user_id,),
+            ).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def save(self, holdings: List[dict]):
+        with self._lock, self._transaction():
+            self._connection.execute("DELETE FROM holdings WHERE user_id = ?", (self.user_id,))
+            self._upsert(holdings)
+
+    def save_holding(self, holding: dict):
+        self.save_holdings([holding])
+
+    def save_holdings(self, holdings: List[dict]):
+        """ all the holdings go in a single transaction """
+        with self._lock, self._transaction():
+            self._upsert(holdings)
+
+    def remove_holding(self, ticker: str):
+        with self._lock, self._transaction():
+            self._connection.execute(
+                "DELETE FROM holdings WHERE user_id = ? AND ticker = ?", (self.user_id, ticker)
+            )
+
+    def version(self):
+        # data_version only moves when another connection (e.g. another worker process) commits.
+        with self._lock:
+            return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def holders_of(self, ticker: str) -> List[str]:
+        """ users holding a ticker, served by the ticker index """
+        with self._lock:
+            rows = self._connection.execute("SELECT user_id FROM holdings WHERE ticker = ?", (ticker,)).fetchall()
+        return [row[0] for row in rows]
+
+    def import_json(self, json_url: str):
+        """ loads a data.txt file, replacing the holdings of the user """
+        self.save(read_json_holdings(json_url))
+
+    def export_json(self, json_url: str):
+        """ writes the holdings of the user in the data.txt format """
+        write_json_atomically(json_url, {"holdings": self.load()}, indent=4)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _upsert(self, holdings: List[dict]):
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO holdings (user_id, " + ", ".join(self.COLUMNS) + ") "
+            "VALUES (?, " + ", ".join("?" for _ in self.COLUMNS) + ")",
+            [[self.user_id] + [holding[column] for column in self.COLUMNS] for holding in holdings],
+        )
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+
+class _Transaction:
+    """ BEGIN IMMEDIATE ... COMMIT, or ROLLBACK when something fails. """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_stores: Dict[str, PortfolioStore] = {}
+
+
+def get_portfolio_store(file_url: str) -> PortfolioStore:
+    """ One store per data file for the whole process, of the kind selected by DefaultConfig.PORTFOLIO_STORE """
+    store = _stores.get(file_url)
+    if store is None:
+        if DefaultConfig.PORTFOLIO_STORE == "journal":
+            store = JournalStore(file_url, compact_every=DefaultConfig.PORTFOLIO_JOURNAL_COMPACT_EVERY)
+        elif DefaultConfig.PORTFOLIO_STORE == "json":
+            store = JsonFileStore(file_url)
+        elif DefaultConfig.PORTFOLIO_STORE == "sqlite":
+            store = SqliteStore(DefaultConfig.PORTFOLIO_DB_URL, DefaultConfig.PORTFOLIO_USER_ID, json_url=file_url)
+        else:
+            raise ValueError(f"Unknown portfolio store: {DefaultConfig.PORTFOLIO_STORE}")
+        _stores[file_url] = store
+    return store
@@ -1,30 +1,32 @@
 import json
-from typing import List
+from typing import Dict, List, Optional
 import random
 from datetime import datetime
 
 from collections import deque
 
-import matplotlib.pyplot as plt
-
 import enum
 
-import base64
-from io import BytesIO
-from matplotlib.figure import Figure
-
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as mticker
+# matplotlib and numpy take a good part of the startup time: they are imported where they are used.
 # from matplotlib.finance import candlestick_ohlc
 
-import numpy as np
 import urllib
 import datetime as dt
 
+from data_models.market_data import QUOTES, Quote, QuoteProvider
+from data_models.order_book import BUY, SELL, SIMULATED_MARKET, from_ticks
+from data_models.portfolio_store import PortfolioStore, get_portfolio_store
+from helpers.plot_cache import PLOT_CACHE
+
 data_file_url = "data/data.txt"
 
 
+def load_numpy():
+    """ numpy, imported the first time a portfolio needs it (or by the warm-up thread) """
+    import numpy
+    return numpy
+
+
 class Market:
     """ This class contains information about the available formal markets where stock trading is enabled """
     NASDAQ = ["NASDAQ", "National Association of Securities Dealers Automated Quotation"]
@@ -49,6 +51,7 @@ class Stock:
     def __init__(self, ticker=""):
         """ Create a new stock with ticker """
         self.ticker = ticker
+        self.company = ""
         self.market = Market.NASDAQ[0]
 
     def to_string(self):
@@ -75,7 +78,10 @@ class Operation:
     tax: float
     commission: float
     time_stamp: datetime
-    # TODO: Better use a multi state status: new, in-process, done, cancelled
+    # Pending once queued for the broker, InProgress while the broker has it, then Success or Failure.
+    status: "OperationStatus"
+    # id of the order at the broker once submitted, see BrokerClient.status.
+    order_id: int
     is_processed: bool
 
     # The tax is the same everywhere (in a country)
@@ -90,6 +96,8 @@ class Operation:
         self.amount = 0
         self.stock = Stock()
         self.time_stamp = datetime.now()
+        self.status = OperationStatus.Invalid
+        self.order_id = None
         self.is_processed = False
         self.tax = 0
         self.commission = 0
@@ -129,40 +137,203 @@ class OperationResult:
     has_errors: bool
     is_ok: bool
     status = 0
+    # what was actually traded, which can be less than the quantity of the operation.
+    filled_quantity: int
+    average_price: float
 
     def __init__(self):
         self.errors: List[str] = list()
         self.status = OperationStatus.Invalid
+        self.filled_quantity = 0
+        self.average_price = 0.0
+
+
+class HoldingsTable:
+    """ The numbers of the holdings of a Portfolio, column by column: one NumPy array per field and one row
+    per holding, in the same order as Portfolio.stocks_owned. Valuations work on whole columns at once. """
+    size: int
+    quantity: "np.ndarray"
+    average_price: "np.ndarray"
+    last_price: "np.ndarray"
+
+    def __init__(self, capacity: int = 16):
+        """ Create a new, empty, table """
+        np = load_numpy()
+        self.size = 0
+        self.quantity = np.zeros(capacity, dtype=np.int64)
+        self.average_price = np.zeros(capacity, dtype=np.float64)
+        self.last_price = np.zeros(capacity, dtype=np.float64)
+
+    def append(self, quantity, average_price, last_price) -> int:
+        """ adds a row and returns its number """
+        if self.size == len(self.quantity):
+            self._grow(max(2 * self.size, 16))
+        row = self.size
+        self.quantity[row] = parse_quantity(quantity)
+        self.average_price[row] = float(average_price)
+        self.last_price[row] = float(last_price)
+        self.size += 1
+        return row
+
+    def move(self, source: int, target: int):
+        """ copies a row over another one """
+        self.quantity[target] = self.quantity[source]
+        self.average_price[target] = self.average_price[source]
+        self.last_price[target] = self.last_price[source]
+
+    def pop(self):
+        """ drops the last row """
+        self.size -= 1
+
+    def _grow(self, capacity: int):
+        np = load_numpy()
+        for column in ("quantity", "average_price", "last_price"):
+            grown = np.zeros(capacity, dtype=getattr(self, column).dtype)
+            grown[:self.size] = getattr(self, column)[:self.size]
+            setattr(self, column, grown)
+
+
+class PortfolioValuation:
+    """ Market value, cost and unrealized P&L of every holding, and of the whole portfolio.
+    Arrays follow the order of Portfolio.stocks_owned. """
+    market_value: "np.ndarray"
+    cost: "np.ndarray"
+    unrealized_pnl: "np.ndarray"
+    weights: "np.ndarray"
+    total_market_value: float
+    total_cost: float
+    total_unrealized_pnl: float
+
+    def __init__(self, table: HoldingsTable):
+        np = load_numpy()
+        quantity = table.quantity[:table.size]
+        self.market_value = quantity * table.last_price[:table.size]
+        self.cost = quantity * table.average_price[:table.size]
+        self.unrealized_pnl = self.market_value - self.cost
+        self.total_market_value = float(self.market_value.sum())
+        self.total_cost = float(self.cost.sum())
+        self.total_unrealized_pnl = self.total_market_value - self.total_cost
+        if self.total_market_value:
+            self.weights = self.market_value / self.total_market_value
+        else:
+            self.weights = np.zeros(table.size)
+
+
+def parse_quantity(value) -> int:
+    """ quantities come as numbers or as text, like "745" in data.txt """
+    return int(float(value))
 
 
 class Holding:
     """ Contains details about the stocks owned by the user.
-        A holding is an executed buy operation."""
+        A holding is an executed buy operation.
+        Once it is part of a Portfolio its quantity and prices live in the HoldingsTable of the Portfolio,
+        and the holding is just a view over its row. """
     stock: Stock
-    quantity: int
     quantity_compromised: int
-    daily_variation: float
-    last_price: float
-    average_price: float
+    quote: Optional[Quote]
 
     def __init__(self):
         """ Create a new Holding """
         self.stock = Stock()
-        self.daily_variation = self.stock.get_current_price(self)
-        self.last_price = 150
-        self.average_price = 140
-        self.quantity = 0
+        # the latest market quote, see Portfolio.refresh_quotes. Only shown, never persisted: last_price stays
+        # the price the holding was saved with.
+        self.quote = None
+        self._table: HoldingsTable = None
+        self._row = 0
+        self._last_price = 150
+        self._average_price = 140
+        self._quantity = 0
         self.quantity_compromised = 0
 
+    @property
+    def quantity(self) -> int:
+        return int(self._table.quantity[self._row]) if self._table is not None else self._quantity
+
+    @quantity.setter
+    def quantity(self, value):
+        if self._table is not None:
+            self._table.quantity[self._row] = parse_quantity(value)
+        else:
+            self._quantity = value
+
+    @property
+    def average_price(self) -> float:
+        return float(self._table.average_price[self._row]) if self._table is not None else self._average_price
+
+    @average_price.setter
+    def average_price(self, value):
+        if self._table is not None:
+            self._table.average_price[self._row] = float(value)
+        else:
+            self._average_price = value
+
+    @property
+    def last_price(self) -> float:
+        return float(self._table.last_price[self._row]) if self._table is not None else self._last_price
+
+    @last_price.setter
+    def last_price(self, value):
+        if self._table is not None:
+            self._table.last_price[self._row] = float(value)
+        else:
+            self._last_price = value
+
+    @property
+    def daily_variation(self) -> float:
+        return self.quote.daily_variation if self.quote is not None else 0.0
+
+    @property
+    def market_price(self) -> float:
+        """ the quoted price, or the last price when there is no quote yet """
+        return self.quote.price if self.quote is not None else self.last_price
+
+    def bind(self, table: HoldingsTable, row: int):
+        """ from now on, the numbers of this holding are the ones in the row of the table """
+        self._table = table
+        self._row = row
+
+    def unbind(self):
+        """ keeps the numbers of the row, and stops following the table """
+        if self._table is not None:
+            self._quantity, self._average_price, self._last_price = \
+                self.quantity, self.average_price, self.last_price
+            self._table = None
+
     def to_string(self):
         """ returns a nice and handy text representation of the object """
         return "{0} {1}\t{2}\t{3}\t{4}\t{5}".format(self.stock.ticker.ljust(6, ' '),
                                                     self.stock.company.ljust(15, ' '),
                                                     str(self.quantity).ljust(8, ' '),
                                                     (str(self.daily_variation) + " %").ljust(8, " "),
-                                                    ("$ " + str(self.last_price)).ljust(8, " "),
+                                                    ("$ " + str(self.market_price)).ljust(8, " "),
                                                     ("$ " + str(self.average_price)).ljust(14, " "))
 
+    def to_dict(self) -> dict:
+        """ the holding as it is written to data.txt """
+        return {
+            'ticker': self.stock.ticker,
+            'market': self.stock.market,
+            'company': self.stock.company,
+            'last_price': self.last_price,
+            'avg_price': self.average_price,
+            'quantity': self.quantity,
+            'quantity_compromised': self.quantity_compromised
+        }
+
+    @staticmethod
+    def from_dict(data: dict):
+        """ the holding, as it was read from data.txt """
+        holding = Holding()
+        holding.stock.ticker = data['ticker']
+        holding.stock.market = data['market']
+        holding.stock.company = data['company']
+        holding.average_price = data['avg_price']
+        holding.last_price = data['last_price']
+        holding.quantity = data['quantity']
+        holding.quantity_compromised = data['quantity_compromised']
+        return holding
+
 
 class Broker:
     """ Represents an intermediary that executes buy and sell orders, among other tasks. """
@@ -175,46 +346,154 @@ class Broker:
         self.commission = 0.005
 
     @staticmethod
-    def execute(self, stock: Stock, operation: Operation):
-        """ Handles a generic operation to buy or sell """
-        # TODO: resolve if has to buy or sell using the Operation object
-        # this is half baked.
-        pass
+    def execute(self, stock: Stock, operation: Operation) -> OperationResult:
+        """ Handles a generic operation to buy or sell, in the order book of the stock (see SIMULATED_MARKET).
+        With a price it is a limit order, and what isn't filled right away rests in the book; without one it is
+        a market order, and what the market can't fill right away fails. """
+        result = OperationResult()
+        quantity = int(operation.quantity)
+        if quantity <= 0:
+            result.status = OperationStatus.Failure
+            result.errors.append("Quantity must be positive, not {0}".format(quantity))
+            result.has_errors = True
+            result.is_ok = False
+            return result
+
+        side = SELL if operation.type == 'sell' else BUY
+        price = float(operation.price) if operation.price else None
+        order, fills = SIMULATED_MARKET.submit(stock.ticker, side, quantity, price)
+
+        result.request_id = order.order_id
+        result.filled_quantity = sum(fill.quantity for fill in fills)
+        if result.filled_quantity:
+            traded = sum(fill.quantity * fill.price for fill in fills)
+            result.average_price = round(from_ticks(traded) / result.filled_quantity, Constants.max_decimals)
+
+        if order.remaining == 0:
+            result.status = OperationStatus.Success
+        elif not order.is_market:
+            # partially filled or not at all: the rest is working in the book.
+            result.status = OperationStatus.InProgress
+        elif not result.filled_quantity:
+            result.status = OperationStatus.Failure
+            result.errors.append("No offers in the market for {0}".format(order.quantity))
+        else:
+            result.status = OperationStatus.Failure
+            result.errors.append(
+                "Not enough offers in the market for {0} of {1}".format(order.remaining, order.quantity)
+            )
+        result.has_errors = bool(result.errors)
+        result.is_ok = not result.has_errors
+        return result
 
     @staticmethod
     def buy(self, operation: Operation) -> OperationResult:
         """ buy stocks """
-        # Dummy API invocation using HTTPS.
-        # unfold the operation parameter to verify it has all we need now.
-        quantity = operation.quantity
-        ticker = operation.stock.ticker
-        amount = operation.amount
-        tax = operation.tax
-        amount = operation.amount
-
-        # TODO: Implement this
-        result = OperationResult()
-        result.status = OperationStatus.Success
-
-        return result
+        return self.execute(self, operation.stock, operation)
 
     @staticmethod
-    def sell(self, holding: Holding, operation: Operation):
+    def sell(self, holding: Holding, operation: Operation) -> OperationResult:
         """ sell stocks """
-        # Dummy API invocation using HTTPS.
-        pass
+        return self.execute(self, operation.stock, operation)
 
 
 class Portfolio:
-    """ Helps to admin the stocks holdings owned by the user """
+    """ Helps to admin the stocks holdings owned by the user.
+    stocks_owned is indexed by ticker and market: add, find and remove holdings through the methods below,
+    so the indexes stay in sync. """
     stocks_owned: List[Holding]
     cash: float
 
-    def __init__(self):
+    def __init__(self, store: PortfolioStore = None):
         """ Create a new Portfolio """
         self.stocks_owned = list()
+        # quantity and prices of every holding, one row per position of stocks_owned
+        self.table = HoldingsTable()
+        # ticker -> position of the holding in stocks_owned
+        self._ticker_index: Dict[str, int] = {}
+        # market -> ticker -> holding
+        self._market_index: Dict[str, Dict[str, Holding]] = {}
+        # journal, sqlite or plain json, depending on the configuration.
+        self.store = store or get_portfolio_store(data_file_url)
+        # called after every write, see PortfolioCache
+        self.on_saved = None
         self.read_json_data_from_file()
 
+    def find_holding(self, ticker: str) -> Optional[Holding]:
+        """ O(1) lookup of the holding of a ticker, None if there is none """
+        position = self._ticker_index.get(ticker)
+        return None if position is None else self.stocks_owned[position]
+
+    def add_holding(self, holding: Holding):
+        """ O(1) insert, replacing the holding of the same ticker if there is one """
+        ticker = holding.stock.ticker
+        position = self._ticker_index.get(ticker)
+        if position is None:
+            row = self.table.append(holding.quantity, holding.average_price, holding.last_price)
+            holding.bind(self.table, row)
+            self._ticker_index[ticker] = len(self.stocks_owned)
+            self.stocks_owned.append(holding)
+        else:
+            replaced = self.stocks_owned[position]
+            self._unindex_market(replaced)
+            replaced.unbind()
+            quantity, average_price, last_price = holding.quantity, holding.average_price, holding.last_price
+            holding.bind(self.table, position)
+            holding.quantity, holding.average_price, holding.last_price = quantity, average_price, last_price
+            self.stocks_owned[position] = holding
+        self._market_index.setdefault(holding.stock.market, {})[ticker] = holding
+
+    def remove_holding(self, ticker: str) -> Optional[Holding]:
+        """ O(1) removal: the last holding takes the place of the removed one """
+        position = self._ticker_index.pop(ticker, None)
+        if position is None:
+            return None
+
+        holding = self.stocks_owned[position]
+        holding.unbind()
+        last = self.stocks_owned.pop()
+        if last is not holding:
+            self.table.move(len(self.stocks_owned), position)
+            last.bind(self.table, position)
+            self.stocks_owned[position] = last
+            self._ticker_index[last.stock.ticker] = position
+        self.table.pop()
+        self._unindex_market(holding)
+        return holding
+
+    async def refresh_quotes(self, provider: QuoteProvider = None) -> Dict[str, Quote]:
+        """ gets the quote of every holding, with a single batched request; the saved prices are left alone """
+        provider = provider or QUOTES
+        provider.remember_prices({holding.stock.ticker: holding.last_price for holding in self.stocks_owned})
+        quotes = await provider.get_quotes(holding.stock.ticker for holding in self.stocks_owned)
+        for holding in self.stocks_owned:
+            quote = quotes.get(holding.stock.ticker)
+            if quote is not None:
+                holding.quote = quote
+        return quotes
+
+    async def get_quote(self, ticker: str, provider: QuoteProvider = None) -> Optional[Quote]:
+        """ the quote of a ticker, held or not; None if there is none """
+        provider = provider or QUOTES
+        holding = self.find_holding(ticker)
+        if holding is not None:
+            provider.remember_prices({ticker: holding.last_price})
+        return (await provider.get_quotes([ticker])).get(ticker)
+
+    def valuation(self) -> PortfolioValuation:
+        """ market value, unrealized P&L and weights of every holding, in a single vectorized pass """
+        return PortfolioValuation(self.table)
+
+    def holdings_in_market(self, market: str) -> List[Holding]:
+        return list(self._market_index.get(market, {}).values())
+
+    def _unindex_market(self, holding: Holding):
+        market_holdings = self._market_index.get(holding.stock.market)
+        if market_holdings is not None:
+            market_holdings.pop(holding.stock.ticker, None)
+            if not market_holdings:
+                del self._market_index[holding.stock.market]
+
     def show(self) -> str:
         result = ""
         # TODO: Remember to show how much free cash is there in the account.
@@ -231,6 +510,7 @@ class Portfolio:
 
     def show_plot_sync(self):
         """ Plot test: careful, its syncronic """
+        import matplotlib.pyplot as plt
         print("Plot test")
         plt.plot([2, 4, 3, 5])
         plt.ylabel('some numbers')
@@ -255,64 +535,61 @@ class Portfolio:
         return result
 
     def get_plot_demo_img(self) -> str:
-        # Generate the figure **without using pyplot**.
-        fig = Figure()
-        ax = fig.subplots()
-        ax.plot([2, 4, 3, 5])
-        # Save it to a temporary buffer.
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
+        # Rendered once per distinct plot, see PlotCache.
+        data = PLOT_CACHE.get_line_plot([2, 4, 3, 5])
         # Embed the result in the html output.
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
         return f"<img src='data:image/png;base64,{data}'/>"
 
+    def apply_result(self, operation: Operation, result: OperationResult) -> Optional[Holding]:
+        """ Adds what the broker bought to the holding of the stock, or takes off what it sold, and saves the
+        holding. Nothing changes, and None is returned, when nothing was filled. """
+        filled = result.filled_quantity
+        if not filled:
+            return None
+
+        holding = self.find_holding(operation.stock.ticker)
+        if holding is None:
+            holding = Holding()
+            holding.stock.ticker = operation.stock.ticker
+            holding.stock.company = operation.stock.company
+            holding.stock.market = operation.stock.market
+            holding.average_price = result.average_price
+            self.add_holding(holding)
+
+        if operation.type == 'buy':
+            quantity = holding.quantity + filled
+            holding.average_price = round(
+                (holding.quantity * holding.average_price + filled * result.average_price) / quantity,
+                Constants.max_decimals
+            )
+            holding.quantity = quantity
+        else:
+            # TODO: selling more than the holding has should not be possible.
+            holding.quantity = holding.quantity - filled
+        holding.last_price = result.average_price
+        self.save_holding(holding)
+        return holding
+
     def merge_holdings(self):
         """ TODO: This has to check the collection of self.stocks_owned and merge similar elements."""
         # for holding in self.stocks_owned:
 
-    def write_json_data_to_file(self):
-        import json
-        # this clears the file content before writing it again
-        open(data_file_url, "w").close()
-
-        data = {'holdings': []}
+    def save_holding(self, holding: Holding):
+        """ Persists a single new or changed holding, without rewriting the rest of the portfolio. """
+        self.store.save_holding(holding.to_dict())
+        if self.on_saved is not None:
+            self.on_saved(self)
 
+    def write_json_data_to_file(self):
+        """ Persists the whole portfolio. """
         # TODO: Check if it is merging the holdings before writing
-        for holding in self.stocks_owned:
-            data['holdings'].append({
-                'ticker': holding.stock.ticker,
-                'market': holding.stock.market,
-                'company': holding.stock.company,
-                'last_price': holding.last_price,
-                'avg_price': holding.average_price,
-                'quantity': holding.quantity,
-                'quantity_compromised': holding.quantity_compromised
-            })
-
-        with open(data_file_url, 'w') as outfile:
-            json.dump(data, outfile, indent=4)
+        self.store.save([holding.to_dict() for holding in self.stocks_owned])
+        if self.on_saved is not None:
+            self.on_saved(self)
 
     def read_json_data_from_file(self):
-        import json
-
-        with open(data_file_url) as json_file:
-            data = json.load(json_file)
-            for p in data['holdings']:
-                print('Market: ' + p['market'])
-                print('Ticker: ' + p['ticker'])
-                print('Company: ' + p['company'])
-                print('')
-
-                # TODO: instead of print, bind to our objects
-                holding = Holding()
-                holding.stock.ticker = p['ticker']
-                holding.stock.market = p['market']
-                holding.stock.company = p['company']
-                holding.average_price = p['avg_price']
-                holding.last_price = p['last_price']
-                holding.quantity = p['quantity']
-                holding.quantity_compromised = p['quantity_compromised']
-                self.stocks_owned.append(holding)
+        for p in self.store.load():
+            self.add_holding(Holding.from_dict(p))
 
     @staticmethod
     def print_header(self):
@@ -332,10 +609,10 @@ class Portfolio:
         queue.enqueue('2')
         queue.enqueue('3')
         queue.enqueue('4')
-        print(queue.dequeue())  # 4
-        print(queue.dequeue())  # 3
-        print(queue.dequeue())  # 2
         print(queue.dequeue())  # 1
+        print(queue.dequeue())  # 2
+        print(queue.dequeue())  # 3
+        print(queue.dequeue())  # 4
         return ""
 
 
@@ -370,8 +647,9 @@ class Constants:
 
 class Queue:
     """
-    Thread-safe, memory-efficient, maximally-sized queue supporting queueing and
-    dequeueing in worst-case O(1) time.
+    Memory-efficient, maximally-sized FIFO queue supporting queueing and
+    dequeueing in worst-case O(1) time. Not thread-safe: see OrderQueue for the
+    queue between the dialogs and the broker.
     """
 
     def __init__(self, max_size=10):
@@ -383,18 +661,21 @@ class Queue:
         max_size : int
             Maximum number of items contained in this queue. Defaults to 10.
         """
-        self._queue = deque(maxlen=max_size)
+        self.max_size = max_size
+        self._queue = deque()
 
     def enqueue(self, item):
         """
         Queues the passed item (i.e., pushes this item onto the tail of this
         queue).
 
-        If this queue is already full, the item at the head of this queue
-        is silently removed from this queue *before* the passed item is
-        queued.
+        Raises
+        ----------
+        IndexError
+            If this queue is already full.
         """
-
+        if len(self._queue) >= self.max_size:
+            raise IndexError("enqueue to a full queue")
         self._queue.append(item)
 
     def dequeue(self):
@@ -407,4 +688,4 @@ class Queue:
         IndexError
             If this queue is empty.
         """
-        return self._queue.pop()
+        return self._queue.popleft()
@@ -18,49 +18,123 @@ from botbuilder.dialogs.prompts import (
 from botbuilder.dialogs.choices import Choice
 from botbuilder.core import MessageFactory, UserState
 
-from typing import List
-import recognizers_suite as Recognizers
-from recognizers_suite import Culture, ModelResult
-
+from typing import TYPE_CHECKING, List, Optional
 
 from data_models import UserProfile
 
-from botbuilder.core import CardFactory, MessageFactory
-from botbuilder.dialogs import (
-    ComponentDialog,
-    WaterfallDialog,
-    WaterfallStepContext,
-)
-from botbuilder.dialogs.prompts import TextPrompt, PromptOptions
+from botbuilder.core import CardFactory
 from botbuilder.schema import (
     ActionTypes,
     Attachment,
-    AnimationCard,
-    AudioCard,
-    HeroCard,
-    VideoCard,
-    ReceiptCard,
-    SigninCard,
-    ThumbnailCard,
-    MediaUrl,
-    CardAction,
-    CardImage,
-    ThumbnailUrl,
-    Fact,
-    ReceiptItem,
     Activity, ActivityTypes)
 
+from config import DefaultConfig
 from data_models.trade_assistant import Portfolio, Constants, Operation, Broker, Holding, BuyOperation, SellOperation, \
-    Sets
+    Sets, OperationResult, OperationStatus
 
-from helpers.activity_helper import create_activity_reply
+from data_models.order_queue import ORDER_QUEUE, OrderQueueFull
+from data_models.portfolio_cache import PORTFOLIO_CACHE
 
+from helpers.activity_helper import create_activity_reply
+from helpers.asset_store import ASSET_STORE
+from helpers.card_templates import CardTemplate
+from helpers.chart_renderer import CHART_RENDERER
+from helpers.plot_cache import plot_key, render_line_plot
+from helpers.recognizer_pipeline import RecognizerPipeline
+from helpers.recognizer_registry import MODEL_REGISTRY
+from helpers.utterance_cache import UtteranceCache
+
+import asyncio
 import base64
-from io import BytesIO
-from matplotlib.figure import Figure
-import os
+import functools
+import logging
+
+if TYPE_CHECKING:
+    from recognizers_text import ModelResult
+
+# per turn details, like the recognizer timings; the totals are in TradeDialog.trade_recognizers.stats().
+LOGGER = logging.getLogger(__name__)
+
+# Culture.English; Recognizers-Text itself is only imported when its models are built.
+DEFAULT_CULTURE = "en-us"
+
+
+def _holdings_column(header: str, field: str) -> dict:
+    return {
+        "type": "Column",
+        "items": [
+            {"type": "TextBlock", "weight": "bolder", "text": header},
+            {"$data": "${holdings}", "type": "TextBlock", "separator": True, "text": "${" + field + "}"},
+        ],
+    }
+
+
+# Parsed once: each view only binds the holdings, one row per holding.
+PORTFOLIO_CARD = CardTemplate({
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "body": [
+        {
+            "type": "ColumnSet",
+            "columns": [
+                _holdings_column("Asset", "ticker"),
+                _holdings_column("Quantity", "quantity"),
+                _holdings_column("Variation", "variation"),
+                _holdings_column("Price", "price"),
+            ],
+        }
+    ],
+})
+
+RECEIPT_CARD = CardTemplate({
+    "title": "Operation: ${type}",
+    "facts": [
+        {"key": "Order #", "value": "123456"},
+        {"key": "Ticker", "value": "${ticker}"},
+    ],
+    "items": [
+        {
+            "title": "${type} order",
+            "subtitle": "${company}",
+            "price": "$ ${price}",
+            "quantity": "${quantity}",
+        },
+        {
+            "title": "Commission",
+            "price": "$ ${commission}",
+            "quantity": "1",
+            "image": {"url": "https://github.com/amido/azure-vector-icons/raw/master/renders/cloud-service.png"},
+        },
+    ],
+    "tax": "$ ${tax}",
+    "total": "$ ${total}",
+    "buttons": [
+        {
+            "type": ActionTypes.open_url.value,
+            "title": "More Information",
+            "value": "https://github.com/southworks/manx-python-trade-sample-bot/",
+        }
+    ],
+})
+
 
-DEFAULT_CULTURE = Culture.English
+class TradeUtterance:
+    """ The values recognized in a trade message, like "Buy 25 MSFT for $ 120". """
+    has_price: bool
+    has_quantity: bool
+    has_time_stamp: bool
+    price: str
+    quantity: str
+    time_stamp: str
+
+    def __init__(self):
+        self.has_price = False
+        self.has_quantity = False
+        self.has_time_stamp = False
+        self.price = None
+        self.quantity = None
+        self.time_stamp = None
 
 
 class TradeDialog(ComponentDialog):
@@ -93,13 +167,13 @@ class TradeDialog(ComponentDialog):
 
         self.initial_dialog_id = WaterfallDialog.__name__
 
-        self.portfolio = Portfolio()
-        self.broker = Broker()
-        self.operation = Operation()
+        # next_step only reads currency, number and datetime results, so those are the only models it runs.
+        self.trade_recognizers = RecognizerPipeline(["number", "currency", "datetime"])
+        # users keep sending the same few order phrasings, there is no need to recognize them every time.
+        self.utterance_cache = UtteranceCache()
 
-    portfolio: Portfolio
-    broker: Broker
-    operation: Operation
+        # This instance is shared by every conversation: anything that belongs to a single trade
+        # (the portfolio, the broker, the pending operation) lives in the step values instead.
 
     async def options_step(
         self, step_context: WaterfallStepContext
@@ -144,28 +218,36 @@ class TradeDialog(ComponentDialog):
             #     MessageFactory.text("We could and should use a Card here.")
             # )
 
+            portfolio = PORTFOLIO_CACHE.get()
+            # one batched request for the prices of every holding.
+            await portfolio.refresh_quotes()
+
             # TODO: Verify that the operation object has ALL the info needed.
-            card = self.create_table_style_card()
+            card = self.create_table_style_card(portfolio)
 
             response = create_activity_reply(
                 step_context.context.activity, "", "", [card]
             )
             await step_context.context.send_activity(response)
 
-            img_result = self.portfolio.show()
-
             # TODO: Replace this text for a CARD
             await step_context.context.send_activity(
-               MessageFactory.text(self.portfolio.show())
+               MessageFactory.text(portfolio.show())
             )
 
-            # TODO: Create an Activity, and add to it an attachment
-            reply = Activity(type=ActivityTypes.message)
-            reply.text = "Portfolio image."
-            # TODO: Change the picture defined in this function with the PLOT
-            reply.attachments = [self.get_plot_img()]
-
-            await step_context.context.send_activity(reply)
+            plot = await self.get_plot_img(portfolio, step_context.context.activity.channel_id)
+            if plot is not None:
+                # TODO: Create an Activity, and add to it an attachment
+                reply = Activity(type=ActivityTypes.message)
+                reply.text = "Portfolio image."
+                reply.attachments = [plot]
+
+                await step_context.context.send_activity(reply)
+            else:
+                # rendering took too long: the text version above has to do this time.
+                await step_context.context.send_activity(
+                    MessageFactory.text("The portfolio image is not ready yet, please check again in a moment.")
+                )
 
             # Here, the conversation could continue, or be terminated and reset
             return await step_context.end_dialog()
@@ -203,70 +285,40 @@ class TradeDialog(ComponentDialog):
             MessageFactory.text(f"[In this step, we will use Recognizers-Text to learn the user intention.]")
         )
         # -------------------------------------------------------------
-        results = parse_all(user_input, DEFAULT_CULTURE)
-        # Flatten results
-        results = [item for sublist in results for item in sublist]
-
-        # ------------
-        # parse results to find the data we need:
-        has_time_stamp = False
-        has_price = False
-        has_quantity = False
+        utterance = self.recognize_trade(user_input)
+        has_time_stamp = utterance.has_time_stamp
+        has_price = utterance.has_price
+        has_quantity = utterance.has_quantity
         amount = None
 
-        # temporary lists
-        list_number = []
-        list_currency = []
-        list_datetime = []
-        value_key = "value"
-
-        for i in results:
-            # in each pass, according to type_name, append to a list, or several.
-            type_name = i.type_name
-            if type_name == Constants.currency_type_name:
-                has_price = True
-                list_currency.append(i.resolution.get(value_key))
-            if type_name == Constants.datetime_type_name or type_name == Constants.date_type_name:
-                has_time_stamp = True
-                list_datetime.append(i.resolution.get("values", "")[0][value_key])
-            if type_name == Constants.number_type_name:
-                if i.resolution.get(value_key):
-                    has_quantity = True
-                    value = i.resolution.get(value_key)
-                else:
-                    value = i.text
-                    has_quantity = False
-
-                list_number.append(value)
-
         # this contains the whole collection of stocks of the user.
-        # in the init method, it should populate the holdings using the data text file
-        self.portfolio = Portfolio()
+        # it is loaded once per process and shared, see PortfolioCache.
+        portfolio = PORTFOLIO_CACHE.get()
 
         # this represents a position taken with an investment instrument.
         # usually, there are many open at the same time.
         holding = Holding()
 
         # represents the intermediary broker
-        self.broker = Broker()
+        broker = Broker()
 
         # for current operation (buy, sell)
-        self.operation = Operation()
+        operation = Operation()
 
-        self.operation.buy = True if ('buy' in user_input or 'Buy' in user_input) else False
-        self.operation.sell = True if ('sell' in user_input or 'Sell' in user_input) else False
+        operation.buy = True if ('buy' in user_input or 'Buy' in user_input) else False
+        operation.sell = True if ('sell' in user_input or 'Sell' in user_input) else False
 
-        if self.operation.buy:
-            self.operation = BuyOperation()
-            self.operation.buy = True
-            self.operation.sell = False
-            self.operation.type = 'buy'
+        if operation.buy:
+            operation = BuyOperation()
+            operation.buy = True
+            operation.sell = False
+            operation.type = 'buy'
 
-        if self.operation.sell:
-            self.operation = SellOperation()
-            self.operation.buy = False
-            self.operation.sell = True
-            self.operation.type = 'sell'
+        if operation.sell:
+            operation = SellOperation()
+            operation.buy = False
+            operation.sell = True
+            operation.type = 'sell'
 
         # TODO: we should have a dict or similar with [ticker, company_name]
         # refactor this for other companies
@@ -276,79 +328,64 @@ class TradeDialog(ComponentDialog):
         if holding.stock.ticker == 'MSFT':
             holding.stock.company = "Microsoft"
 
+        quote = await portfolio.get_quote(holding.stock.ticker)
+        holding.quote = quote
+
         if has_time_stamp:
-            self.operation.time_stamp = list_datetime[0]
+            operation.time_stamp = utterance.time_stamp
 
-        if len(Sets.intersection(list_currency, list_number)) == 1:
-            self.operation.price = Sets.intersection(list_currency, list_number)[0]
-            holding.quantity = Sets.diff(list_number, list_currency)[0]
+        if utterance.price is not None:
+            operation.price = utterance.price
+            holding.quantity = utterance.quantity
 
         if has_quantity and has_price:
             print("Quantity: " + str(holding.quantity))
-            amount = int(holding.quantity) * float(self.operation.price)
-            self.operation.amount = round(amount, Constants.max_decimals)
+            amount = int(holding.quantity) * float(operation.price)
+            operation.amount = round(amount, Constants.max_decimals)
 
         print("Stock: " + holding.to_string())
-        print("Price: $ " + str(self.operation.price))
+        print("Price: $ " + str(operation.price))
 
         if has_time_stamp:
-            print("TimeStamp: " + str(self.operation.time_stamp))
+            print("TimeStamp: " + str(operation.time_stamp))
 
         if has_quantity and amount:
             print(Constants.separator)
             print("OPERATION DETAILS")
             print(Constants.separator)
-            print("Operation type: " + self.operation.type)
+            print("Operation type: " + operation.type)
             print("Amount: $ " + str(amount))
-            self.operation.commission = round(amount * self.broker.commission, Constants.max_decimals)
+            operation.commission = round(amount * broker.commission, Constants.max_decimals)
             # tax, over the commission is 0.01 (10%)
-            self.operation.tax = round(self.operation.commission * Constants.tax, Constants.max_decimals)
-            print("Commission: $ " + str(self.operation.commission))
-            print("TAX: $ " + str(self.operation.tax))
+            operation.tax = round(operation.commission * Constants.tax, Constants.max_decimals)
+            print("Commission: $ " + str(operation.commission))
+            print("TAX: $ " + str(operation.tax))
             print(Constants.separator)
-            print("Total: $ " + str(amount + self.operation.commission + self.operation.tax))
+            print("Total: $ " + str(amount + operation.commission + operation.tax))
             print(Constants.separator)
-            self.operation.quantity = holding.quantity
-            self.operation.stock.ticker = holding.stock.ticker
-            self.operation.stock.company = holding.stock.company
-            self.operation.stock.market = holding.stock.market
+
+        operation.quantity = holding.quantity
+        operation.stock.ticker = holding.stock.ticker
+        operation.stock.company = holding.stock.company
+        operation.stock.market = holding.stock.market
 
         str_quantity = str(holding.quantity)
-        str_price = "$ " + str(self.operation.price)
-        str_time_stamp = " on " + str(self.operation.time_stamp) if has_time_stamp else ""
-
-        # TODO: Check if the ticker is in use.
-        find_result = any(elem.stock.ticker == holding.stock.ticker for elem in self.portfolio.stocks_owned)
-
-        if find_result:
-            updated_holding = next((i for i in self.portfolio.stocks_owned if i.stock.ticker == holding.stock.ticker), None)
-            a = int(updated_holding.quantity)
-            b = int(holding.quantity)
-            # TODO: Check if is a buy or sell, the arithmetic logic
-            if self.operation.type == 'buy':
-                updated_holding.quantity = str(a + b)
-                # cash should be decreased by the total cost of the operation
-            elif self.operation.type == 'sell':
-                # in fact, this should alter the compromised quantity, until the order is executed. Its ok for now.
-                updated_holding.quantity = str(a - b)
-                # also, the cash should be incremented when selling
-                # self.portfolio.cash =
-        else:
-            self.portfolio.stocks_owned.append(holding)
-        # -------------------------------------------------------------
+        str_price = "$ " + str(operation.price)
+        str_time_stamp = " on " + str(operation.time_stamp) if has_time_stamp else ""
 
-        # TODO: Test write the portfolio with new values
-        self.portfolio.write_json_data_to_file()
+        # the portfolio only changes once the broker executed the operation, see apply_order_result.
+        # TODO: cash should be decreased by the total cost of a buy, and incremented by a sale.
+        # -------------------------------------------------------------
 
         operation_details = ""
         if has_quantity and amount:
-            commission = round(amount * self.broker.commission, Constants.max_decimals)
+            commission = round(amount * broker.commission, Constants.max_decimals)
             tax = round(commission * Constants.tax, Constants.max_decimals)
 
             operation_details += Constants.separator + "\n"
             operation_details += "OPERATION DETAILS" + "\n"
             operation_details += Constants.separator + "\n"
-            operation_details += "Operation type: " + self.operation.type + "\n"
+            operation_details += "Operation type: " + operation.type + "\n"
             operation_details += "Amount: $ " + str(amount) + "\n"
             operation_details += "Commission: $ " + str(commission) + "\n"
             operation_details += "TAX: $ " + str(tax) + "\n"
@@ -360,8 +397,11 @@ class TradeDialog(ComponentDialog):
             MessageFactory.text(operation_details)
         )
 
+        # keep the pending operation with this conversation's dialog state, check_is_info_ok executes it.
+        step_context.values["operation"] = operation
+
         # TODO: Here, we can show how much profit comes from the sale operation.
-        query = "Do you wish to " + self.operation.type + " " + str_quantity + " " + holding.stock.ticker + " stocks at " + str_price + str_time_stamp + "?"
+        query = "Do you wish to " + operation.type + " " + str_quantity + " " + holding.stock.ticker + " stocks at " + str_price + str_time_stamp + "?"
         return await step_context.prompt(
             ConfirmPrompt.__name__,
             PromptOptions(
@@ -372,322 +412,83 @@ class TradeDialog(ComponentDialog):
         # if we don't ask for confirmation, we terminate it:
         # return await step_context.end_dialog()
 
+    def recognize_trade(self, user_input: str) -> TradeUtterance:
+        """ Finds the price, quantity and time stamp of a trade message, reusing earlier results when possible """
+        utterance = self.utterance_cache.get(user_input)
+        if utterance is not None:
+            return utterance
+
+        results = self.trade_recognizers.parse(user_input, DEFAULT_CULTURE)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Recognizers: %s", self.trade_recognizers.format_timings())
+
+        # ------------
+        # parse results to find the data we need:
+        utterance = TradeUtterance()
+
+        # temporary lists
+        list_number = []
+        list_currency = []
+        list_datetime = []
+        value_key = "value"
+
+        for i in results:
+            # in each pass, according to type_name, append to a list, or several.
+            type_name = i.type_name
+            if type_name == Constants.currency_type_name:
+                utterance.has_price = True
+                list_currency.append(i.resolution.get(value_key))
+            if type_name == Constants.datetime_type_name or type_name == Constants.date_type_name:
+                utterance.has_time_stamp = True
+                list_datetime.append(i.resolution.get("values", "")[0][value_key])
+            if type_name == Constants.number_type_name:
+                if i.resolution.get(value_key):
+                    utterance.has_quantity = True
+                    value = i.resolution.get(value_key)
+                else:
+                    value = i.text
+                    utterance.has_quantity = False
+
+                list_number.append(value)
+
+        if utterance.has_time_stamp:
+            utterance.time_stamp = list_datetime[0]
+
+        if len(Sets.intersection(list_currency, list_number)) == 1:
+            utterance.price = Sets.intersection(list_currency, list_number)[0]
+            utterance.quantity = Sets.diff(list_number, list_currency)[0]
+
+        self.utterance_cache.put(user_input, utterance)
+        return utterance
+
     @staticmethod
     def create_receipt_card(self, operation: Operation) -> Attachment:
-        card = ReceiptCard(
-            title="Operation: " + operation.type,
-            facts=[
-                Fact(key="Order #", value="123456"),
-                Fact(key="Ticker", value=operation.stock.ticker),
-            ],
-            items=[
-                ReceiptItem(
-                    title=operation.type + " order",
-                    subtitle=operation.stock.company,
-                    price="$ " + str(operation.price),
-                    quantity=str(operation.quantity),
-                ),
-                ReceiptItem(
-                    title="Commission",
-                    price="$ " + str(operation.commission),
-                    quantity="1",
-                    image=CardImage(
-                        url="https://github.com/amido/azure-vector-icons/raw/master/"
-                        "renders/cloud-service.png"
-                    ),
-                ),
-            ],
-            tax="$ " + str(operation.tax),
-            total="$ " + str(operation.amount + operation.commission + operation.tax),
-            buttons=[
-                CardAction(
-                    type=ActionTypes.open_url,
-                    title="More Information",
-                    value="https://github.com/southworks/manx-python-trade-sample-bot/",
-                )
-            ],
-        )
-        return CardFactory.receipt_card(card)
+        card = RECEIPT_CARD.render({
+            "type": operation.type,
+            "ticker": operation.stock.ticker,
+            "company": operation.stock.company,
+            "price": str(operation.price),
+            "quantity": str(operation.quantity),
+            "commission": str(operation.commission),
+            "tax": str(operation.tax),
+            "total": str(operation.amount + operation.commission + operation.tax),
+        })
+        return Attachment(content_type=CardFactory.content_types.receipt_card, content=card)
 
     # I can create a method for returning a ready to use AdaptiveCard, for Table Style data.
-    def create_table_style_card(self) -> Attachment:
+    def create_table_style_card(self, portfolio: Portfolio) -> Attachment:
         # parse through the list and show every element in a row
-        # return CardFactory.adaptive_card(ADAPTIVE_CARD_CONTENT)
-        ADAPTIVE_CARD_CONTENT = {
-            "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-            "version": "1.0",
-            "type": "AdaptiveCard",
-            "speak": "Your flight is confirmed for you and 3 other passengers from San Francisco to Amsterdam on Friday, October 10 8:30 AM",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "text": "Passengers",
-                    "weight": "bolder",
-                    "isSubtle": False,
-                },
-                {"type": "TextBlock", "text": "Sarah Hum", "separator": True},
-                {"type": "TextBlock", "text": "Jeremy Goldberg", "spacing": "none"},
-                {"type": "TextBlock", "text": "Evan Litvak", "spacing": "none"},
-                {
-                    "type": "TextBlock",
-                    "text": "2 Stops",
-                    "weight": "bolder",
-                    "spacing": "medium",
-                },
-                {
-                    "type": "TextBlock",
-                    "text": "Fri, October 10 8:30 AM",
-                    "weight": "bolder",
-                    "spacing": "none",
-                },
-                {
-                    "type": "ColumnSet",
-                    "separator": True,
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "width": 1,
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "text": "San Francisco",
-                                    "isSubtle": True,
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "size": "extraLarge",
-                                    "color": "accent",
-                                    "text": "SFO",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": "auto",
-                            "items": [
-                                {"type": "TextBlock", "text": " "},
-                                {
-                                    "type": "Image",
-                                    "url": "http://messagecardplayground.azurewebsites.net/assets/airplane.png",
-                                    "size": "small",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": 1,
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "horizontalAlignment": "right",
-                                    "text": "Amsterdam",
-                                    "isSubtle": True,
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "horizontalAlignment": "right",
-                                    "size": "extraLarge",
-                                    "color": "accent",
-                                    "text": "AMS",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                    ],
-                },
-                {
-                    "type": "TextBlock",
-                    "text": "Non-Stop",
-                    "weight": "bolder",
-                    "spacing": "medium",
-                },
-                {
-                    "type": "TextBlock",
-                    "text": "Fri, October 18 9:50 PM",
-                    "weight": "bolder",
-                    "spacing": "none",
-                },
+        card = PORTFOLIO_CARD.render({
+            "holdings": [
                 {
-                    "type": "ColumnSet",
-                    "separator": True,
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "width": 1,
-                            "items": [
-                                {"type": "TextBlock", "text": "Amsterdam", "isSubtle": True},
-                                {
-                                    "type": "TextBlock",
-                                    "size": "extraLarge",
-                                    "color": "accent",
-                                    "text": "AMS",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": "auto",
-                            "items": [
-                                {"type": "TextBlock", "text": " "},
-                                {
-                                    "type": "Image",
-                                    "url": "http://messagecardplayground.azurewebsites.net/assets/airplane.png",
-                                    "size": "small",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": 1,
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "horizontalAlignment": "right",
-                                    "text": "San Francisco",
-                                    "isSubtle": True,
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "horizontalAlignment": "right",
-                                    "size": "extraLarge",
-                                    "color": "accent",
-                                    "text": "SFO",
-                                    "spacing": "none",
-                                },
-                            ],
-                        },
-                    ],
-                },
-                {
-                    "type": "ColumnSet",
-                    "spacing": "medium",
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "width": "1",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "text": "Total",
-                                    "size": "medium",
-                                    "isSubtle": True,
-                                }
-                            ],
-                        },
-                        {
-                            "type": "Column",
-                            "width": 1,
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "horizontalAlignment": "right",
-                                    "text": "$4,032.54",
-                                    "size": "medium",
-                                    "weight": "bolder",
-                                }
-                            ],
-                        },
-                    ],
-                },
-            ],
-        }
-
-        PROTYPE_CARD = {
-            "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-            "type": "AdaptiveCard",
-            "version": "1.0",
-            "body": [
-                {
-                    "type": "ColumnSet",
-                    "columns": [
-                        {
-                            "type": "Column",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "weight": "bolder",
-                                    "text": "Asset"
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "Apple"
-                                }, {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "Kiwi"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "Column",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "weight": "bolder",
-                                    "text": "Quantity"
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "Fruit"
-                                }, {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "Fruit"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "Column",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "weight": "bolder",
-                                    "text": "Variation"
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "2"
-                                }, {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "1"
-                                }
-                            ]
-                        },
-                        {
-                            "type": "Column",
-                            "items": [
-                                {
-                                    "type": "TextBlock",
-                                    "weight": "bolder",
-                                    "text": "Price"
-                                },
-                                {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "2"
-                                }, {
-                                    "type": "TextBlock",
-                                    "separator": True,
-                                    "text": "1"
-                                }
-                            ]
-                        }
-                    ]
+                    "ticker": holding.stock.ticker,
+                    "quantity": str(holding.quantity),
+                    "variation": str(holding.daily_variation) + " %",
+                    "price": "$ " + str(holding.market_price),
                 }
+                for holding in portfolio.stocks_owned
             ]
-        }
-
-        card = ADAPTIVE_CARD_CONTENT
-        card = PROTYPE_CARD
-
+        })
         return Attachment(
             content_type=CardFactory.content_types.adaptive_card, content=card
         )
@@ -695,37 +496,54 @@ class TradeDialog(ComponentDialog):
     async def check_is_info_ok(self, step_context: WaterfallStepContext) -> DialogTurnResult:
         """ This step ... """
         query = step_context.values["input"]
+        operation: Operation = step_context.values["operation"]
+        broker = Broker()
 
         if step_context.result:
             # User said "yes" so we can execute the operation.
+            # It goes to the broker queue: the turn doesn't wait for the broker, the queue workers do.
+            try:
+                order = await ORDER_QUEUE.submit(operation)
+            except OrderQueueFull:
+                await step_context.context.send_activity(
+                    MessageFactory.text(f"{broker.name} is busy right now and your order was not sent. "
+                                        f"Please try again in a moment.")
+                )
+                return await step_context.end_dialog()
+            # the portfolio gets what was filled whenever the broker answers, even after this turn stopped waiting.
+            order.result.add_done_callback(functools.partial(apply_order_result, operation))
+
             await step_context.context.send_activity(
                 MessageFactory.text(f"Executing Operation.")
             )
 
-            return_from_broker = ""
+            try:
+                result = await asyncio.wait_for(asyncio.shield(order.result), DefaultConfig.ORDER_RESULT_TIMEOUT)
+            except asyncio.TimeoutError:
+                await step_context.context.send_activity(
+                    MessageFactory.text(f"Order #{order.order_id} sent to {broker.name}. It is still being executed, "
+                                        f"your portfolio will be updated when it is.")
+                )
+                return await step_context.end_dialog()
+            except Exception:
+                # the queue logged why.
+                await step_context.context.send_activity(
+                    MessageFactory.text(f"Order #{order.order_id} could not be executed by {broker.name}. "
+                                        f"Please try again later.")
+                )
+                return await step_context.end_dialog()
 
-            # TODO: Here we have to at least simulate the API call to the Broker
-            if self.operation.type == 'buy':
-                # TODO: Define the interface of the Broker API: buy
-                return_from_broker = self.broker.buy(self, self.operation)
+            if operation.type == 'buy' and result.status != OperationStatus.Failure:
                 # TODO: Verify that the operation object has ALL the info needed.
-                card = self.create_receipt_card(self, self.operation)
+                card = self.create_receipt_card(self, operation)
 
                 response = create_activity_reply(
                     step_context.context.activity, "", "", [card]
                 )
                 await step_context.context.send_activity(response)
 
-            elif self.operation.type == 'sell':
-                a = 2
-                # TODO: Define the interface of the Broker API: sell
-                # self.broker.sell()
-
-            await step_context.context.send_activity(
-                MessageFactory.text(f"[Semi-Lie] Operation Executed. This is the details of the operation:")
-            )
             await step_context.context.send_activity(
-                MessageFactory.text(return_from_broker)
+                MessageFactory.text(describe_result(order.order_id, operation, result))
             )
 
             return await step_context.end_dialog()
@@ -742,89 +560,110 @@ class TradeDialog(ComponentDialog):
 
         return await step_context.end_dialog()
 
-    def get_inline_attachment(self) -> Attachment:
+    def get_inline_attachment(self, channel_id: str = None) -> Attachment:
         """
-        Creates an inline attachment sent from the bot to the user using a base64 string.
+        Creates an attachment linking to the image served by /api/assets, read from disk only once.
+        Channels listed in INLINE_ATTACHMENT_CHANNELS get it inline as a base64 string instead.
         Using a base64 string to send an attachment will not work on all channels.
         Additionally, some channels will only allow certain file types to be sent this way.
         For example a .png file may work but a .pdf file may not on some channels.
         Please consult the channel documentation for specifics.
         :return: Attachment
         """
-        file_path = os.path.join(os.getcwd(), "assets/architecture-resize.png")
-        with open(file_path, "rb") as in_file:
-            base64_image = base64.b64encode(in_file.read()).decode()
-
-        return Attachment(
-            name="architecture-resize.png",
-            content_type="image/png",
-            content_url=f"data:image/png;base64,{base64_image}",
-        )
-
-    def get_plot_img(self) -> Attachment:
-        # Generate the figure **without using pyplot**.
-        fig = Figure()
-        ax = fig.subplots()
-        ax.plot([2, 4, 3, 5])
-        # Save it to a temporary buffer.
-        buf = BytesIO()
-        fig.savefig(buf, format="png")
-        # Embed the result in the html output.
-        data = base64.b64encode(buf.getbuffer()).decode("ascii")
+        return ASSET_STORE.attachment("architecture-resize.png", channel_id)
+
+    async def get_plot_img(self, portfolio: Portfolio, channel_id: str = None) -> Optional[Attachment]:
+        # The market value of every holding, see Portfolio.valuation.
+        values = [round(float(value), Constants.max_decimals) for value in portfolio.valuation().market_value]
+        # Kept only in ASSET_STORE, served by /api/assets under its content address, so clients cache it until
+        # the portfolio changes.
+        name = f"plot-{plot_key(values)}.png"
+        if ASSET_STORE.cached(name) is None:
+            # Rendered off the event loop, once per distinct plot. None when it takes too long.
+            data = await CHART_RENDERER.render_line_plot(values)
+            if data is None:
+                return None
+            # if it is evicted, /api/assets renders it again for the links already sent.
+            ASSET_STORE.put_generated(
+                name, functools.partial(render_plot_png, values), "image/png", base64.b64decode(data)
+            )
         # original
         # return f"<img src='data:image/png;base64,{data}'/>"
         # return f"data:image/png;base64,{data}"
-        return Attachment(
-            name="plot.png",
-            content_type="image/png",
-            content_url=f"data:image/png;base64,{data}"
-        )
+        return ASSET_STORE.attachment(name, channel_id)
+
+
+def render_plot_png(values: List[float]) -> bytes:
+    return base64.b64decode(render_line_plot(values))
+
+
+def apply_order_result(operation: Operation, result: "asyncio.Future"):
+    """ done callback of a queued order: the portfolio takes what the broker filled """
+    if result.cancelled() or result.exception() is not None:
+        return
+    PORTFOLIO_CACHE.get().apply_result(operation, result.result())
+
+
+def describe_result(order_id: int, operation: Operation, result: OperationResult) -> str:
+    """ what the broker did with the order, for the user """
+    if result.status == OperationStatus.Failure:
+        return f"Order #{order_id} failed: {'; '.join(result.errors) or 'the broker rejected it'}."
+
+    traded = "bought" if operation.type == 'buy' else "sold"
+    filled = f"{traded} {result.filled_quantity} {operation.stock.ticker} at $ {result.average_price}"
+    if result.status == OperationStatus.Success:
+        return f"Order #{order_id} executed: {filled}."
+    if not result.filled_quantity:
+        return f"Order #{order_id} is waiting in the market for a price of $ {operation.price}, nothing was " \
+               f"{traded} yet."
+    return f"Order #{order_id} partially executed: {filled}, the other " \
+           f"{int(operation.quantity) - result.filled_quantity} are waiting in the market."
 
 
-def parse_all(user_input: str, culture: str) -> List[List[ModelResult]]:
+def parse_all(user_input: str, culture: str) -> List[List["ModelResult"]]:
     return [
         # Number recognizer - This function will find any number from the input
         # E.g "I have two apples" will return "2".
-        Recognizers.recognize_number(user_input, culture),
+        MODEL_REGISTRY.parse("number", user_input, culture),
 
         # Ordinal number recognizer - This function will find any ordinal number
         # E.g "eleventh" will return "11".
-        Recognizers.recognize_ordinal(user_input, culture),
+        MODEL_REGISTRY.parse("ordinal", user_input, culture),
 
         # Percentage recognizer - This function will find any number presented as percentage
         # E.g "one hundred percents" will return "100%"
-        Recognizers.recognize_percentage(user_input, culture),
+        MODEL_REGISTRY.parse("percentage", user_input, culture),
 
         # Age recognizer - This function will find any age number presented
         # E.g "After ninety five years of age, perspectives change" will return
         # "95 Year"
-        Recognizers.recognize_age(user_input, culture),
+        MODEL_REGISTRY.parse("age", user_input, culture),
 
         # Currency recognizer - This function will find any currency presented
         # E.g "Interest expense in the 1988 third quarter was $ 75.3 million"
         # will return "75300000 Dollar"
-        Recognizers.recognize_currency(user_input, culture),
+        MODEL_REGISTRY.parse("currency", user_input, culture),
 
         # Dimension recognizer - This function will find any dimension presented E.g "The six-mile trip to my airport
         # hotel that had taken 20 minutes earlier in the day took more than
         # three hours." will return "6 Mile"
-        Recognizers.recognize_dimension(user_input, culture),
+        MODEL_REGISTRY.parse("dimension", user_input, culture),
 
         # Temperature recognizer - This function will find any temperature presented
         # E.g "Set the temperature to 30 degrees celsius" will return "30 C"
-        Recognizers.recognize_temperature(user_input, culture),
+        MODEL_REGISTRY.parse("temperature", user_input, culture),
 
         # DateTime recognizer - This function will find any Date even if its write in colloquial language -
         # E.g "I'll go back 8pm today" will return "2017-10-04 20:00:00"
-        Recognizers.recognize_datetime(user_input, culture),
+        MODEL_REGISTRY.parse("datetime", user_input, culture),
 
         # PhoneNumber recognizer will find any phone number presented
         # E.g "My phone number is ( 19 ) 38294427."
-        Recognizers.recognize_phone_number(user_input, culture),
+        MODEL_REGISTRY.parse("phone_number", user_input, culture),
 
         # Email recognizer will find any phone number presented
         # E.g "Please write to me at Dave@abc.com for more information on task
         # #A1"
-        Recognizers.recognize_email(user_input, culture),
+        MODEL_REGISTRY.parse("email", user_input, culture),
     ]
 
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from botbuilder.schema import Activity
+
+from config import DefaultConfig
+from helpers.metrics import ratio
+
+
+class ActivityDedup:
+    """
+    Remembers the activities already handed to the adapter, by conversation id and activity id, for
+    window_seconds and up to max_size of them. Channels retry a delivery they didn't get an answer for in time;
+    the retry has the same ids and must not run the turn again (and book the same order twice).
+    """
+
+    def __init__(self, window_seconds: float = 300, max_size: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+        self.checked = 0
+        self.duplicates = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_of(activity: Activity) -> Optional[Tuple[str, str]]:
+        if not activity.id or activity.conversation is None or not activity.conversation.id:
+            return None
+        return activity.conversation.id, activity.id
+
+    def is_duplicate(self, activity: Activity) -> bool:
+        """ True for an activity seen within the window; otherwise it is recorded and False is returned """
+        key = self.key_of(activity)
+        if key is None:
+            # nothing to tell deliveries apart by.
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            self.checked += 1
+            self._expire(now)
+            if key in self._seen:
+                self.duplicates += 1
+                return True
+            self._seen[key] = now + self.window_seconds
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+                self.evictions += 1
+            return False
+
+    def report(self, activity: Activity) -> str:
+        return "[ActivityDedup]: dropped a retry of activity {0}, {1} of {2} deliveries ({3:.1%})".format(
+            activity.id, self.duplicates, self.checked, self.stats()["duplicate_rate"]
+        )
+
+    def forget(self, activity: Activity):
+        """ the turn failed: a retry of this activity has to be processed """
+        key = self.key_of(activity)
+        if key is not None:
+            with self._lock:
+                self._seen.pop(key, None)
+
+    def _expire(self, now: float):
+        # entries are in insertion order and all live for the same window: the expired ones are at the front.
+        while self._seen:
+            key, expires_at = next(iter(self._seen.items()))
+            if expires_at > now:
+                break
+            del self._seen[key]
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._seen),
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "evictions": self.evictions,
+            "duplicate_rate": ratio(self.duplicates, self.checked),
+        }
+
+
+# Shared by app.py and async_app.py.
+ACTIVITY_DEDUP = ActivityDedup(DefaultConfig.ACTIVITY_DEDUP_WINDOW, DefaultConfig.ACTIVITY_DEDUP_MAX_SIZE)
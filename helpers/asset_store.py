@@ -0,0 +1,183 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+from botbuilder.schema import Attachment
+
+from config import DefaultConfig
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+
+class Asset:
+    """ An image (or any file) served by /api/assets/<name>. """
+    name: str
+    content_type: str
+    data: bytes
+    etag: str
+    last_modified: datetime
+
+    def __init__(self, name: str, content_type: str, data: bytes, last_modified: datetime = None):
+        self.name = name
+        self.content_type = content_type
+        self.data = data
+        self.etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        # HTTP dates have a resolution of one second.
+        self.last_modified = (last_modified or datetime.now(timezone.utc)).replace(microsecond=0)
+        self._base64: str = None
+
+    @property
+    def last_modified_header(self) -> str:
+        return format_datetime(self.last_modified, usegmt=True)
+
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("ascii")
+        return self._base64
+
+    def is_not_modified(self, if_none_match: str = None, if_modified_since: str = None) -> bool:
+        """ True when the copy the client already has is still good, so a 304 is enough """
+        if if_none_match:
+            return self.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified_header,
+            "Cache-Control": "public, max-age=3600",
+        }
+
+
+class AssetStore:
+    """
+    In-memory byte cache of the assets the bot links to, LRU evicted past max_bytes.
+    Assets registered from a file are read on first use, and read again if they were evicted. Generated ones,
+    like plots, are generated again, so the links already sent keep working: up to max_generated of them are
+    remembered, the least recently used are forgotten first.
+    Safe to share between the Flask request threads and the event loop thread.
+    """
+
+    def __init__(self, base_url: str, inline_channels: List[str] = None, max_bytes: int = 32 * 1024 * 1024,
+                 max_generated: int = 1024):
+        self.base_url = base_url.rstrip("/")
+        self.inline_channels = inline_channels or []
+        self.max_bytes = max_bytes
+        self.max_generated = max_generated
+        self.size_bytes = 0
+        self._assets: "OrderedDict[str, Asset]" = OrderedDict()
+        self._files: Dict[str, tuple] = {}
+        self._generated: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.regenerated = 0
+
+    def put(self, name: str, data: bytes, content_type: str, last_modified: datetime = None) -> Asset:
+        asset = Asset(name, content_type, data, last_modified)
+        with self._lock:
+            previous = self._assets.pop(name, None)
+            if previous is not None:
+                self.size_bytes -= len(previous.data)
+            self._assets[name] = asset
+            self.size_bytes += len(data)
+
+            while self.size_bytes > self.max_bytes and len(self._assets) > 1:
+                _, evicted = self._assets.popitem(last=False)
+                self.size_bytes -= len(evicted.data)
+        return asset
+
+    def put_file(self, name: str, file_path: str, content_type: str):
+        """ registers a file as the asset name; it is read the first time it is asked for """
+        with self._lock:
+            self._files[name] = (file_path, content_type)
+
+    def put_generated(self, name: str, generate: Callable[[], bytes], content_type: str,
+                      data: bytes = None) -> Optional[Asset]:
+        """ registers generate as the source of the asset name, and data as what it generated, if given """
+        with self._lock:
+            self._generated[name] = (generate, content_type)
+            self._generated.move_to_end(name)
+            while len(self._generated) > self.max_generated:
+                self._generated.popitem(last=False)
+        return self.put(name, data, content_type) if data is not None else None
+
+    def cached(self, name: str) -> Optional[Asset]:
+        """ the asset if it is in memory; never reads nor generates it """
+        with self._lock:
+            asset = self._assets.get(name)
+            if asset is not None:
+                self._assets.move_to_end(name)
+            return asset
+
+    def get(self, name: str) -> Optional[Asset]:
+        """ the asset, read or generated again if it isn't in memory; None if there is no such asset """
+        asset = self.cached(name)
+        if asset is not None:
+            return asset
+        with self._lock:
+            registered = name in self._files
+            generated = self._generated.get(name)
+        # read or generated without holding the lock: a concurrent get of it at worst does it twice.
+        if registered:
+            return self._load_file(name)
+        if generated is not None:
+            generate, content_type = generated
+            self.regenerated += 1
+            return self.put(name, generate(), content_type)
+        return None
+
+    def content_type(self, name: str) -> Optional[str]:
+        with self._lock:
+            asset = self._assets.get(name)
+            if asset is not None:
+                return asset.content_type
+            source = self._files.get(name) or self._generated.get(name)
+        return source[1] if source is not None else None
+
+    def url_for(self, name: str) -> str:
+        return f"{self.base_url}/api/assets/{name}"
+
+    def attachment(self, name: str, channel_id: str = None) -> Optional[Attachment]:
+        """
+        An attachment pointing at the asset, None if there is no such asset. Channels listed in inline_channels
+        can't fetch our URLs, they get the asset inline as a base64 data URI instead.
+        """
+        if channel_id in self.inline_channels:
+            asset = self.get(name)
+            if asset is None:
+                return None
+            content_type = asset.content_type
+            content_url = f"data:{content_type};base64,{asset.base64()}"
+        else:
+            # the link is enough: the asset itself is only needed once it is fetched.
+            content_type = self.content_type(name)
+            if content_type is None:
+                return None
+            content_url = self.url_for(name)
+        return Attachment(name=name, content_type=content_type, content_url=content_url)
+
+    def _load_file(self, name: str) -> Asset:
+        with self._lock:
+            file_path, content_type = self._files[name]
+        with open(file_path, "rb") as in_file:
+            data = in_file.read()
+        modified = datetime.fromtimestamp(os.path.getmtime(file_path), timezone.utc)
+        return self.put(name, data, content_type, modified)
+
+
+# Served by /api/assets, in app.py and in async_app.py.
+ASSET_STORE = AssetStore(DefaultConfig.ASSETS_BASE_URL, DefaultConfig.INLINE_ATTACHMENT_CHANNELS)
+ASSET_STORE.put_file("architecture-resize.png", os.path.join(ASSETS_DIR, "architecture-resize.png"), "image/png")
@@ -0,0 +1,170 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Dict, List
+
+# "${name}" in a string is replaced by data["name"]. A list item with "$data": "${rows}" is repeated once per
+# element of data["rows"], and inside it "${name}" refers to the fields of that element.
+# This is the syntax of the Adaptive Cards templating language, restricted to what the bot's cards use.
+PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+REPEAT = "$data"
+
+
+class _Static:
+    """ JSON text that is the same for every render, serialized once """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def render(self, scope: dict, out: List[str]):
+        out.append(self.text)
+
+
+class _Slot:
+    """ a whole string value replaced by a bound value, which keeps its type """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def render(self, scope: dict, out: List[str]):
+        out.append(json.dumps(scope[self.name]))
+
+
+class _Text:
+    """ a string with bound values in the middle, e.g. "$ ${price}" """
+
+    def __init__(self, text: str):
+        self.pieces = PLACEHOLDER.split(text)
+
+    def render(self, scope: dict, out: List[str]):
+        # split() leaves the placeholder names at the odd positions.
+        out.append(json.dumps("".join(
+            str(scope[piece]) if index % 2 else piece for index, piece in enumerate(self.pieces)
+        )))
+
+
+class _Repeat:
+    """ a list item rendered once per element of a bound list """
+
+    def __init__(self, name: str, body: list):
+        self.name = name
+        self.body = body
+
+    def render_items(self, scope: dict) -> List[str]:
+        items = []
+        for element in scope[self.name]:
+            out: List[str] = []
+            for part in self.body:
+                part.render(element, out)
+            items.append("".join(out))
+        return items
+
+
+class _Array:
+    def __init__(self, items: list):
+        self.items = items
+
+    def render(self, scope: dict, out: List[str]):
+        rendered: List[str] = []
+        for item in self.items:
+            if isinstance(item, _Repeat):
+                rendered.extend(item.render_items(scope))
+            else:
+                item_out: List[str] = []
+                for part in item:
+                    part.render(scope, item_out)
+                rendered.append("".join(item_out))
+        out.append("[" + ", ".join(rendered) + "]")
+
+
+def _compile(node, parts: list):
+    """ appends to parts what renders node, merging the static text next to each other """
+    if isinstance(node, dict):
+        _append_static(parts, "{")
+        for index, (key, value) in enumerate(node.items()):
+            _append_static(parts, (", " if index else "") + json.dumps(key) + ": ")
+            _compile(value, parts)
+        _append_static(parts, "}")
+    elif isinstance(node, list):
+        items = []
+        for item in node:
+            if isinstance(item, dict) and REPEAT in item:
+                name = PLACEHOLDER.fullmatch(item[REPEAT]).group(1)
+                body = []
+                _compile({key: value for key, value in item.items() if key != REPEAT}, body)
+                items.append(_Repeat(name, body))
+            else:
+                item_parts = []
+                _compile(item, item_parts)
+                items.append(item_parts)
+        if all(not isinstance(item, _Repeat) and _is_static(item) for item in items):
+            _append_static(parts, json.dumps(node))
+        else:
+            parts.append(_Array(items))
+    elif isinstance(node, str) and PLACEHOLDER.search(node):
+        match = PLACEHOLDER.fullmatch(node)
+        parts.append(_Slot(match.group(1)) if match else _Text(node))
+    else:
+        _append_static(parts, json.dumps(node))
+
+
+def _append_static(parts: list, text: str):
+    if parts and isinstance(parts[-1], _Static):
+        parts[-1] = _Static(parts[-1].text + text)
+    else:
+        parts.append(_Static(text))
+
+
+def _is_static(parts: list) -> bool:
+    return all(isinstance(part, _Static) for part in parts)
+
+
+class CardTemplate:
+    """
+    A card parsed once into pre-serialized static JSON and slots for the bound data.
+    Rendering only serializes the bound values; the cards of the last max_cached inputs are kept, so showing
+    the same data again costs a lookup.
+    """
+
+    def __init__(self, template: dict, max_cached: int = 64):
+        self.max_cached = max_cached
+        self._parts: list = []
+        _compile(template, self._parts)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.renders = 0
+        self.hits = 0
+
+    def render_json(self, data: dict) -> str:
+        return self._render(data)[0]
+
+    def render(self, data: dict) -> dict:
+        """ the card as a dict, shared by every caller with the same data: don't modify it """
+        return self._render(data)[1]
+
+    def _render(self, data: dict) -> tuple:
+        key = hashlib.sha1(repr(data).encode("utf-8")).hexdigest()
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        out: List[str] = []
+        for part in self._parts:
+            part.render(data, out)
+        text = "".join(out)
+        entry = (text, json.loads(text))
+        self.renders += 1
+
+        self._cache[key] = entry
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._cache), "renders": self.renders, "hits": self.hits}
@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from helpers.plot_cache import PLOT_CACHE, PlotCache, plot_key, render_line_plot
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _warm_up_worker():
+    """ runs once in every worker process: matplotlib is imported and ready before the first job """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure  # noqa: F401
+    from matplotlib.backends import backend_agg  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+class ChartRenderService:
+    """
+    Renders charts in a pool of worker processes, so rasterizing never blocks the event loop.
+    Results go to the PlotCache, a cached chart is returned without touching the pool. Without a cache nothing is
+    kept, the caller keeps what it needs. Turns asking for a chart that is already being rendered wait for that
+    same job.
+    """
+
+    def __init__(self, cache: Optional[PlotCache] = PLOT_CACHE):
+        self.cache = cache
+        self.workers = 0
+        self.timeout = 5.0
+        self._executor: ProcessPoolExecutor = None
+        # plot key -> job rendering it
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        # jobs in the pool, until they finish: a render that timed out still takes a worker.
+        self.queue_depth = 0
+        self.rendered = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def start(self, workers: int = 2, timeout: float = 5.0):
+        """ starts the worker processes, which load matplotlib in the background """
+        if self._executor is not None:
+            return
+        self.workers = workers
+        self.timeout = timeout
+        # the workers may be started after other threads: forking those could copy a lock some thread holds.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up_worker, mp_context=context)
+        # one job per worker, so they are all started now instead of on the first charts.
+        for _ in range(workers):
+            self._executor.submit(_ping)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def render_line_plot(self, values: List[float], timeout: float = None, **params) -> Optional[str]:
+        """ base64 PNG of the plot, or None if it couldn't be rendered within the timeout """
+        key = plot_key(values, **params)
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is not None:
+            return data
+
+        loop = asyncio.get_running_loop()
+        job = self._pending.get(key)
+        if job is not None and job.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            job = self._submit(loop, key, functools.partial(render_line_plot, values, **params))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        except Exception:
+            # _on_rendered has logged it.
+            return None
+
+    def _submit(self, loop: asyncio.AbstractEventLoop, key: str, render) -> asyncio.Future:
+        if self._executor is None:
+            self.start()
+        job = loop.run_in_executor(self._executor, render)
+        self._pending[key] = job
+        self.queue_depth += 1
+        # even if nobody waits for it anymore, a finished chart is worth keeping.
+        job.add_done_callback(functools.partial(self._on_rendered, key))
+        return job
+
+    def _on_rendered(self, key: str, job: asyncio.Future):
+        self.queue_depth -= 1
+        if self._pending.get(key) is job:
+            del self._pending[key]
+        if job.cancelled():
+            self.failures += 1
+            return
+        error = job.exception()
+        if error is not None:
+            self.failures += 1
+            LOGGER.error("[ChartRenderService]: rendering plot %s failed", key, exc_info=error)
+            return
+        self.rendered += 1
+        if self.cache is not None:
+            self.cache.put(key, job.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "rendered": self.rendered,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+        }
+
+
+# Started by bot_runtime.start(). The charts of the bot are kept, as PNG, in the AssetStore serving them.
+CHART_RENDERER = ChartRenderService(cache=None)
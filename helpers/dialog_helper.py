@@ -1,18 +1,41 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+from collections import OrderedDict
+from typing import Tuple
+
 from botbuilder.core import StatePropertyAccessor, TurnContext
 from botbuilder.dialogs import Dialog, DialogSet, DialogTurnStatus
 
 
 class DialogHelper:
+    # (dialog, accessor) -> the DialogSet built for them, shared by every turn.
+    _dialog_sets: "OrderedDict[Tuple[int, int], DialogSet]" = OrderedDict()
+    max_dialog_sets = 64
+
+    @staticmethod
+    def get_dialog_set(dialog: Dialog, accessor: StatePropertyAccessor) -> DialogSet:
+        """
+        The DialogSet holding the dialog, built (and the dialog added to it) only the first time. It keeps no
+        state of its own: every turn reads and writes the dialog stack through the accessor, so one set can serve
+        every conversation. The accessor should be created once, not on every turn, for the set to be reused.
+        """
+        # the set references the dialog and the accessor, so their ids can't be reused while it is cached.
+        key = (id(dialog), id(accessor))
+        dialog_set = DialogHelper._dialog_sets.get(key)
+        if dialog_set is None:
+            dialog_set = DialogSet(accessor)
+            dialog_set.add(dialog)
+            DialogHelper._dialog_sets[key] = dialog_set
+            while len(DialogHelper._dialog_sets) > DialogHelper.max_dialog_sets:
+                DialogHelper._dialog_sets.popitem(last=False)
+        return dialog_set
+
     @staticmethod
     async def run_dialog(
         dialog: Dialog, turn_context: TurnContext, accessor: StatePropertyAccessor
     ):
-        dialog_set = DialogSet(accessor)
-        dialog_set.add(dialog)
-
+        dialog_set = DialogHelper.get_dialog_set(dialog, accessor)
         dialog_context = await dialog_set.create_context(turn_context)
         results = await dialog_context.continue_dialog()
         if results.status == DialogTurnStatus.Empty:
@@ -0,0 +1,234 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import copy
+import pickle
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from botbuilder.core import Storage, StoreItem
+
+# a key deleted in memory whose delete has not been flushed yet.
+_DELETED = (None, None)
+
+
+def _e_tag_of(item) -> Optional[str]:
+    if isinstance(item, dict):
+        return item.get("e_tag")
+    return getattr(item, "e_tag", None)
+
+
+def _with_e_tag(item, e_tag: str):
+    """ a copy of the item carrying the new e_tag, the caller's object is left alone """
+    if isinstance(item, dict):
+        return dict(item, e_tag=e_tag)
+    item = copy.copy(item)
+    item.e_tag = e_tag
+    return item
+
+
+class DurableStorage(Storage):
+    """
+    Bot state in a SQLite file, so it survives restarts, behind an in-memory LRU of the hottest keys.
+
+    Writes follow the contract of MemoryStorage: a change carrying an e_tag that is not "*" and differs from the
+    stored one raises KeyError (optimistic concurrency), and every write gets a new e_tag. Writes and deletes are
+    applied to memory right away and flushed to the file in one transaction flush_interval seconds later, so
+    several writes of the same key in between cost a single row. Values are pickled.
+
+    The cache assumes the turns of a conversation are served by a single process at a time.
+    """
+
+    def __init__(self, db_url: str, cache_size: int = 1024, flush_interval: float = 0.05):
+        super().__init__()
+        self.db_url = db_url
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+
+        # _lock guards the in-memory entries and is only held for dict operations, so the event loop never
+        # waits on it for long. _db_lock guards the connection: it is held across whole transactions, and only
+        # ever taken off the event loop.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # opened on first use, so creating the storage doesn't touch the disk.
+        self._connection: sqlite3.Connection = None
+
+        # key -> (e_tag, pickled value)
+        self._cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._dirty: Dict[str, Tuple[str, bytes]] = {}
+        # entries of the flush in progress: still readable while they are being written.
+        self._flushing: Dict[str, Tuple[str, bytes]] = {}
+        self._flush_handle: asyncio.TimerHandle = None
+
+        self.reads = 0
+        self.cache_hits = 0
+        self.writes = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    async def read(self, keys: List[str]) -> Dict[str, object]:
+        # nothing to read, same as MemoryStorage.
+        if not keys:
+            return {}
+        entries = await self._entries(keys)
+        self.reads += len(keys)
+        return {key: pickle.loads(entry[1]) for key, entry in entries.items() if entry is not _DELETED}
+
+    async def write(self, changes: Dict[str, StoreItem]):
+        if changes is None:
+            raise Exception("Changes are required when writing")
+        if not changes:
+            return
+
+        current = await self._entries(list(changes.keys()))
+        for key, change in changes.items():
+            new_e_tag = _e_tag_of(change)
+            if new_e_tag == "":
+                raise Exception("storage.write(): etag missing")
+            old_e_tag = current.get(key, _DELETED)[0]
+            if old_e_tag is not None and new_e_tag is not None and new_e_tag != "*" and new_e_tag != old_e_tag:
+                raise KeyError("Etag conflict.\nOriginal: %s\r\nCurrent: %s" % (new_e_tag, old_e_tag))
+
+        for key, change in changes.items():
+            e_tag = uuid.uuid4().hex
+            self._set(key, (e_tag, pickle.dumps(_with_e_tag(change, e_tag), pickle.HIGHEST_PROTOCOL)))
+            self.writes += 1
+        self._schedule_flush()
+
+    async def delete(self, keys: List[str]):
+        for key in keys:
+            self._set(key, _DELETED)
+        self._schedule_flush()
+
+    async def flush(self):
+        """ writes what is pending right away, off the event loop """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await asyncio.get_event_loop().run_in_executor(None, self.flush_sync)
+
+    def flush_sync(self):
+        """ same as flush, blocking: for shutdown, e.g. from atexit """
+        with self._db_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                self._flushing = dirty
+            if not dirty:
+                return
+            self._connect()
+            upserts = [(key, e_tag, data) for key, (e_tag, data) in dirty.items() if data is not None]
+            deletes = [(key,) for key, entry in dirty.items() if entry is _DELETED]
+            try:
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO state (key, e_tag, data) VALUES (?, ?, ?)", upserts
+                    )
+                    self._connection.executemany("DELETE FROM state WHERE key = ?", deletes)
+                    self._connection.execute("COMMIT")
+                except Exception:
+                    self._connection.execute("ROLLBACK")
+                    raise
+            except Exception:
+                with self._lock:
+                    # keep them for the next flush, unless they were written again meanwhile.
+                    for key, entry in dirty.items():
+                        self._dirty.setdefault(key, entry)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+                self.flushes += 1
+                self.flushed_rows += len(dirty)
+
+    def close(self):
+        self.flush_sync()
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    async def _entries(self, keys: List[str]) -> Dict[str, Tuple[str, bytes]]:
+        """ the current entry of every key found: what is in memory first (see _current), then the file """
+        entries: Dict[str, Tuple[str, bytes]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                entry = self._current(key)
+                if entry is not None:
+                    entries[key] = entry
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                else:
+                    missing.append(key)
+
+        if missing:
+            loaded = await asyncio.get_event_loop().run_in_executor(None, self._load, missing)
+            with self._lock:
+                for key, entry in loaded.items():
+                    # a write that came in while the file was being read wins.
+                    entries[key] = self._current(key) or entry
+                    if key not in self._dirty:
+                        self._put_in_cache(key, entries[key])
+        return entries
+
+    def _current(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """ pending write, write being flushed or cached entry of a key, in that order; the caller holds _lock """
+        return self._dirty.get(key) or self._flushing.get(key) or self._cache.get(key)
+
+    def _connect(self) -> sqlite3.Connection:
+        """ the connection, opened the first time; the caller holds _db_lock """
+        if self._connection is None:
+            connection = sqlite3.connect(self.db_url, timeout=30, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, e_tag TEXT, data BLOB)")
+            self._connection = connection
+        return self._connection
+
+    def _load(self, keys: List[str]) -> Dict[str, Tuple[str, bytes]]:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT key, e_tag, data FROM state WHERE key IN (" + ", ".join("?" for _ in keys) + ")", keys
+            ).fetchall()
+        return {key: (e_tag, data) for key, e_tag, data in rows}
+
+    def _set(self, key: str, entry: Tuple[str, bytes]):
+        with self._lock:
+            self._dirty[key] = entry
+            if entry is _DELETED:
+                self._cache.pop(key, None)
+            else:
+                self._put_in_cache(key, entry)
+
+    def _put_in_cache(self, key: str, entry: Tuple[str, bytes]):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        asyncio.ensure_future(self.flush())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "cached": len(self._cache),
+            "pending": len(self._dirty),
+            "reads": self.reads,
+            "cache_hits": self.cache_hits,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "coalesced": max(self.writes - self.flushed_rows - len(self._dirty), 0),
+        }
@@ -0,0 +1,12 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+
+def ratio(value: float, total: float) -> float:
+    """ value / total, or 0.0 while there is nothing to divide by: the rates and averages of the stats() """
+    return value / total if total else 0.0
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    """ share of the lookups a cache answered """
+    return ratio(hits, hits + misses)
@@ -0,0 +1,157 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import copy
+from collections import deque
+from typing import Deque, List, Union
+
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity, ActivityTypes, DeliveryModes, ResourceResponse
+
+from helpers.metrics import ratio
+
+
+def can_merge(previous: Activity, activity: Activity) -> bool:
+    """
+    Whether two consecutive messages can go out as one without the user seeing them in a different order:
+    the text of a message is shown above its attachments, so text can't follow attachments, and suggested
+    actions only make sense on the last message.
+    """
+    if previous.type != ActivityTypes.message or activity.type != ActivityTypes.message:
+        return False
+    if previous.attachments and activity.text:
+        return False
+    if previous.suggested_actions or previous.speak or activity.speak:
+        return False
+    if previous.value is not None or activity.value is not None:
+        return False
+    if previous.channel_data is not None or activity.channel_data is not None:
+        return False
+    return (
+        (previous.text_format or "markdown") == (activity.text_format or "markdown")
+        and (previous.attachment_layout or "list") == (activity.attachment_layout or "list")
+    )
+
+
+def merge(previous: Activity, activity: Activity) -> Activity:
+    """ one message with the text and attachments of both, in order; the last one's prompt settings win """
+    merged = copy.copy(previous)
+    merged.text = "\n\n".join(text for text in (previous.text, activity.text) if text)
+    merged.attachments = (previous.attachments or []) + (activity.attachments or [])
+    merged.suggested_actions = activity.suggested_actions
+    merged.input_hint = activity.input_hint
+    return merged
+
+
+class OutboundMetrics:
+    """ Activities the bot sent in the last turns, and how many requests to the channel merging them saved. """
+
+    def __init__(self, history: int = 1000):
+        self.saved_per_turn: Deque[int] = deque(maxlen=history)
+        self.activities = 0
+        self.delivered = 0
+
+    def record(self, activities: int, delivered: int):
+        self.activities += activities
+        self.delivered += delivered
+        self.saved_per_turn.append(activities - delivered)
+
+    def to_string(self):
+        """ returns a nice and handy text representation of the object """
+        average = ratio(sum(self.saved_per_turn), len(self.saved_per_turn))
+        return "Outbound: {0} activities in {1} requests, {2:.2f} requests saved per turn".format(
+            self.activities, self.delivered, average
+        )
+
+
+class OutboundBuffer:
+    """
+    Holds the activities a turn sends and delivers them together, with a single adapter.send_activities, when
+    the turn (or whoever calls flush) is done. With merge_messages, consecutive messages that can be shown as
+    one are merged too (see can_merge), since the channel connector takes every activity in its own request.
+
+    Order is kept: send_now, and anything the buffer doesn't hold (invoke responses, expectReplies turns),
+    first delivers what is already waiting. Once flushed for the last time, sends go straight out again, e.g.
+    the error messages of on_turn_error.
+
+    A buffered activity hasn't been sent yet, so turn_context.send_activity returns None for it instead of a
+    ResourceResponse. Whatever needs the id of what it sent, to update or delete it later, sends it with
+    send_now.
+    """
+
+    TURN_STATE_KEY = "OutboundBuffer"
+
+    def __init__(self, turn_context: TurnContext, merge_messages: bool = False, metrics: OutboundMetrics = None):
+        self.turn_context = turn_context
+        self.merge_messages = merge_messages
+        self.metrics = metrics
+        self.pending: List[Activity] = []
+        self.activities = 0
+        self.delivered = 0
+        self.closed = False
+        self._bypass = False
+
+    @staticmethod
+    def start(turn_context: TurnContext, merge_messages: bool = False,
+              metrics: OutboundMetrics = None) -> "OutboundBuffer":
+        """ buffers what the turn sends from now on: send_activity returns None until it is flushed """
+        buffer = OutboundBuffer(turn_context, merge_messages, metrics)
+        turn_context.turn_state[OutboundBuffer.TURN_STATE_KEY] = buffer
+        turn_context.on_send_activities(buffer._on_send_activities)
+        return buffer
+
+    @staticmethod
+    async def send_now(turn_context: TurnContext, activity_or_text: Union[Activity, str]) -> ResourceResponse:
+        """
+        sends right away, after whatever the turn already sent: for messages that can't wait the turn out, and
+        for those whose ResourceResponse is needed
+        """
+        buffer: OutboundBuffer = turn_context.turn_state.get(OutboundBuffer.TURN_STATE_KEY)
+        if buffer is None or buffer.closed:
+            return await turn_context.send_activity(activity_or_text)
+        await buffer._deliver()
+        buffer._bypass = True
+        try:
+            return await turn_context.send_activity(activity_or_text)
+        finally:
+            buffer._bypass = False
+
+    async def flush(self, close: bool = True):
+        """ delivers what is waiting; unless close is False, later sends are no longer buffered """
+        try:
+            await self._deliver()
+        finally:
+            if close and not self.closed:
+                self.closed = True
+                if self.metrics is not None:
+                    self.metrics.record(self.activities, self.delivered)
+
+    async def _on_send_activities(self, turn_context: TurnContext, activities: List[Activity], next_send):
+        passes_through = (
+            self.closed
+            or self._bypass
+            or turn_context.activity.delivery_mode == DeliveryModes.expect_replies
+            or any(activity.type == ActivityTypes.invoke_response for activity in activities)
+        )
+        if passes_through:
+            await self._deliver()
+            if not self.closed:
+                self.activities += len(activities)
+                self.delivered += len(activities)
+            await next_send()
+            return
+
+        self.activities += len(activities)
+        for activity in activities:
+            if self.merge_messages and self.pending and can_merge(self.pending[-1], activity):
+                self.pending[-1] = merge(self.pending[-1], activity)
+            else:
+                self.pending.append(activity)
+        # TurnContext sends whatever is left in the list once the handlers are done: nothing, it's all here.
+        activities.clear()
+
+    async def _deliver(self):
+        pending, self.pending = self.pending, []
+        if pending:
+            self.delivered += len(pending)
+            await self.turn_context.adapter.send_activities(self.turn_context, pending)
@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from helpers.metrics import hit_rate
+
+
+def plot_key(values: List[float], **params) -> str:
+    """ content address of a plot: a hash of what is plotted and of how it is rendered """
+    content = json.dumps({"values": values, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def render_line_plot(values: List[float], **params) -> str:
+    """ renders a line plot to PNG and returns it base64 encoded """
+    # matplotlib is slow to import, only pay for it when something has to be rendered.
+    from matplotlib.figure import Figure
+
+    # Generate the figure **without using pyplot**.
+    fig = Figure(figsize=params.get("figsize"), dpi=params.get("dpi"))
+    ax = fig.subplots()
+    ax.plot(values)
+    # Save it to a temporary buffer.
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return base64.b64encode(buf.getbuffer()).decode("ascii")
+
+
+class PlotCache:
+    """ Rendered plots, already base64 encoded, by content address. LRU evicted once they add up to max_bytes. """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: str):
+        if len(data) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= len(previous)
+        self._entries[key] = data
+        self.size_bytes += len(data)
+
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get_line_plot(self, values: List[float], **params) -> str:
+        """ base64 PNG of the plot, rendered only if it is not cached yet """
+        key = plot_key(values, **params)
+        data = self.get(key)
+        if data is None:
+            data = render_line_plot(values, **params)
+            self.put(key, data)
+        return data
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hit_rate(self.hits, self.misses),
+        }
+
+
+# ChartRenderService keeps what its workers render here.
+PLOT_CACHE = PlotCache()
@@ -0,0 +1,100 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import re
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+from helpers.metrics import ratio
+from helpers.recognizer_registry import DATETIME_MODEL, MODEL_FACTORIES, MODEL_REGISTRY, RecognizerModelRegistry
+
+if TYPE_CHECKING:
+    from recognizers_text import ModelResult
+
+# Cheap pre-check: if none of these tokens is present the datetime model can't find anything worth the cost.
+# Tokens that are just as likely not to be dates only count in a date context: a year ("buy 1000 MSFT") after
+# "in", "of", "since", "by" or "until", "may" next to a day of the month, "sat" and "sun" after "on" or "this".
+DATE_LIKE_TOKENS = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|morning|afternoon|evening|night|noon|midnight"
+    r"|day|days|week|weeks|weekend|month|months|year|years|hour|hours|minute|minutes|ago|next|last"
+    r"|mon(day)?|tue(s|sday)?|wed(nesday)?|thu(rs|rsday)?|fri(day)?|saturday|sunday|(on|this)\s+(sat|sun)"
+    r"|jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|june?|july?|aug(ust)?|sep(t|tember)?|oct(ober)?"
+    r"|nov(ember)?|dec(ember)?|may\s+\d{1,2}(st|nd|rd|th)?|\d{1,2}(st|nd|rd|th)?\s+(of\s+)?may"
+    r"|(in|of|since|by|until)\s+(19|20)\d{2}"
+    r"|\d{1,2}:\d{2}|\d{1,2}\s*(am|pm)|\d{1,4}[/.-]\d{1,2}([/.-]\d{1,4})?|\d{1,2}(st|nd|rd|th))\b",
+    re.IGNORECASE,
+)
+
+
+def has_date_like_tokens(user_input: str) -> bool:
+    """ True when the text contains something the datetime model could resolve. """
+    return DATE_LIKE_TOKENS.search(user_input) is not None
+
+
+class RecognizerPipeline:
+    """ Runs only the Recognizers-Text models a dialog step declares it needs, timing each one. """
+
+    def __init__(
+        self,
+        models: Iterable[str],
+        skip_datetime_without_date_tokens: bool = True,
+        registry: RecognizerModelRegistry = MODEL_REGISTRY,
+    ):
+        self.models = list(models)
+        unknown = [name for name in self.models if name not in MODEL_FACTORIES]
+        if unknown:
+            raise ValueError(f"[RecognizerPipeline]: Unknown recognizer models: {unknown}")
+
+        self.skip_datetime_without_date_tokens = skip_datetime_without_date_tokens
+        self.registry = registry
+
+        # seconds spent by each model in the last parse, and accumulated since start.
+        self.last_timings: Dict[str, float] = {}
+        self.total_timings: Dict[str, float] = {name: 0.0 for name in self.models}
+        self.runs: Dict[str, int] = {name: 0 for name in self.models}
+        self.skips: Dict[str, int] = {name: 0 for name in self.models}
+
+    def parse(self, user_input: str, culture: str, reference: datetime = None) -> List["ModelResult"]:
+        """ Runs the declared models in order and returns their results, already flattened. """
+        results: List["ModelResult"] = []
+        timings: Dict[str, float] = {}
+
+        for name in self.models:
+            if self._should_skip(name, user_input):
+                self.skips[name] += 1
+                continue
+
+            start = time.perf_counter()
+            results.extend(self.registry.parse(name, user_input, culture, reference))
+            elapsed = time.perf_counter() - start
+
+            timings[name] = elapsed
+            self.total_timings[name] += elapsed
+            self.runs[name] += 1
+
+        self.last_timings = timings
+        return results
+
+    def _should_skip(self, name: str, user_input: str) -> bool:
+        return (
+            name == DATETIME_MODEL
+            and self.skip_datetime_without_date_tokens
+            and not has_date_like_tokens(user_input)
+        )
+
+    def format_timings(self) -> str:
+        """ returns the timings of the last parse, slowest model first """
+        ordered = sorted(self.last_timings.items(), key=lambda item: item[1], reverse=True)
+        return ", ".join("{0}: {1:.2f} ms".format(name, seconds * 1000) for name, seconds in ordered)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """ per model counters: runs, skips and average time in ms """
+        return {
+            name: {
+                "runs": self.runs[name],
+                "skips": self.skips[name],
+                "avg_ms": ratio(self.total_timings[name], self.runs[name]) * 1000,
+            }
+            for name in self.models
+        }
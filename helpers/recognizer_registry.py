@@ -0,0 +1,141 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from recognizers_text import Model, ModelResult
+
+
+# The recognizer packages are imported by the first model built from them, not when the bot starts.
+def _number_recognizer(culture: str):
+    from recognizers_number import NumberRecognizer
+    return NumberRecognizer(culture)
+
+
+def _number_with_unit_recognizer(culture: str):
+    from recognizers_number_with_unit import NumberWithUnitRecognizer
+    return NumberWithUnitRecognizer(culture)
+
+
+def _date_time_recognizer(culture: str):
+    from recognizers_date_time import DateTimeRecognizer
+    return DateTimeRecognizer(culture)
+
+
+def _sequence_recognizer(culture: str):
+    from recognizers_sequence import SequenceRecognizer
+    return SequenceRecognizer(culture)
+
+
+# How to build every Recognizers-Text model the bot knows how to run, by name.
+MODEL_FACTORIES: Dict[str, Callable[[str], "Model"]] = {
+    "number": lambda culture: _number_recognizer(culture).get_number_model(culture),
+    "ordinal": lambda culture: _number_recognizer(culture).get_ordinal_model(culture),
+    "percentage": lambda culture: _number_recognizer(culture).get_percentage_model(culture),
+    "age": lambda culture: _number_with_unit_recognizer(culture).get_age_model(culture),
+    "currency": lambda culture: _number_with_unit_recognizer(culture).get_currency_model(culture),
+    "dimension": lambda culture: _number_with_unit_recognizer(culture).get_dimension_model(culture),
+    "temperature": lambda culture: _number_with_unit_recognizer(culture).get_temperature_model(culture),
+    "datetime": lambda culture: _date_time_recognizer(culture).get_datetime_model(culture),
+    "phone_number": lambda culture: _sequence_recognizer(culture).get_phone_number_model(culture),
+    "email": lambda culture: _sequence_recognizer(culture).get_email_model(culture),
+}
+
+DATETIME_MODEL = "datetime"
+
+# Parsed once per model while warming up, so the regexes get compiled before the first real turn.
+WARM_UP_SAMPLE = "Buy 10 MSFT for $ 150 tomorrow at 10am"
+
+
+class WarmUpReport:
+    """ How long it took, and how much memory it cost if it was traced, to get a culture ready. """
+    culture: str
+    seconds: float
+    memory_bytes: Optional[int]
+    model_seconds: Dict[str, float]
+
+    def __init__(self, culture: str):
+        self.culture = culture
+        self.seconds = 0.0
+        self.memory_bytes = None
+        self.model_seconds = {}
+
+    def to_string(self):
+        """ returns a nice and handy text representation of the object """
+        memory = "" if self.memory_bytes is None else ", {0:.1f} MiB".format(self.memory_bytes / (1024 * 1024))
+        return "Recognizers warm-up [{0}]: {1:.2f} s{2} ({3})".format(
+            self.culture,
+            self.seconds,
+            memory,
+            ", ".join("{0}: {1:.2f} s".format(name, seconds) for name, seconds in self.model_seconds.items()),
+        )
+
+
+class RecognizerModelRegistry:
+    """ Builds each Recognizers-Text model once per culture and reuses it for every turn. """
+
+    def __init__(self):
+        self._models: Dict[str, Dict[str, "Model"]] = {}
+        self._lock = threading.Lock()
+        self.warm_up_reports: Dict[str, WarmUpReport] = {}
+
+    def get_model(self, culture: str, name: str) -> "Model":
+        models = self._models.get(culture)
+        if models is not None and name in models:
+            return models[name]
+
+        if name not in MODEL_FACTORIES:
+            raise ValueError(f"[RecognizerModelRegistry]: Unknown recognizer model: {name}")
+
+        # Building a model is the expensive part, make sure it only happens once per culture.
+        with self._lock:
+            models = self._models.setdefault(culture, {})
+            if name not in models:
+                models[name] = MODEL_FACTORIES[name](culture)
+            return models[name]
+
+    def parse(self, name: str, user_input: str, culture: str, reference: datetime = None) -> List["ModelResult"]:
+        model = self.get_model(culture, name)
+        if name == DATETIME_MODEL:
+            return model.parse(user_input, reference or datetime.now())
+        return model.parse(user_input)
+
+    def is_warm(self, culture: str) -> bool:
+        return culture in self.warm_up_reports
+
+    def warm_up(self, culture: str, models: Iterable[str] = None, trace_memory: bool = False) -> WarmUpReport:
+        """
+        Builds the models of a culture ahead of time and reports how long it took. With trace_memory, the memory
+        they take is measured too, with tracemalloc: it traces the whole process and slows every thread down
+        while it runs, so only use it when nothing else is running, as benchmarks/recognizer_warm_up.py does.
+        """
+        report = WarmUpReport(culture)
+
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+        start = time.perf_counter()
+
+        for name in models or MODEL_FACTORIES.keys():
+            model_start = time.perf_counter()
+            self.parse(name, WARM_UP_SAMPLE, culture)
+            report.model_seconds[name] = time.perf_counter() - model_start
+
+        report.seconds = time.perf_counter() - start
+        if trace_memory:
+            report.memory_bytes = max(tracemalloc.get_traced_memory()[0] - memory_before, 0)
+        if started_tracing:
+            tracemalloc.stop()
+
+        self.warm_up_reports[culture] = report
+        return report
+
+
+# Warmed up by bot_runtime.warm_up; the RecognizerPipeline of every dialog parses with it.
+MODEL_REGISTRY = RecognizerModelRegistry()
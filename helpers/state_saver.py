@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List
+
+from botbuilder.core import BotState, TurnContext
+
+from helpers.metrics import ratio
+
+
+class StateSaveMetrics:
+    """ How long saving state took in the last turns, and how many saves were skipped because nothing changed. """
+
+    def __init__(self, history: int = 1000):
+        # seconds per turn, and per state object in the last turn.
+        self.turn_seconds: Deque[float] = deque(maxlen=history)
+        self.last_turn: Dict[str, float] = {}
+        self.saved: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, saved: bool):
+        self.last_turn[name] = seconds
+        counter = self.saved if saved else self.skipped
+        counter[name] = counter.get(name, 0) + 1
+
+    def to_string(self):
+        """ returns a nice and handy text representation of the object """
+        average = ratio(sum(self.turn_seconds), len(self.turn_seconds))
+        return "State save: {0:.2f} ms per turn ({1})".format(
+            average * 1000,
+            ", ".join(
+                "{0}: {1} saved, {2} skipped".format(name, self.saved.get(name, 0), self.skipped.get(name, 0))
+                for name in sorted(set(self.saved) | set(self.skipped))
+            ),
+        )
+
+
+class TurnStateSaver:
+    """
+    Saves the BotState objects of a turn at the end of it, all at the same time.
+
+    A state object that wasn't loaded during the turn, or whose content hash is the one it was loaded with,
+    isn't written. The hash is checked once here; the save is then forced so BotState doesn't hash it again.
+    """
+
+    def __init__(self, *states: BotState):
+        self.states: List[BotState] = list(states)
+        self.metrics = StateSaveMetrics()
+
+    async def save_changes(self, turn_context: TurnContext):
+        start = time.perf_counter()
+        await asyncio.gather(*[self._save(state, turn_context) for state in self.states])
+        self.metrics.turn_seconds.append(time.perf_counter() - start)
+
+    async def _save(self, state: BotState, turn_context: TurnContext):
+        start = time.perf_counter()
+        cached_state = state.get_cached_state(turn_context)
+        changed = cached_state is not None and cached_state.is_changed
+        if changed:
+            await state.save_changes(turn_context, force=True)
+        self.metrics.record(type(state).__name__, time.perf_counter() - start, changed)
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from helpers.metrics import hit_rate
+from helpers.recognizer_pipeline import has_date_like_tokens
+
+
+def normalize_utterance(user_input: str) -> str:
+    """ "Buy  10 MSFT for $150 " and "buy 10 msft for $150" recognize the same values. """
+    return " ".join(user_input.lower().split())
+
+
+class UtteranceCache:
+    """
+    Bounded LRU cache of the values recognized in an utterance, keyed by the normalized text.
+    Entries expire after ttl_seconds. Utterances with date-like tokens ("tomorrow", "next friday") are never
+    cached, because what they resolve to depends on when they are said.
+    Values are copied in and out, so a caller changing what it got back doesn't change the cached value.
+    """
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def is_cacheable(user_input: str) -> bool:
+        return not has_date_like_tokens(user_input)
+
+    def get(self, user_input: str):
+        """ Returns the cached value, or None on a miss (or when the utterance is not cacheable). """
+        if not self.is_cacheable(user_input):
+            self.bypasses += 1
+            return None
+
+        key = normalize_utterance(user_input)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, user_input: str, value):
+        if not self.is_cacheable(user_input):
+            return
+
+        key = normalize_utterance(user_input)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "hit_rate": hit_rate(self.hits, self.misses),
+        }
@@ -0,0 +1,60 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""
+Local stand-in for the broker HTTP API that data_models/broker_client.py talks to, with injected latency.
+Every order is filled at its own price, unless failure_rate says otherwise. Run it with
+`python mock_broker.py --latency 0.05 --jitter 0.02` and set BrokerUrl=http://localhost:3979 for the bot.
+
+    POST /orders  {"orders": [{"client_order_id", "type", "ticker", "market", "quantity", "price"}]}
+              ->  {"results": [{"client_order_id", "status": "filled" | "rejected", "transaction_id",
+                                "price", "errors"}]}
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+
+from aiohttp import web
+
+
+def create_app(latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0) -> web.Application:
+    """ latency (plus up to jitter) is paid once per request, like the round trip to a real broker """
+    rng = random.Random(seed)
+    transaction_ids = itertools.count(1)
+
+    def execute(order: dict) -> dict:
+        errors = []
+        if order["type"] not in ("buy", "sell"):
+            errors.append(f"unknown operation type: {order['type']}")
+        if order["quantity"] <= 0:
+            errors.append("quantity must be positive")
+        if not errors and rng.random() < failure_rate:
+            errors.append("rejected by the market")
+        return {
+            "client_order_id": order["client_order_id"],
+            "status": "rejected" if errors else "filled",
+            "transaction_id": next(transaction_ids),
+            "price": order["price"],
+            "errors": errors,
+        }
+
+    async def orders(req: web.Request) -> web.Response:
+        body = await req.json()
+        await asyncio.sleep(latency + rng.uniform(0, jitter))
+        return web.json_response({"results": [execute(order) for order in body["orders"]]})
+
+    app = web.Application()
+    app.router.add_post("/orders", orders)
+    return app
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    PARSER.add_argument("--port", type=int, default=3979)
+    PARSER.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    PARSER.add_argument("--jitter", type=float, default=0.0, help="up to this many seconds more, at random")
+    PARSER.add_argument("--failure-rate", type=float, default=0.0, help="share of orders rejected")
+    ARGS = PARSER.parse_args()
+    web.run_app(create_app(ARGS.latency, ARGS.jitter, ARGS.failure_rate), host="localhost", port=ARGS.port)
@@ -0,0 +1,52 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import time
+
+from botbuilder.schema import Activity, ActivityTypes, ConversationAccount
+
+from helpers.activity_dedup import ActivityDedup
+
+
+def new_activity(activity_id: str, conversation_id: str = "conversation") -> Activity:
+    return Activity(
+        type=ActivityTypes.message, id=activity_id, conversation=ConversationAccount(id=conversation_id)
+    )
+
+
+def test_drops_a_retry():
+    dedup = ActivityDedup()
+    assert not dedup.is_duplicate(new_activity("1"))
+    assert dedup.is_duplicate(new_activity("1"))
+    # the same activity id in another conversation is another activity.
+    assert not dedup.is_duplicate(new_activity("1", "other"))
+    assert dedup.stats()["duplicates"] == 1
+
+
+def test_activities_without_ids_are_never_duplicates():
+    dedup = ActivityDedup()
+    assert not dedup.is_duplicate(new_activity(None))
+    assert not dedup.is_duplicate(new_activity(None))
+
+
+def test_a_forgotten_activity_is_processed_again():
+    dedup = ActivityDedup()
+    dedup.is_duplicate(new_activity("1"))
+    dedup.forget(new_activity("1"))
+    assert not dedup.is_duplicate(new_activity("1"))
+
+
+def test_remembers_for_the_window_only():
+    dedup = ActivityDedup(window_seconds=0.01)
+    dedup.is_duplicate(new_activity("1"))
+    time.sleep(0.02)
+    assert not dedup.is_duplicate(new_activity("1"))
+
+
+def test_remembers_up_to_max_size():
+    dedup = ActivityDedup(max_size=2)
+    for activity_id in ("1", "2", "3"):
+        dedup.is_duplicate(new_activity(activity_id))
+    assert dedup.stats()["evictions"] == 1
+    assert not dedup.is_duplicate(new_activity("1"))
+    assert dedup.is_duplicate(new_activity("3"))
@@ -0,0 +1,110 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+import threading
+
+from helpers.asset_store import ASSETS_DIR, AssetStore
+
+
+def test_evicts_least_recently_used_past_max_bytes():
+    store = AssetStore("http://localhost", max_bytes=30)
+    store.put("a", b"a" * 10, "image/png")
+    store.put("b", b"b" * 10, "image/png")
+    store.put("c", b"c" * 10, "image/png")
+    # a is now the most recently used one.
+    assert store.get("a") is not None
+    store.put("d", b"d" * 10, "image/png")
+
+    assert store.get("b") is None
+    assert [name for name in "acd" if store.get(name) is not None] == ["a", "c", "d"]
+    assert store.size_bytes == 30
+
+
+def test_files_are_read_on_first_use_and_after_eviction(tmp_path):
+    path = os.path.join(str(tmp_path), "image.png")
+    with open(path, "wb") as out_file:
+        out_file.write(b"x" * 20)
+    store = AssetStore("http://localhost", max_bytes=25)
+    store.put_file("image.png", path, "image/png")
+    assert store.size_bytes == 0
+
+    assert store.get("image.png").data == b"x" * 20
+    store.put("other", b"y" * 20, "image/png")
+    assert store.size_bytes == 20
+    assert store.get("image.png").data == b"x" * 20
+
+
+def test_default_assets_do_not_depend_on_the_working_directory():
+    assert os.path.isfile(os.path.join(ASSETS_DIR, "architecture-resize.png"))
+
+
+def test_not_modified():
+    store = AssetStore("http://localhost")
+    asset = store.put("a", b"data", "image/png")
+    assert asset.is_not_modified(if_none_match=asset.etag)
+    assert not asset.is_not_modified(if_none_match='"other"')
+    assert asset.is_not_modified(if_modified_since=asset.last_modified_header)
+    assert not asset.is_not_modified()
+
+
+def test_concurrent_gets_and_puts():
+    store = AssetStore("http://localhost", max_bytes=100)
+    errors = []
+
+    def work(index: int):
+        try:
+            for turn in range(2000):
+                name = f"asset-{(index + turn) % 20}"
+                if store.get(name) is None:
+                    store.put(name, b"z" * 10, "image/png")
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert store.size_bytes == sum(len(asset.data) for asset in store._assets.values()) <= 100
+
+
+def test_generated_assets_are_generated_again_after_eviction():
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return b"p" * 20
+
+    store = AssetStore("http://localhost", max_bytes=25)
+    store.put_generated("plot.png", generate, "image/png", b"p" * 20)
+    store.put("other", b"y" * 20, "image/png")
+    assert store.cached("plot.png") is None
+
+    assert store.get("plot.png").data == b"p" * 20
+    assert len(calls) == 1
+    assert store.regenerated == 1
+
+
+def test_only_the_most_recent_generators_are_remembered():
+    store = AssetStore("http://localhost", max_bytes=0, max_generated=1)
+    store.put_generated("old.png", lambda: b"old", "image/png")
+    store.put_generated("new.png", lambda: b"new", "image/png")
+    assert store.get("old.png") is None
+    assert store.get("new.png").data == b"new"
+
+
+def test_attachments():
+    store = AssetStore("http://localhost", inline_channels=["inline"])
+    store.put_generated("plot.png", lambda: b"png", "image/png")
+
+    linked = store.attachment("plot.png", "webchat")
+    assert linked.content_url == "http://localhost/api/assets/plot.png"
+    # a link doesn't need the asset itself.
+    assert store.cached("plot.png") is None
+    assert store.attachment("plot.png", "inline").content_url == "data:image/png;base64,cG5n"
+
+    assert store.attachment("missing.png", "webchat") is None
+    assert store.attachment("missing.png", "inline") is None
@@ -0,0 +1,68 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import socket
+
+from aiohttp import web
+
+import mock_broker
+from data_models.broker_client import BrokerClient
+from data_models.trade_assistant import BuyOperation, OperationStatus
+
+
+def new_operation(quantity: int) -> BuyOperation:
+    operation = BuyOperation()
+    operation.type = "buy"
+    operation.stock.ticker = "MSFT"
+    operation.quantity = quantity
+    operation.price = 150
+    return operation
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def test_batches_orders_and_tracks_their_status():
+    async def run():
+        port = free_port()
+        runner = web.AppRunner(mock_broker.create_app(latency=0.01))
+        await runner.setup()
+        await web.TCPSite(runner, "localhost", port).start()
+        client = BrokerClient(f"http://localhost:{port}", batch_size=10, batch_delay=0.01)
+        try:
+            operations = [new_operation(quantity) for quantity in range(0, 10)]
+            submits = [asyncio.ensure_future(client.submit(operation)) for operation in operations]
+            await asyncio.sleep(0)
+            in_flight = [client.status(operation.order_id) for operation in operations]
+            results = await asyncio.gather(*submits)
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return client, operations, in_flight, results
+
+    client, operations, in_flight, results = asyncio.run(run())
+    assert client.batches == 1
+    assert all(status in (OperationStatus.Pending, OperationStatus.InProgress) for status in in_flight)
+    # quantity 0 is rejected by the broker.
+    assert results[0].status == OperationStatus.Failure
+    assert client.status(operations[0].order_id) == OperationStatus.Failure
+    assert all(client.status(operation.order_id) == OperationStatus.Success for operation in operations[1:])
+    assert client.status(-1) is None
+
+
+def test_failed_request_fails_every_order_of_the_batch():
+    async def run():
+        # nothing listens on this port.
+        client = BrokerClient(f"http://localhost:{free_port()}", batch_size=2, timeout=2)
+        try:
+            return await asyncio.gather(client.submit(new_operation(1)), client.submit(new_operation(2)))
+        finally:
+            await client.close()
+
+    results = asyncio.run(run())
+    assert [result.status for result in results] == [OperationStatus.Failure, OperationStatus.Failure]
+    assert all(result.errors for result in results)
@@ -0,0 +1,65 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import json
+
+from helpers.card_templates import CardTemplate
+
+TEMPLATE = {
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "title": "${title}",
+    "count": "${count}",
+    "body": [
+        {"type": "TextBlock", "text": "Total: $ ${total}"},
+        {"$data": "${rows}", "type": "TextBlock", "text": "${ticker} x ${quantity}"},
+    ],
+    "actions": [{"type": "Action.Submit", "title": "OK"}],
+}
+
+DATA = {"title": "Portfolio \"mine\"", "count": 2, "total": 12.5,
+        "rows": [{"ticker": "MSFT", "quantity": 10}, {"ticker": "AAPL", "quantity": 5}]}
+
+
+def test_renders_the_bound_values():
+    card = CardTemplate(TEMPLATE).render(DATA)
+    assert card == {
+        "type": "AdaptiveCard",
+        "version": "1.0",
+        "title": "Portfolio \"mine\"",
+        # a whole string bound to a value keeps the type of the value.
+        "count": 2,
+        "body": [
+            {"type": "TextBlock", "text": "Total: $ 12.5"},
+            {"type": "TextBlock", "text": "MSFT x 10"},
+            {"type": "TextBlock", "text": "AAPL x 5"},
+        ],
+        "actions": [{"type": "Action.Submit", "title": "OK"}],
+    }
+
+
+def test_renders_json_that_parses_to_the_card():
+    template = CardTemplate(TEMPLATE)
+    assert json.loads(template.render_json(DATA)) == template.render(DATA)
+
+
+def test_an_empty_repeated_list_renders_no_items():
+    card = CardTemplate(TEMPLATE).render(dict(DATA, rows=[]))
+    assert card["body"] == [{"type": "TextBlock", "text": "Total: $ 12.5"}]
+
+
+def test_the_same_data_is_rendered_once():
+    template = CardTemplate(TEMPLATE)
+    first = template.render(DATA)
+    assert template.render(json.loads(json.dumps(DATA))) is first
+    assert template.render(dict(DATA, total=13)) is not first
+    assert template.stats() == {"cached": 2, "renders": 2, "hits": 1}
+
+
+def test_keeps_the_cards_of_the_last_max_cached_inputs():
+    template = CardTemplate(TEMPLATE, max_cached=2)
+    for total in (1, 2, 1, 3):
+        template.render(dict(DATA, total=total))
+    # 2 was the least recently used one.
+    template.render(dict(DATA, total=2))
+    assert template.stats() == {"cached": 2, "renders": 4, "hits": 1}
@@ -0,0 +1,99 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from helpers import chart_renderer
+from helpers.chart_renderer import ChartRenderService
+from helpers.plot_cache import PlotCache
+
+
+class SlowRender:
+    """ stands in for plot_cache.render_line_plot: returns once released, counting its calls """
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, values, **params):
+        self.calls += 1
+        assert self.release.wait(5)
+        return "png-of-" + ",".join(str(value) for value in values)
+
+
+@pytest.fixture
+def renderer():
+    renderer = ChartRenderService(PlotCache())
+    # threads instead of processes, so the render function can be replaced.
+    renderer._executor = ThreadPoolExecutor(max_workers=2)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_identical_renders_share_one_job(renderer, monkeypatch):
+    render = SlowRender()
+    monkeypatch.setattr(chart_renderer, "render_line_plot", render)
+
+    async def run():
+        waiting = [asyncio.ensure_future(renderer.render_line_plot([1, 2, 3])) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        render.release.set()
+        return await asyncio.gather(*waiting)
+
+    assert asyncio.run(run()) == ["png-of-1,2,3"] * 5
+    assert render.calls == 1
+    assert renderer.stats()["coalesced"] == 4
+    assert renderer.cache.get(chart_renderer.plot_key([1, 2, 3])) == "png-of-1,2,3"
+
+
+def test_a_timed_out_render_stays_in_the_queue_until_it_finishes(renderer, monkeypatch):
+    render = SlowRender()
+    monkeypatch.setattr(chart_renderer, "render_line_plot", render)
+
+    async def run():
+        assert await renderer.render_line_plot([1], timeout=0.01) is None
+        # the worker is still busy with it.
+        assert renderer.queue_depth == 1
+        render.release.set()
+        # the next turn waits for the same job.
+        return await renderer.render_line_plot([1])
+
+    assert asyncio.run(run()) == "png-of-1"
+    assert renderer.queue_depth == 0
+    assert render.calls == 1
+    assert renderer.stats()["timeouts"] == 1
+
+
+def test_failures_are_logged(renderer, monkeypatch, caplog):
+    def broken(values, **params):
+        raise ValueError("no figure")
+
+    monkeypatch.setattr(chart_renderer, "render_line_plot", broken)
+    with caplog.at_level(logging.ERROR, logger=chart_renderer.__name__):
+        assert asyncio.run(renderer.render_line_plot([1])) is None
+
+    assert renderer.stats()["failures"] == 1
+    assert "no figure" in caplog.text
+
+
+def test_without_a_cache_nothing_is_kept(monkeypatch):
+    renderer = ChartRenderService(cache=None)
+    renderer._executor = ThreadPoolExecutor(max_workers=1)
+    render = SlowRender()
+    render.release.set()
+    monkeypatch.setattr(chart_renderer, "render_line_plot", render)
+
+    async def run():
+        return [await renderer.render_line_plot([1, 2]) for _ in range(2)]
+
+    try:
+        assert asyncio.run(run()) == ["png-of-1,2"] * 2
+    finally:
+        renderer.shutdown()
+    # the caller keeps it: the second one was rendered again.
+    assert render.calls == 2
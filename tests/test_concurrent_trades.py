@@ -0,0 +1,30 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+
+from botbuilder.core import ConversationState, MemoryStorage, UserState
+
+from benchmarks.concurrent_trades import trade
+from bots import TradeBot
+from data_models.portfolio_cache import PORTFOLIO_CACHE
+from dialogs import TradeDialog
+from tests.test_portfolio import MemoryStore
+
+
+def test_every_conversation_gets_its_own_receipt(monkeypatch):
+    # the portfolio of data/data.txt is left alone.
+    store = MemoryStore()
+    monkeypatch.setattr(PORTFOLIO_CACHE, "_store", store)
+    monkeypatch.setattr(PORTFOLIO_CACHE, "_portfolio", None)
+
+    storage = MemoryStorage()
+    user_state = UserState(storage)
+    bot = TradeBot(ConversationState(storage), user_state, TradeDialog(user_state))
+
+    async def run():
+        return await asyncio.gather(*[trade(bot, index) for index in range(20)])
+
+    assert asyncio.run(run()) == [True] * 20
+    # every order was filled, and only then added to the portfolio.
+    assert store.holdings["MSFT"]["quantity"] == sum(range(1, 21))
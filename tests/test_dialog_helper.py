@@ -0,0 +1,84 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from botbuilder.core import ConversationState, MemoryStorage, MessageFactory
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.dialogs import Dialog, WaterfallDialog, WaterfallStepContext
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+
+from helpers.dialog_helper import DialogHelper
+
+
+@pytest.fixture(autouse=True)
+def dialog_sets(monkeypatch):
+    """ every test starts without cached sets, and leaves the ones of the bot alone """
+    monkeypatch.setattr(DialogHelper, "_dialog_sets", OrderedDict())
+
+
+def new_dialog(dialog_id: str = "echo") -> WaterfallDialog:
+    async def ask(step: WaterfallStepContext):
+        await step.context.send_activity(MessageFactory.text("first"))
+        return Dialog.end_of_turn
+
+    async def answer(step: WaterfallStepContext):
+        await step.context.send_activity(MessageFactory.text("second: " + step.context.activity.text))
+        return await step.end_dialog()
+
+    return WaterfallDialog(dialog_id, [ask, answer])
+
+
+def test_a_set_is_built_once_per_dialog_and_accessor():
+    state = ConversationState(MemoryStorage())
+    dialog, accessor = new_dialog(), state.create_property("DialogState")
+
+    dialog_set = DialogHelper.get_dialog_set(dialog, accessor)
+    assert DialogHelper.get_dialog_set(dialog, accessor) is dialog_set
+    assert dialog_set.find_dialog("echo") is dialog
+
+    assert DialogHelper.get_dialog_set(dialog, state.create_property("DialogState")) is not dialog_set
+    assert DialogHelper.get_dialog_set(new_dialog(), accessor) is not dialog_set
+
+
+def test_at_most_max_dialog_sets_are_kept(monkeypatch):
+    monkeypatch.setattr(DialogHelper, "max_dialog_sets", 2)
+    accessor = ConversationState(MemoryStorage()).create_property("DialogState")
+    dialogs = [new_dialog() for _ in range(3)]
+    first = DialogHelper.get_dialog_set(dialogs[0], accessor)
+    for dialog in dialogs[1:]:
+        DialogHelper.get_dialog_set(dialog, accessor)
+
+    assert len(DialogHelper._dialog_sets) == 2
+    assert DialogHelper.get_dialog_set(dialogs[0], accessor) is not first
+
+
+def test_conversations_sharing_a_set_keep_their_own_dialog_stack():
+    state = ConversationState(MemoryStorage())
+    dialog, accessor = new_dialog(), state.create_property("DialogState")
+
+    async def logic(turn_context):
+        await DialogHelper.run_dialog(dialog, turn_context, accessor)
+        await state.save_changes(turn_context)
+
+    def new_adapter(index: int) -> TestAdapter:
+        return TestAdapter(logic, Activity(
+            channel_id="test",
+            from_property=ChannelAccount(id=f"user-{index}"),
+            recipient=ChannelAccount(id="bot"),
+            conversation=ConversationAccount(id=f"conversation-{index}"),
+        ))
+
+    async def run():
+        one, other = new_adapter(1), new_adapter(2)
+        await one.receive_activity("hi")
+        await other.receive_activity("hi")
+        await one.receive_activity("one")
+        await other.receive_activity("other")
+        return [activity.text for activity in one.activity_buffer], \
+               [activity.text for activity in other.activity_buffer]
+
+    assert asyncio.run(run()) == (["first", "second: one"], ["first", "second: other"])
+    assert len(DialogHelper._dialog_sets) == 1
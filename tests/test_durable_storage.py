@@ -0,0 +1,123 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from helpers.durable_storage import DurableStorage
+
+
+class SlowCommitConnection:
+    """ wraps the sqlite connection of a DurableStorage so its commits take `delay` seconds """
+
+    def __init__(self, connection, delay: float):
+        self.connection = connection
+        self.delay = delay
+        self.committing = threading.Event()
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT":
+            self.committing.set()
+            time.sleep(self.delay)
+        return self.connection.execute(sql, *args)
+
+    def executemany(self, sql, rows):
+        return self.connection.executemany(sql, rows)
+
+    def close(self):
+        self.connection.close()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = DurableStorage(os.path.join(str(tmp_path), "state.db"), cache_size=2, flush_interval=60)
+    yield storage
+    storage.close()
+
+
+def test_creating_it_does_not_touch_the_disk(tmp_path):
+    path = os.path.join(str(tmp_path), "state.db")
+    DurableStorage(path).close()
+    assert not os.path.exists(path)
+
+
+def test_write_then_read(storage):
+    async def run():
+        await storage.write({"a": {"value": 1}})
+        return await storage.read(["a", "missing"])
+
+    items = asyncio.run(run())
+    assert list(items) == ["a"]
+    assert items["a"]["value"] == 1
+    assert items["a"]["e_tag"]
+
+
+def test_reading_no_keys_reads_nothing(storage):
+    assert asyncio.run(storage.read([])) == {}
+    assert storage.reads == 0
+
+
+def test_stale_e_tag_conflicts(storage):
+    async def run():
+        await storage.write({"a": {"value": 1}})
+        first = (await storage.read(["a"]))["a"]
+        await storage.write({"a": dict(first, value=2)})
+        # first still carries the e_tag the second write replaced.
+        with pytest.raises(KeyError):
+            await storage.write({"a": dict(first, value=3)})
+        # "*" always wins.
+        await storage.write({"a": {"value": 4, "e_tag": "*"}})
+        return (await storage.read(["a"]))["a"]
+
+    assert asyncio.run(run())["value"] == 4
+
+
+def test_survives_a_restart(tmp_path):
+    path = os.path.join(str(tmp_path), "state.db")
+    storage = DurableStorage(path, flush_interval=60)
+    asyncio.run(storage.write({"a": {"value": 1}, "b": {"value": 2}}))
+    asyncio.run(storage.delete(["b"]))
+    storage.close()
+
+    reopened = DurableStorage(path)
+    try:
+        items = asyncio.run(reopened.read(["a", "b"]))
+    finally:
+        reopened.close()
+    assert items["a"]["value"] == 1
+    assert "b" not in items
+
+
+def test_reads_evicted_keys_from_the_file(storage):
+    async def run():
+        await storage.write({key: {"value": key} for key in "abcd"})
+        await storage.flush()
+        return await storage.read(list("abcd"))
+
+    items = asyncio.run(run())
+    assert [items[key]["value"] for key in "abcd"] == list("abcd")
+    assert storage.stats()["cached"] <= 2
+
+
+def test_reads_do_not_wait_for_a_slow_flush(storage):
+    asyncio.run(storage.write({"a": {"value": 1}}))
+    slow = SlowCommitConnection(storage._connection, delay=1.0)
+    storage._connection = slow
+
+    flusher = threading.Thread(target=storage.flush_sync)
+    flusher.start()
+    assert slow.committing.wait(5)
+    try:
+        start = time.perf_counter()
+        items = asyncio.run(storage.read(["a"]))
+        elapsed = time.perf_counter() - start
+    finally:
+        flusher.join()
+
+    assert items["a"]["value"] == 1
+    assert elapsed < 0.5
+    assert storage.stats()["pending"] == 0
@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+import time
+
+import pytest
+
+from data_models.market_data import CachingQuoteProvider, Quote, QuoteProvider, SimulatedQuoteProvider
+
+
+class CountingProvider(QuoteProvider):
+    """ quotes every ticker at 100, remembering the batches it was asked for """
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.requests = []
+        self.delay = delay
+        self.error = error
+
+    async def get_quotes(self, tickers):
+        tickers = list(tickers)
+        self.requests.append(tickers)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {ticker: Quote(ticker, 100.0, 0.0) for ticker in tickers}
+
+
+def test_fetches_missing_tickers_in_one_request_and_keeps_them():
+    provider = CountingProvider()
+    quotes = CachingQuoteProvider(provider, ttl_seconds=60)
+
+    async def run():
+        await quotes.get_quotes(["MSFT", "AAPL"])
+        return await quotes.get_quotes(["MSFT", "AAPL", "GOOG"])
+
+    assert sorted(asyncio.run(run())) == ["AAPL", "GOOG", "MSFT"]
+    assert provider.requests == [["MSFT", "AAPL"], ["GOOG"]]
+    assert quotes.stats()["hits"] == 2
+
+
+def test_quotes_expire_after_the_ttl():
+    provider = CountingProvider()
+    quotes = CachingQuoteProvider(provider, ttl_seconds=0.01)
+
+    async def run():
+        await quotes.get_quotes(["MSFT"])
+        time.sleep(0.02)
+        await quotes.get_quotes(["MSFT"])
+
+    asyncio.run(run())
+    assert provider.requests == [["MSFT"], ["MSFT"]]
+
+
+def test_concurrent_turns_share_a_fetch():
+    provider = CountingProvider(delay=0.01)
+    quotes = CachingQuoteProvider(provider, ttl_seconds=60)
+
+    async def run():
+        return await asyncio.gather(*[quotes.get_quotes(["MSFT"]) for _ in range(5)])
+
+    assert all(result["MSFT"].price == 100.0 for result in asyncio.run(run()))
+    assert provider.requests == [["MSFT"]]
+    assert quotes.stats()["coalesced"] == 4
+
+
+def test_a_failed_fetch_is_not_cached():
+    provider = CountingProvider(error=ConnectionError("feed down"))
+    quotes = CachingQuoteProvider(provider, ttl_seconds=60)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(quotes.get_quotes(["MSFT"]))
+    provider.error = None
+    assert asyncio.run(quotes.get_quotes(["MSFT"]))["MSFT"].price == 100.0
+
+
+def test_simulated_quotes_are_deterministic():
+    now = time.time()
+    assert SimulatedQuoteProvider(1).quote("MSFT", now).price == SimulatedQuoteProvider(1).quote("MSFT", now).price
+
+
+def test_simulated_quotes_move_around_the_last_known_price():
+    quotes = SimulatedQuoteProvider(1)
+    assert quotes.remember_prices({"MSFT": 150.0}) == {"MSFT"}
+    assert quotes.remember_prices({"MSFT": 150.0}) == set()
+    quote = quotes.quote("MSFT")
+    assert 135.0 <= quote.price <= 165.0
+
+
+def test_a_new_last_known_price_replaces_the_cached_quote():
+    simulated = SimulatedQuoteProvider(1)
+    quotes = CachingQuoteProvider(simulated, ttl_seconds=60)
+    asyncio.run(quotes.get_quotes(["MSFT"]))
+    quotes.remember_prices({"MSFT": 1000.0})
+    assert asyncio.run(quotes.get_quotes(["MSFT"]))["MSFT"].price >= 900.0
+
+
+def test_the_least_recently_used_quotes_are_evicted():
+    quotes = CachingQuoteProvider(CountingProvider(), ttl_seconds=60, max_size=2)
+
+    async def lookups():
+        await quotes.get_quotes(["MSFT", "AAPL"])
+        await quotes.get_quotes(["MSFT"])
+        await quotes.get_quotes(["GOOG"])
+
+    asyncio.run(lookups())
+    assert list(quotes._quotes) == ["MSFT", "GOOG"]
+    assert quotes.stats()["evictions"] == 1
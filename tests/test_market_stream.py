@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+
+from data_models.market_stream import BarAggregator, TickSimulator
+
+TICKERS = ["MSFT", "AAPL", "GOOG"]
+
+
+def assert_same_bars(one: BarAggregator, other: BarAggregator):
+    for ticker in TICKERS:
+        for timeframe in one.timeframes:
+            bars, other_bars = one.bars(ticker, timeframe), other.bars(ticker, timeframe)
+            for field in bars:
+                np.testing.assert_array_equal(bars[field], other_bars[field], err_msg=f"{ticker} {timeframe} {field}")
+
+
+def test_batches_and_single_ticks_build_the_same_bars():
+    simulator = TickSimulator(TICKERS, seed=1, ticks_per_second=5)
+    batched, single = BarAggregator(capacity=16), BarAggregator(capacity=16)
+    for ticker in TICKERS:
+        batched.ticker_id(ticker)
+        single.ticker_id(ticker)
+
+    for _ in range(5):
+        ticker_ids, prices, volumes, timestamps = simulator.next_batch(2000)
+        batched.on_ticks(ticker_ids, prices, volumes, timestamps)
+        for ticker_id, price, volume, timestamp in zip(ticker_ids, prices, volumes, timestamps):
+            single.on_tick(TICKERS[ticker_id], float(price), int(volume), float(timestamp))
+
+    assert batched.ticks == single.ticks == 10000
+    # 2000 s of ticks: 34 1m bars, more than fit, so the ring buffers wrapped around too.
+    assert len(batched.bars("MSFT", "1m")["start"]) == 16
+    assert_same_bars(batched, single)
+
+
+def test_one_bar_per_bucket():
+    aggregator = BarAggregator(timeframes={"1m": 60})
+    for price, volume, timestamp in ((10.0, 1, 0), (12.0, 2, 30), (9.0, 3, 59), (11.0, 4, 60)):
+        aggregator.on_tick("MSFT", price, volume, timestamp)
+
+    bars = aggregator.bars("MSFT")
+    assert bars["start"].tolist() == [0, 60]
+    assert bars["open"].tolist() == [10.0, 11.0]
+    assert bars["high"].tolist() == [12.0, 11.0]
+    assert bars["low"].tolist() == [9.0, 11.0]
+    assert bars["close"].tolist() == [9.0, 11.0]
+    assert bars["volume"].tolist() == [6, 4]
+
+
+def test_a_tick_for_a_closed_bar_is_dropped():
+    aggregator = BarAggregator(timeframes={"1m": 60})
+    aggregator.on_tick("MSFT", 10.0, 1, 0)
+    aggregator.on_tick("MSFT", 11.0, 1, 60)
+    aggregator.on_tick("MSFT", 99.0, 1, 30)
+    ticker_id = aggregator.ticker_id("MSFT")
+    aggregator.on_ticks(np.array([ticker_id]), np.array([99.0]), np.array([1]), np.array([45.0]))
+
+    assert aggregator.series["1m"].late_ticks == 2
+    assert aggregator.bars("MSFT")["high"].tolist() == [10.0, 11.0]
+
+
+def test_a_batch_is_put_in_time_order_first():
+    in_order, shuffled = BarAggregator(timeframes={"1m": 60}), BarAggregator(timeframes={"1m": 60})
+    ticker_ids, prices = np.zeros(4, dtype=np.int64), np.array([10.0, 12.0, 9.0, 11.0])
+    volumes, timestamps = np.array([1, 2, 3, 4]), np.array([0.0, 30.0, 59.0, 60.0])
+    for aggregator in (in_order, shuffled):
+        aggregator.ticker_id("MSFT")
+    in_order.on_ticks(ticker_ids, prices, volumes, timestamps)
+    reverse = slice(None, None, -1)
+    shuffled.on_ticks(ticker_ids[reverse], prices[reverse], volumes[reverse], timestamps[reverse])
+
+    assert shuffled.series["1m"].late_ticks == 0
+    assert shuffled.bars("MSFT")["close"].tolist() == in_order.bars("MSFT")["close"].tolist() == [9.0, 11.0]
+
+
+def test_no_room_for_more_tickers():
+    aggregator = BarAggregator(max_tickers=1)
+    aggregator.on_tick("MSFT", 10.0, 1, 0)
+    with pytest.raises(ValueError):
+        aggregator.on_tick("AAPL", 10.0, 1, 0)
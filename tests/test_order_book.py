@@ -0,0 +1,139 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import random
+
+from data_models.order_book import BUY, SELL, SIMULATED_MARKET, MarketMaker, MatchingEngine, OrderBook, to_ticks
+from data_models.trade_assistant import Broker, Operation, OperationStatus, Stock
+
+
+def new_book():
+    engine = MatchingEngine()
+    return engine, engine.book("TEST")
+
+
+def test_matches_best_price_first_then_arrival_order():
+    engine, book = new_book()
+    first = engine.new_order(SELL, 10, 101)
+    second = engine.new_order(SELL, 10, 101)
+    cheaper = engine.new_order(SELL, 10, 100)
+    for order in (first, second, cheaper):
+        book.add(order)
+
+    fills = book.add(engine.new_order(BUY, 25, 101))
+    assert [(fill.maker_id, fill.price, fill.quantity) for fill in fills] == [
+        (cheaper.order_id, to_ticks(100), 10),
+        (first.order_id, to_ticks(101), 10),
+        (second.order_id, to_ticks(101), 5),
+    ]
+    assert second.remaining == 5
+    assert book.depth() == {"bids": [], "asks": [(101.0, 5)]}
+
+
+def test_the_rest_of_a_limit_order_rests_and_of_a_market_order_is_dropped():
+    engine, book = new_book()
+    book.add(engine.new_order(SELL, 10, 100))
+
+    limit = engine.new_order(BUY, 15, 100)
+    book.add(limit)
+    assert limit.remaining == 5
+    assert book.best_bid() == 100.0
+
+    market = engine.new_order(SELL, 20)
+    fills = book.add(market)
+    assert sum(fill.quantity for fill in fills) == 5
+    assert market.remaining == 15
+    assert len(book) == 0
+    assert book.best_bid() is None and book.best_ask() is None
+
+
+def test_cancelled_orders_are_skipped():
+    engine, book = new_book()
+    cancelled = engine.new_order(SELL, 10, 100)
+    kept = engine.new_order(SELL, 10, 100)
+    book.add(cancelled)
+    book.add(kept)
+    assert book.cancel(cancelled.order_id)
+    assert not book.cancel(cancelled.order_id)
+
+    fills = book.add(engine.new_order(BUY, 10))
+    assert [fill.maker_id for fill in fills] == [kept.order_id]
+
+
+def test_random_flow_keeps_the_book_consistent():
+    engine, book = new_book()
+    rng = random.Random(7)
+    submitted = 0
+    traded = 0
+    orders = []
+    for _ in range(2000):
+        if orders and rng.random() < 0.2:
+            book.cancel(rng.choice(orders).order_id)
+            continue
+        side = rng.choice((BUY, SELL))
+        price = None if rng.random() < 0.1 else rng.randint(95, 105)
+        order = engine.new_order(side, rng.randint(1, 50), price)
+        orders.append(order)
+        fills = book.add(order)
+        submitted += order.quantity
+        traded += sum(fill.quantity for fill in fills)
+
+        # never crossed, and fills never exceed the order or cross its limit.
+        bid, ask = book.best_bid(), book.best_ask()
+        assert bid is None or ask is None or bid < ask
+        assert sum(fill.quantity for fill in fills) == order.quantity - order.remaining
+        for fill in fills:
+            assert order.price is None or (fill.price <= order.price if side == BUY else fill.price >= order.price)
+
+    # the volume of every level is what its live orders have left.
+    for side in (book.bids, book.asks):
+        for price, queue in side.levels.items():
+            assert side.volume[price] == sum(order.remaining for order in queue)
+    assert book.traded_quantity == traded
+
+
+def new_operation(ticker: str, side: str, quantity, price=None) -> Operation:
+    operation = Operation()
+    operation.type = side
+    operation.quantity = quantity
+    operation.price = price
+    operation.stock = Stock()
+    operation.stock.ticker = ticker
+    return operation
+
+
+def execute(operation: Operation):
+    return Broker.execute(Broker(), operation.stock, operation)
+
+
+def test_broker_rejects_non_positive_quantities():
+    for quantity in (0, -5):
+        result = execute(new_operation("ZERO", "buy", quantity))
+        assert result.status == OperationStatus.Failure
+        assert result.has_errors
+    assert "ZERO" not in SIMULATED_MARKET.books
+
+
+def test_broker_leaves_a_limit_order_that_doesnt_cross_working():
+    result = execute(new_operation("NOFILL", "buy", 10, price=0.01))
+    assert result.status == OperationStatus.InProgress
+    assert result.filled_quantity == 0
+    assert not result.has_errors
+    assert (0.01, 10) in SIMULATED_MARKET.book("NOFILL").depth(levels=100)["bids"]
+
+
+def test_the_market_maker_replenishes_what_was_filled():
+    engine = MatchingEngine(MarketMaker(levels=2, quantity=10))
+    # more than both its ask levels (10 + 20), every time.
+    for _ in range(3):
+        order, fills = engine.submit("DRY", BUY, 40)
+        assert sum(fill.quantity for fill in fills) == 30
+    # the untouched side isn't quoted twice.
+    assert sum(quantity for _, quantity in engine.book("DRY").depth()["bids"]) == 30
+
+
+def test_broker_fills_a_market_order():
+    result = execute(new_operation("FILL", "buy", 10))
+    assert result.status == OperationStatus.Success
+    assert result.filled_quantity == 10
+    assert result.average_price > 0
@@ -0,0 +1,152 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+
+import pytest
+
+from data_models.order_queue import OrderQueue, OrderQueueFull, OrderQueueStopped
+from data_models.trade_assistant import Operation, OperationResult, OperationStatus
+
+
+def new_operation(quantity: int) -> Operation:
+    operation = Operation()
+    operation.type = "buy"
+    operation.quantity = quantity
+    return operation
+
+
+class RecordingHandler:
+    """ executes nothing: remembers the quantities it was given, in order, until released """
+
+    def __init__(self):
+        self.quantities = []
+        self.release = None
+
+    async def __call__(self, operation: Operation) -> OperationResult:
+        if self.release is not None:
+            await self.release.wait()
+        self.quantities.append(operation.quantity)
+        result = OperationResult()
+        result.status = OperationStatus.Success
+        return result
+
+
+def test_executes_in_submit_order():
+    handler = RecordingHandler()
+    queue = OrderQueue(max_size=100, workers=1, handler=handler)
+
+    async def run():
+        orders = [await queue.submit(new_operation(quantity)) for quantity in range(1, 21)]
+        results = await asyncio.gather(*[order.result for order in orders])
+        await queue.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert handler.quantities == list(range(1, 21))
+    assert all(result.status == OperationStatus.Success for result in results)
+    assert queue.stats()["completed"] == 20
+
+
+def test_rejects_when_full():
+    handler = RecordingHandler()
+    queue = OrderQueue(max_size=2, workers=1, handler=handler)
+
+    async def run():
+        handler.release = asyncio.Event()
+        # one taken by the worker, two waiting in the queue.
+        await queue.submit(new_operation(1))
+        await asyncio.sleep(0)
+        await queue.submit(new_operation(2))
+        await queue.submit(new_operation(3))
+        with pytest.raises(OrderQueueFull):
+            await queue.submit(new_operation(4), timeout=0.01)
+        handler.release.set()
+        await queue.join()
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handler.quantities == [1, 2, 3]
+    assert queue.stats()["rejected"] == 1
+
+
+def test_orders_queued_at_stop_run_after_restart():
+    handler = RecordingHandler()
+    queue = OrderQueue(max_size=10, workers=1, handler=handler)
+
+    async def run():
+        handler.release = asyncio.Event()
+        first = await queue.submit(new_operation(1))
+        await asyncio.sleep(0)
+        second = await queue.submit(new_operation(2))
+        await queue.stop()
+        # the order being executed when the workers stopped fails, the queued one waits for new workers.
+        with pytest.raises(OrderQueueStopped):
+            await first.result
+        assert queue.depth == 1
+
+        handler.release.set()
+        third = await queue.submit(new_operation(3))
+        await asyncio.gather(second.result, third.result)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert handler.quantities == [2, 3]
+
+
+def test_orders_of_a_previous_loop_fail():
+    handler = RecordingHandler()
+    queue = OrderQueue(max_size=10, workers=1, handler=handler)
+    orders = []
+
+    async def submit_and_leave():
+        handler.release = asyncio.Event()
+        orders.append(await queue.submit(new_operation(1)))
+        orders.append(await queue.submit(new_operation(2)))
+
+    first_loop = asyncio.new_event_loop()
+    first_loop.run_until_complete(submit_and_leave())
+
+    async def submit_again():
+        handler.release = None
+        order = await queue.submit(new_operation(3))
+        await order.result
+        await queue.stop()
+
+    asyncio.run(submit_again())
+    assert handler.quantities == [3]
+    # still queued when the loop changed: it fails instead of never getting a result.
+    assert isinstance(orders[1].result.exception(), OrderQueueStopped)
+
+    # the worker of the first loop still has the other one; it fails too once that worker is cancelled.
+    workers = asyncio.all_tasks(first_loop)
+    for worker in workers:
+        worker.cancel()
+    first_loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+    first_loop.close()
+    assert isinstance(orders[0].result.exception(), OrderQueueStopped)
+
+
+def test_workers_take_waiting_orders_in_batches():
+    in_flight = 0
+    most_in_flight = 0
+
+    async def handler(operation: Operation) -> OperationResult:
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return OperationResult()
+
+    queue = OrderQueue(max_size=100, workers=2, handler=handler, batch_size=10)
+
+    async def run():
+        orders = [await queue.submit(new_operation(quantity)) for quantity in range(40)]
+        await asyncio.gather(*[order.result for order in orders])
+        await queue.stop()
+
+    asyncio.run(run())
+    # one order per worker at a time would never get past 2.
+    assert most_in_flight == 20
+    assert queue.stats()["completed"] == 40
@@ -0,0 +1,136 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+
+from botbuilder.core import CardFactory, MessageFactory, TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import (
+    Activity,
+    ActivityTypes,
+    CardAction,
+    ChannelAccount,
+    ConversationAccount,
+    DeliveryModes,
+    HeroCard,
+    SuggestedActions,
+)
+
+from helpers.outbound_buffer import OutboundBuffer, OutboundMetrics, can_merge, merge
+
+
+def new_turn(delivery_mode: str = None) -> TurnContext:
+    return TurnContext(
+        TestAdapter(),
+        Activity(
+            type=ActivityTypes.message,
+            text="hi",
+            channel_id="test",
+            delivery_mode=delivery_mode,
+            from_property=ChannelAccount(id="user"),
+            recipient=ChannelAccount(id="bot"),
+            conversation=ConversationAccount(id="conversation"),
+        ),
+    )
+
+
+def card() -> Activity:
+    return MessageFactory.attachment(CardFactory.hero_card(HeroCard(title="card")))
+
+
+def sent(turn_context: TurnContext):
+    return [activity.text or activity.attachments[0].content.title
+            for activity in turn_context.adapter.activity_buffer]
+
+
+def test_merges_text_and_what_follows_it():
+    assert can_merge(MessageFactory.text("a"), MessageFactory.text("b"))
+    assert can_merge(MessageFactory.text("a"), card())
+
+    merged = merge(MessageFactory.text("a"), MessageFactory.text("b"))
+    assert merged.text == "a\n\nb"
+
+
+def test_does_not_merge_what_would_change_how_it_is_shown():
+    # text below an attachment would end up above it.
+    assert not can_merge(card(), MessageFactory.text("b"))
+    # suggested actions only belong on the last message.
+    suggested = MessageFactory.text("a")
+    suggested.suggested_actions = SuggestedActions(actions=[CardAction(title="yes", type="imBack", value="yes")])
+    assert not can_merge(suggested, MessageFactory.text("b"))
+    assert not can_merge(MessageFactory.text("a", speak="a"), MessageFactory.text("b"))
+    assert not can_merge(MessageFactory.text("a"), Activity(type=ActivityTypes.typing))
+
+    plain = MessageFactory.text("b")
+    plain.text_format = "plain"
+    assert not can_merge(MessageFactory.text("a"), plain)
+
+
+def test_the_last_message_keeps_its_suggested_actions():
+    last = MessageFactory.text("b")
+    last.suggested_actions = SuggestedActions(actions=[CardAction(title="yes", type="imBack", value="yes")])
+    merged = merge(MessageFactory.text("a"), last)
+    assert merged.suggested_actions is last.suggested_actions
+
+
+def test_delivers_when_flushed():
+    turn_context = new_turn()
+    metrics = OutboundMetrics()
+
+    async def run():
+        buffer = OutboundBuffer.start(turn_context, metrics=metrics)
+        # not sent yet, so there is no ResourceResponse.
+        assert await turn_context.send_activity("a") is None
+        await turn_context.send_activity("b")
+        assert sent(turn_context) == []
+        await buffer.flush()
+        # once closed, sends go straight out.
+        assert await turn_context.send_activity("c") is not None
+
+    asyncio.run(run())
+    assert sent(turn_context) == ["a", "b", "c"]
+    assert metrics.activities == 2 and metrics.delivered == 2
+
+
+def test_merges_only_when_asked_to():
+    turn_context = new_turn()
+
+    async def run():
+        buffer = OutboundBuffer.start(turn_context, merge_messages=True)
+        await turn_context.send_activity("a")
+        await turn_context.send_activity("b")
+        await turn_context.send_activity(card())
+        await turn_context.send_activity("c")
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert len(turn_context.adapter.activity_buffer) == 2
+    assert turn_context.adapter.activity_buffer[0].text == "a\n\nb"
+    assert len(turn_context.adapter.activity_buffer[0].attachments) == 1
+    assert sent(turn_context) == ["a\n\nb", "c"]
+
+
+def test_send_now_goes_after_what_is_waiting():
+    turn_context = new_turn()
+
+    async def run():
+        buffer = OutboundBuffer.start(turn_context)
+        await turn_context.send_activity("a")
+        response = await OutboundBuffer.send_now(turn_context, "now")
+        assert response is not None and response.id
+        await turn_context.send_activity("b")
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert sent(turn_context) == ["a", "now", "b"]
+
+
+def test_expect_replies_turns_are_not_buffered():
+    turn_context = new_turn(DeliveryModes.expect_replies)
+
+    async def run():
+        OutboundBuffer.start(turn_context)
+        await turn_context.send_activity("a")
+
+    asyncio.run(run())
+    assert [activity.text for activity in turn_context.buffered_reply_activities] == ["a"]
@@ -0,0 +1,38 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from helpers.plot_cache import PlotCache, plot_key
+
+
+def test_the_key_depends_on_values_and_params():
+    assert plot_key([1, 2]) == plot_key([1, 2])
+    assert plot_key([1, 2]) != plot_key([2, 1])
+    assert plot_key([1, 2], dpi=100) != plot_key([1, 2], dpi=200)
+
+
+def test_evicts_the_least_recently_used_past_max_bytes():
+    cache = PlotCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.size_bytes == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_an_entry_keeps_the_size_right():
+    cache = PlotCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("a", "aa")
+    assert cache.size_bytes == 2
+
+
+def test_skips_plots_bigger_than_the_cache():
+    cache = PlotCache(max_bytes=10)
+    cache.put("a", "a" * 11)
+    assert cache.get("a") is None
+    assert cache.size_bytes == 0
@@ -0,0 +1,198 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+
+from data_models.market_data import Quote, QuoteProvider
+from data_models.portfolio_store import PortfolioStore
+from data_models.trade_assistant import BuyOperation, Holding, OperationResult, OperationStatus, Portfolio, \
+    SellOperation
+
+
+class MemoryStore(PortfolioStore):
+    """ keeps the holdings it was given in a dict, by ticker """
+
+    def __init__(self, holdings=None):
+        self.holdings = {holding["ticker"]: dict(holding) for holding in holdings or []}
+        self.writes = 0
+
+    def load(self):
+        return [dict(holding) for holding in self.holdings.values()]
+
+    def save(self, holdings):
+        self.holdings = {holding["ticker"]: dict(holding) for holding in holdings}
+        self.writes += 1
+
+    def save_holding(self, holding):
+        self.holdings[holding["ticker"]] = dict(holding)
+        self.writes += 1
+
+    def remove_holding(self, ticker):
+        self.holdings.pop(ticker, None)
+        self.writes += 1
+
+    def version(self):
+        return self.writes
+
+
+class FixedQuotes(QuoteProvider):
+    """ the same quote for every ticker """
+
+    async def get_quotes(self, tickers):
+        return {ticker: Quote(ticker, 999.0, 2.5) for ticker in tickers}
+
+
+def new_holding(ticker: str, last_price: float) -> dict:
+    return {"ticker": ticker, "market": "NASDAQ", "company": ticker, "last_price": last_price, "avg_price": 100.0,
+            "quantity": 10, "quantity_compromised": 0}
+
+
+def test_quotes_are_shown_but_not_saved():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    portfolio = Portfolio(store)
+
+    asyncio.run(portfolio.refresh_quotes(FixedQuotes()))
+    holding = portfolio.find_holding("MSFT")
+    assert holding.market_price == 999.0
+    assert holding.daily_variation == 2.5
+    assert holding.last_price == 150.0
+
+    portfolio.save_holding(holding)
+    assert store.holdings["MSFT"]["last_price"] == 150.0
+
+
+def test_without_a_quote_the_last_price_is_shown():
+    holding = Holding.from_dict(new_holding("MSFT", 150.0))
+    assert holding.market_price == 150.0
+    assert holding.daily_variation == 0.0
+
+
+def new_result(filled_quantity: int, average_price: float) -> OperationResult:
+    result = OperationResult()
+    result.status = OperationStatus.Success
+    result.filled_quantity = filled_quantity
+    result.average_price = average_price
+    return result
+
+
+def test_what_was_filled_is_added_to_the_holding_and_saved():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    portfolio = Portfolio(store)
+    operation = BuyOperation()
+    operation.type = 'buy'
+    operation.stock.ticker = "MSFT"
+
+    holding = portfolio.apply_result(operation, new_result(10, 120.0))
+    assert holding.quantity == 20
+    assert holding.average_price == 110.0
+    assert store.holdings["MSFT"]["quantity"] == 20
+    assert store.holdings["MSFT"]["last_price"] == 120.0
+
+
+def test_what_was_sold_is_taken_off_and_nothing_changes_without_a_fill():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    portfolio = Portfolio(store)
+    operation = SellOperation()
+    operation.type = 'sell'
+    operation.stock.ticker = "MSFT"
+
+    assert portfolio.apply_result(operation, new_result(0, 0.0)) is None
+    assert store.writes == 0
+    portfolio.apply_result(operation, new_result(4, 160.0))
+    assert store.holdings["MSFT"]["quantity"] == 6
+    assert store.holdings["MSFT"]["avg_price"] == 100.0
+
+
+def test_a_first_buy_adds_the_holding():
+    store = MemoryStore()
+    portfolio = Portfolio(store)
+    operation = BuyOperation()
+    operation.type = 'buy'
+    operation.stock.ticker = "AAPL"
+
+    portfolio.apply_result(operation, new_result(5, 90.0))
+    assert portfolio.find_holding("AAPL").quantity == 5
+    assert store.holdings["AAPL"]["avg_price"] == 90.0
+
+
+def new_portfolio_holding(ticker: str, market: str = "NASDAQ", quantity: int = 10) -> Holding:
+    holding = Holding.from_dict(new_holding(ticker, 150.0))
+    holding.stock.market = market
+    holding.quantity = quantity
+    return holding
+
+
+def test_add_find_and_remove_keep_the_indexes_in_sync():
+    portfolio = Portfolio(MemoryStore())
+    for ticker, market in (("MSFT", "NASDAQ"), ("IBM", "NYSE"), ("AAPL", "NASDAQ")):
+        portfolio.add_holding(new_portfolio_holding(ticker, market))
+
+    assert portfolio.find_holding("IBM").stock.market == "NYSE"
+    assert portfolio.find_holding("GOOG") is None
+    assert sorted(holding.stock.ticker for holding in portfolio.holdings_in_market("NASDAQ")) == ["AAPL", "MSFT"]
+
+    # the last holding takes the place of the removed one.
+    removed = portfolio.remove_holding("MSFT")
+    assert removed.stock.ticker == "MSFT" and removed.quantity == 10
+    assert [holding.stock.ticker for holding in portfolio.stocks_owned] == ["AAPL", "IBM"]
+    assert portfolio.find_holding("MSFT") is None
+    assert portfolio.find_holding("AAPL") is portfolio.stocks_owned[0]
+    assert [holding.stock.ticker for holding in portfolio.holdings_in_market("NASDAQ")] == ["AAPL"]
+    assert portfolio.remove_holding("MSFT") is None
+
+    portfolio.remove_holding("IBM")
+    assert portfolio.holdings_in_market("NYSE") == []
+
+
+def test_adding_a_ticker_again_replaces_its_holding():
+    portfolio = Portfolio(MemoryStore())
+    first = new_portfolio_holding("MSFT", "NASDAQ", 10)
+    portfolio.add_holding(first)
+    portfolio.add_holding(new_portfolio_holding("MSFT", "NYSE", 25))
+
+    assert len(portfolio.stocks_owned) == 1
+    assert portfolio.find_holding("MSFT").quantity == 25
+    assert portfolio.holdings_in_market("NASDAQ") == []
+    assert [holding.stock.ticker for holding in portfolio.holdings_in_market("NYSE")] == ["MSFT"]
+    # the replaced holding keeps its own numbers.
+    assert first.quantity == 10
+
+
+def test_the_table_grows_and_follows_the_holdings():
+    portfolio = Portfolio(MemoryStore())
+    for index in range(20):
+        portfolio.add_holding(new_portfolio_holding(f"T{index}", quantity=index + 1))
+    assert portfolio.table.size == 20
+    assert len(portfolio.table.quantity) >= 20
+
+    portfolio.remove_holding("T0")
+    assert portfolio.table.size == 19
+    # T19 moved to the first row, and still writes through to it.
+    moved = portfolio.find_holding("T19")
+    assert portfolio.table.quantity[0] == 20
+    moved.quantity = "7"
+    assert portfolio.table.quantity[0] == 7
+
+
+def test_valuation():
+    portfolio = Portfolio(MemoryStore())
+    msft = new_portfolio_holding("MSFT", quantity=10)
+    msft.average_price, msft.last_price = 100.0, 150.0
+    aapl = new_portfolio_holding("AAPL", quantity=5)
+    aapl.average_price, aapl.last_price = 200.0, 100.0
+    portfolio.add_holding(msft)
+    portfolio.add_holding(aapl)
+
+    valuation = portfolio.valuation()
+    assert list(valuation.market_value) == [1500.0, 500.0]
+    assert list(valuation.unrealized_pnl) == [500.0, -500.0]
+    assert list(valuation.weights) == [0.75, 0.25]
+    assert valuation.total_market_value == 2000.0
+    assert valuation.total_cost == 2000.0
+    assert valuation.total_unrealized_pnl == 0.0
+
+
+def test_valuation_of_an_empty_portfolio():
+    valuation = Portfolio(MemoryStore()).valuation()
+    assert valuation.total_market_value == 0.0
+    assert len(valuation.weights) == 0
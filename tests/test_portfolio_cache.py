@@ -0,0 +1,65 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+
+from data_models.portfolio_cache import PortfolioCache
+from data_models.portfolio_store import SqliteStore
+from tests.test_portfolio import MemoryStore, new_holding
+
+
+def test_writes_through_the_cached_portfolio_keep_it():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    cache = PortfolioCache(store, check_interval=0)
+    portfolio = cache.get()
+
+    holding = portfolio.find_holding("MSFT")
+    holding.quantity = 42
+    portfolio.save_holding(holding)
+
+    # written straight to the store, and the cached copy already has it.
+    assert store.holdings["MSFT"]["quantity"] == 42
+    assert cache.get() is portfolio
+    assert cache.stats()["loads"] == 1
+
+
+def test_a_new_version_of_the_store_reloads_it():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    cache = PortfolioCache(store, check_interval=0)
+    portfolio = cache.get()
+
+    # somebody else wrote to the store.
+    store.save([new_holding("AAPL", 90.0)])
+    reloaded = cache.get()
+    assert reloaded is not portfolio
+    assert reloaded.find_holding("AAPL") is not None
+    assert cache.stats()["loads"] == 2
+
+
+def test_the_version_is_checked_at_most_every_check_interval():
+    store = MemoryStore([new_holding("MSFT", 150.0)])
+    cache = PortfolioCache(store, check_interval=60)
+    portfolio = cache.get()
+
+    store.save([])
+    assert cache.get() is portfolio
+    cache.invalidate()
+    assert cache.get().stocks_owned == []
+
+
+def test_commits_of_another_sqlite_connection_reload_it(tmp_path):
+    db_url = os.path.join(str(tmp_path), "portfolio.db")
+    store = SqliteStore(db_url)
+    other = SqliteStore(db_url)
+    cache = PortfolioCache(store, check_interval=0)
+
+    portfolio = cache.get()
+    store.save_holding(new_holding("AAPL", 90.0))
+    # data_version doesn't move with the commits of its own connection.
+    assert cache.get() is portfolio
+
+    other.save_holding(new_holding("MSFT", 150.0))
+    assert cache.get().find_holding("MSFT") is not None
+    assert cache.stats()["loads"] == 2
+    store.close()
+    other.close()
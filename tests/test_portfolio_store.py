@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import json
+import os
+import threading
+
+import pytest
+
+from data_models.portfolio_store import JournalStore, SqliteStore, write_json_atomically
+
+
+def new_holding(ticker: str, quantity: int = 10) -> dict:
+    return {"ticker": ticker, "market": "NASDAQ", "company": ticker, "last_price": 150.0, "avg_price": 140.0,
+            "quantity": quantity, "quantity_compromised": 0}
+
+
+@pytest.fixture
+def snapshot_url(tmp_path):
+    return os.path.join(str(tmp_path), "data.txt")
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return os.path.join(str(tmp_path), "portfolio.db")
+
+
+def quantities(store) -> dict:
+    return {holding["ticker"]: holding["quantity"] for holding in store.load()}
+
+
+def test_replays_the_journal_over_the_snapshot(snapshot_url):
+    store = JournalStore(snapshot_url, fsync=False)
+    store.save([new_holding("MSFT"), new_holding("AAPL")])
+    store.save_holding(new_holding("MSFT", 20))
+    store.remove_holding("AAPL")
+    store.save_holding(new_holding("GOOG", 5))
+
+    assert quantities(JournalStore(snapshot_url, fsync=False)) == {"MSFT": 20, "GOOG": 5}
+
+
+def test_skips_a_torn_last_line(snapshot_url):
+    store = JournalStore(snapshot_url, fsync=False)
+    store.save_holding(new_holding("MSFT", 20))
+    with open(store.journal_url, "a") as journal:
+        # a crash in the middle of an append.
+        journal.write(json.dumps({"op": "upsert", "holding": new_holding("AAPL")})[:30])
+
+    reopened = JournalStore(snapshot_url, fsync=False)
+    assert quantities(reopened) == {"MSFT": 20}
+
+    # what is appended after the crash isn't glued to the torn line.
+    reopened.save_holding(new_holding("GOOG", 5))
+    assert quantities(JournalStore(snapshot_url, fsync=False)) == {"MSFT": 20, "GOOG": 5}
+
+
+def test_compaction_keeps_every_change(snapshot_url):
+    store = JournalStore(snapshot_url, compact_every=3, fsync=False)
+    for quantity in range(1, 8):
+        store.save_holding(new_holding("MSFT", quantity))
+        store.save_holding(new_holding("T{0}".format(quantity), quantity))
+    store.wait_for_compaction()
+    assert store.compactions >= 1
+
+    expected = dict({"MSFT": 7}, **{"T{0}".format(quantity): quantity for quantity in range(1, 8)})
+    assert quantities(JournalStore(snapshot_url, fsync=False)) == expected
+
+
+def test_concurrent_atomic_writes_leave_a_whole_file_and_no_temporary_ones(snapshot_url):
+    def write(index: int):
+        for _ in range(20):
+            write_json_atomically(snapshot_url, {"holdings": [new_holding("MSFT", index)] * 50})
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(snapshot_url) as json_file:
+        assert len(json.load(json_file)["holdings"]) == 50
+    assert os.listdir(os.path.dirname(snapshot_url)) == ["data.txt"]
+
+
+def test_an_older_snapshot_never_replaces_a_newer_one(snapshot_url):
+    store = JournalStore(snapshot_url, fsync=False)
+    store.save_holding(new_holding("MSFT", 20))
+    with store._lock:
+        number, stale = store._rotate_journal()
+    # a save() gets in before the compaction thread writes its snapshot.
+    store.save([new_holding("AAPL")])
+    store._write_snapshot(number, stale)
+
+    assert quantities(JournalStore(snapshot_url, fsync=False)) == {"AAPL": 10}
+
+
+def test_sqlite_imports_data_txt_on_first_run_and_exports_it(snapshot_url, db_url, tmp_path):
+    write_json_atomically(snapshot_url, {"holdings": [new_holding("MSFT", "745"), new_holding("AAPL")]})
+    store = SqliteStore(db_url, json_url=snapshot_url)
+    # values come back as they were written, in the same order.
+    assert quantities(store) == {"MSFT": "745", "AAPL": 10}
+    assert [holding["ticker"] for holding in store.load()] == ["MSFT", "AAPL"]
+
+    # only on the first run: the data file doesn't overwrite the database afterwards.
+    store.save_holding(new_holding("AAPL", 20))
+    assert quantities(SqliteStore(db_url, json_url=snapshot_url)) == {"MSFT": "745", "AAPL": 20}
+
+    exported_url = os.path.join(str(tmp_path), "exported.txt")
+    store.export_json(exported_url)
+    with open(exported_url) as json_file:
+        assert json.load(json_file)["holdings"] == store.load()
+    store.close()
+
+
+def test_sqlite_upserts_by_user_and_ticker(db_url):
+    alice = SqliteStore(db_url, user_id="alice")
+    bob = SqliteStore(db_url, user_id="bob")
+    alice.save_holding(new_holding("MSFT", 10))
+    alice.save_holding(new_holding("MSFT", 30))
+    bob.save_holdings([new_holding("MSFT", 5), new_holding("GOOG", 1)])
+    alice.remove_holding("GOOG")
+
+    assert quantities(alice) == {"MSFT": 30}
+    assert quantities(bob) == {"MSFT": 5, "GOOG": 1}
+    assert sorted(alice.holders_of("MSFT")) == ["alice", "bob"]
+
+    # save replaces the holdings of its own user only.
+    alice.save([new_holding("AAPL")])
+    assert quantities(alice) == {"AAPL": 10}
+    assert quantities(bob) == {"MSFT": 5, "GOOG": 1}
+    alice.close()
+    bob.close()
+
+
+def test_sqlite_version_moves_with_commits_of_other_connections(db_url):
+    store = SqliteStore(db_url)
+    other = SqliteStore(db_url)
+    version = store.version()
+
+    store.save_holding(new_holding("MSFT"))
+    # its own writes can't make its copy stale.
+    assert store.version() == version
+
+    other.save_holding(new_holding("MSFT", 20))
+    assert store.version() != version
+    store.close()
+    other.close()
@@ -0,0 +1,31 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import pytest
+
+from helpers.recognizer_pipeline import has_date_like_tokens
+
+
+@pytest.mark.parametrize("user_input", [
+    "buy 10 msft tomorrow",
+    "sell 5 msft next friday at 10am",
+    "buy 10 msft on may 5",
+    "buy 10 msft on the 5th of may",
+    "buy 10 msft on sat",
+    "buy 10 msft on 3/4",
+    "sell everything in 2025",
+    "buy msft in march 2025",
+])
+def test_finds_dates(user_input):
+    assert has_date_like_tokens(user_input)
+
+
+@pytest.mark.parametrize("user_input", [
+    "buy 1000 MSFT",
+    "buy 2024 msft for $ 150",
+    "Buy 10 MSFT for $ 150",
+    "I may buy 20 msft",
+    "sell 100 sun microsystems",
+])
+def test_quantities_and_words_are_not_dates(user_input):
+    assert not has_date_like_tokens(user_input)
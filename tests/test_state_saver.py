@@ -0,0 +1,78 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import asyncio
+
+from botbuilder.core import ConversationState, MemoryStorage, TurnContext, UserState
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ActivityTypes, ChannelAccount, ConversationAccount
+
+from helpers.state_saver import TurnStateSaver
+
+
+class CountingStorage(MemoryStorage):
+    """ MemoryStorage remembering the keys of every write """
+
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    async def write(self, changes):
+        self.written.extend(changes.keys())
+        await super().write(changes)
+
+
+def new_context() -> TurnContext:
+    activity = Activity(
+        type=ActivityTypes.message,
+        channel_id="test",
+        from_property=ChannelAccount(id="user"),
+        recipient=ChannelAccount(id="bot"),
+        conversation=ConversationAccount(id="conversation"),
+        text="hi",
+    )
+    return TurnContext(TestAdapter(), activity)
+
+
+def test_only_changed_states_are_written():
+    storage = CountingStorage()
+    conversation_state, user_state = ConversationState(storage), UserState(storage)
+    saver = TurnStateSaver(conversation_state, user_state)
+    counter = conversation_state.create_property("counter")
+
+    async def turn(change: bool):
+        context = new_context()
+        if change:
+            await counter.set(context, 1)
+        await saver.save_changes(context)
+
+    # neither state was loaded: nothing to write.
+    asyncio.run(turn(change=False))
+    assert storage.written == []
+    assert saver.metrics.skipped == {"ConversationState": 1, "UserState": 1}
+
+    asyncio.run(turn(change=True))
+    assert storage.written == ["test/conversations/conversation"]
+    assert saver.metrics.saved == {"ConversationState": 1}
+    assert saver.metrics.skipped == {"ConversationState": 1, "UserState": 2}
+    assert len(saver.metrics.turn_seconds) == 2
+
+
+def test_a_state_loaded_and_left_as_it_was_is_not_written_again():
+    storage = CountingStorage()
+    conversation_state = ConversationState(storage)
+    saver = TurnStateSaver(conversation_state)
+    counter = conversation_state.create_property("counter")
+
+    async def turns():
+        context = new_context()
+        await counter.set(context, 1)
+        await saver.save_changes(context)
+
+        context = new_context()
+        assert await counter.get(context) == 1
+        await saver.save_changes(context)
+
+    asyncio.run(turns())
+    assert len(storage.written) == 1
+    assert "ConversationState: 1 saved, 1 skipped" in saver.metrics.to_string()
@@ -0,0 +1,58 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import time
+
+from helpers.utterance_cache import UtteranceCache
+
+
+class Recognized:
+    """ stands in for a TradeUtterance """
+
+    def __init__(self, quantity: str):
+        self.quantity = quantity
+
+
+def test_hits_ignore_case_and_spacing():
+    cache = UtteranceCache()
+    cache.put("Buy 10 MSFT for $ 150", Recognized("10"))
+    assert cache.get("buy  10 msft for $ 150 ").quantity == "10"
+    assert cache.stats()["hits"] == 1
+
+
+def test_evicts_the_least_recently_used():
+    cache = UtteranceCache(max_size=2)
+    cache.put("buy 1 msft", Recognized("1"))
+    cache.put("buy 2 msft", Recognized("2"))
+    cache.get("buy 1 msft")
+    cache.put("buy 3 msft", Recognized("3"))
+
+    assert cache.get("buy 2 msft") is None
+    assert cache.get("buy 1 msft").quantity == "1"
+    assert cache.get("buy 3 msft").quantity == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = UtteranceCache(ttl_seconds=0.01)
+    cache.put("buy 1 msft", Recognized("1"))
+    time.sleep(0.02)
+    assert cache.get("buy 1 msft") is None
+    assert len(cache) == 0
+
+
+def test_date_like_utterances_are_not_cached():
+    cache = UtteranceCache()
+    cache.put("buy 1 msft tomorrow", Recognized("1"))
+    assert cache.get("buy 1 msft tomorrow") is None
+    assert cache.stats()["bypasses"] == 1
+    assert len(cache) == 0
+
+
+def test_changing_what_it_returned_leaves_the_cache_alone():
+    cache = UtteranceCache()
+    value = Recognized("1")
+    cache.put("buy 1 msft", value)
+    value.quantity = "changed after put"
+    cache.get("buy 1 msft").quantity = "changed after get"
+    assert cache.get("buy 1 msft").quantity == "1"